@@ -1,5 +1,16 @@
 import json
-import re
+import os
+import sys
+
+# Make sure project root is on sys.path so we can import 'tools'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from agents.records import ClassificationRecord
+from tools.rule_store import RuleSet, rule_store
+
 
 class ClassificationAgent:
     """
@@ -11,78 +22,126 @@ class ClassificationAgent:
     - thread_status
     - needs_escalation
     Also updates simple memory values.
-    """
 
-    POSSIBLE_CATEGORIES = [
-        "billing", "technical_issue", "refund", "complaint", "general_inquiry"
-    ]
-
-    SENTIMENT_KEYWORDS = {
-        "angry": ["unacceptable", "angry", "furious", "not acceptable", "fix this now"],
-        "frustrated": ["frustrating", "frustrated", "this is really", "not working"],
-        "confused": ["don't understand", "what does this mean", "confusing"],
-        "calm": ["hi", "hello", "kind regards", "thanks"],
-        "neutral": [],
-        "happy": ["thank you so much", "great", "happy", "appreciate"]
-    }
+    The keyword tables live in config/categories.yml and are reloaded
+    while running (tools/rule_store.py).
+    """
 
-    ESCALATION_TRIGGERS = ["unacceptable", "angry", "furious", "fix this now", "third time", "fourth email"]
+    # classify_batch: longer bodies skip the column-wise scan (see there)
+    BATCH_SCAN_MAX_CHARS = 800
 
-    def __init__(self, memory_db=None):
+    def __init__(self, memory_db=None, rules=None):
         """
-        memory_db: dictionary or custom memory system
+        memory_db: dictionary or custom memory system with an
+                   update_memory(sender, category, sentiment) method
+        rules: tools.rule_store.RuleStore with the keyword tables
+               (default: the process-wide store for config/categories.yml)
         """
         self.memory_db = memory_db if memory_db is not None else {}
+        self.rules = rules if rules is not None else rule_store()
 
-    def detect_category(self, text: str) -> str:
-        text = text.lower()
-
-        if "invoice" in text or "subscription" in text or "charge" in text:
-            return "billing"
-        if "refund" in text or "return" in text:
-            return "refund"
-        if "not working" in text or "error" in text or "crash" in text:
-            return "technical_issue"
-        if "disappointed" in text or "complaint" in text or "poor service" in text:
-            return "complaint"
-        if "how do i" in text or "can i" in text or "question" in text:
-            return "general_inquiry"
-
-        return "general_inquiry"
-
-    def detect_sentiment(self, text: str) -> str:
-        text = text.lower()
-
-        for sentiment, keywords in self.SENTIMENT_KEYWORDS.items():
-            for word in keywords:
-                if word in text:
-                    return sentiment
-
-        return "neutral"
-
-    def detect_urgency(self, text: str) -> str:
-        text = text.lower()
-
-        if "as soon as possible" in text or "urgent" in text or "fix today" in text:
-            return "high"
-        if "not urgent" in text or "whenever you can" in text:
-            return "low"
-
-        return "normal"
-
-    def check_escalation(self, text: str, sentiment: str) -> bool:
-        text_low = text.lower()
-
-        if sentiment in ["angry", "frustrated"]:
-            return True
-
-        for keyword in self.ESCALATION_TRIGGERS:
-            if keyword in text_low:
-                return True
-
-        return False
+    def scan(self, text: str, rules: RuleSet = None):
+        """
+        Match all keyword tables against a single lowercased copy.
+        The detectors below take the returned hits instead of rescanning;
+        pass them the same RuleSet the hits came from.
+        """
+        return (rules or self.rules.get()).scan(text)
+
+    def detect_category(self, text: str, hits=None, rules: RuleSet = None) -> str:
+        rules = rules or self.rules.get()
+        if hits is None:
+            hits = rules.scan(text)
+        return rules.category(hits)
+
+    def detect_sentiment(self, text: str, hits=None, rules: RuleSet = None) -> str:
+        rules = rules or self.rules.get()
+        if hits is None:
+            hits = rules.scan(text)
+        return rules.sentiment(hits)
+
+    def detect_urgency(self, text: str, hits=None, rules: RuleSet = None) -> str:
+        rules = rules or self.rules.get()
+        if hits is None:
+            hits = rules.scan(text)
+        return rules.urgency(hits)
+
+    def check_escalation(self, text: str, sentiment: str, hits=None, rules: RuleSet = None) -> bool:
+        rules = rules or self.rules.get()
+        if hits is None and sentiment not in rules.escalation_sentiments:
+            hits = rules.scan(text)
+        return rules.escalates(sentiment, hits)
+
+    @staticmethod
+    def _as_text_list(bodies) -> list:
+        """
+        Accept a list, a pandas Series / NumPy array (tolist) or a pyarrow
+        Array / ChunkedArray (to_pylist). Missing values become "".
+        """
+        if hasattr(bodies, "to_pylist"):
+            bodies = bodies.to_pylist()
+        elif hasattr(bodies, "tolist"):
+            bodies = bodies.tolist()
+        return [body if isinstance(body, str) else "" for body in bodies]
+
+    @staticmethod
+    def _labels(rules: RuleSet, hits) -> tuple:
+        sentiment = rules.sentiment(hits)
+        return (
+            rules.category(hits),
+            sentiment,
+            rules.urgency(hits),
+            rules.escalates(sentiment, hits)
+        )
+
+    def classify_batch(self, bodies) -> dict:
+        """
+        Classify many clean bodies (IntakeAgent clean_body) at once.
+
+        Keyword detection runs column-wise: one scan per keyword over the
+        whole batch gives a hit bitmask per body, and labels are derived
+        once per distinct bitmask with the same detectors as process().
+        Bodies longer than BATCH_SCAN_MAX_CHARS go through the per-email
+        lazy scan instead, which stops early and wins on long texts.
+        Sender memory is not updated.
+
+        Returns columns:
+          {"category": [...], "sentiment": [...], "urgency": [...],
+           "needs_escalation": [...]}
+        pandas.DataFrame(result) turns it into a frame.
+        """
+        rules = self.rules.get()
+        matcher = rules.matcher
+        texts = [text.lower() for text in self._as_text_list(bodies)]
+        labels = [None] * len(texts)
+
+        short_rows = []
+        for i, text in enumerate(texts):
+            if len(text) <= self.BATCH_SCAN_MAX_CHARS:
+                short_rows.append(i)
+            else:
+                labels[i] = self._labels(rules, matcher.scan(text))
+
+        masks = matcher.scan_batch([texts[i] for i in short_rows])
+        labels_by_mask = {}
+        for i, mask in zip(short_rows, masks):
+            row_labels = labels_by_mask.get(mask)
+            if row_labels is None:
+                row_labels = labels_by_mask[mask] = self._labels(rules, matcher.mask_hits(mask))
+            labels[i] = row_labels
+
+        return {
+            "category": [row[0] for row in labels],
+            "sentiment": [row[1] for row in labels],
+            "urgency": [row[2] for row in labels],
+            "needs_escalation": [row[3] for row in labels]
+        }
 
     def update_memory(self, sender: str, category: str, sentiment: str):
+        # Custom memory systems (e.g. memory.memory_bank.MemoryBank) own the update
+        if hasattr(self.memory_db, "update_memory"):
+            return self.memory_db.update_memory(sender, category, sentiment)
+
         if sender not in self.memory_db:
             self.memory_db[sender] = {
                 "message_count": 0,
@@ -96,32 +155,39 @@ class ClassificationAgent:
 
         return self.memory_db[sender]
 
-    def process(self, clean_email: dict, sender: str = "unknown"):
+    def process(self, clean_email: dict, sender: str = "unknown", rules: RuleSet = None,
+                thread=None):
         """
         clean_email is dictionary from IntakeAgent
+
+        rules: the RuleSet to classify with (default: the current one).
+
+        thread: the email's open conversation
+                (memory.session_service.ThreadState), if tracked. A
+                follow-up in a known conversation is a "reply" even
+                without reply markers. Passed on in the record.
         """
 
         text = clean_email["clean_body"]
-        thread = clean_email["thread_status"]
+        thread_status = clean_email["thread_status"]
+        if thread is not None and thread.is_followup:
+            thread_status = "reply"
 
-        category = self.detect_category(text)
-        sentiment = self.detect_sentiment(text)
-        urgency = self.detect_urgency(text)
-        needs_escalation = self.check_escalation(text, sentiment)
+        rules = rules or self.rules.get()
+        hits = rules.scan(text)
 
-        memory_update = self.update_memory(sender, category, sentiment)
+        category = rules.category(hits)
+        sentiment = rules.sentiment(hits)
+        needs_escalation = rules.escalates(sentiment, hits)
 
-        result = {
-            "category": category,
-            "urgency": urgency,
-            "sentiment": sentiment,
-            "thread_status": thread,
-            "needs_escalation": needs_escalation,
-            "memory_update": memory_update,
-            "notes": ""
-        }
+        urgency = rules.urgency(hits)
+
+        memory_update = self.update_memory(sender, category, sentiment)
 
-        return result
+        return ClassificationRecord(
+            category, urgency, sentiment, thread_status, needs_escalation, memory_update,
+            thread=thread
+        )
 
 
 # quick test
@@ -134,4 +200,4 @@ if __name__ == "__main__":
             "thread_status": "reply"
         }
     )
-    print(json.dumps(test_output, indent=2))
+    print(json.dumps(test_output.to_dict(), indent=2))
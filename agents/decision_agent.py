@@ -1,4 +1,14 @@
-from typing import Dict
+import os
+import sys
+
+# Make sure project root is on sys.path so we can import 'agents'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from agents.records import DecisionRecord
+from tools.rule_store import RuleSet, rule_store
 
 
 class DecisionAgent:
@@ -10,12 +20,50 @@ class DecisionAgent:
       - escalated to a human agent ("escalate_to_human").
     """
 
-    HIGH_RISK_CATEGORIES = {"complaint", "cancellation", "legal", "regulatory"}
+    # CRM signals (decision_input["customer"], from tools.crm_lookup)
+    PRIORITY_TIERS = {"premium", "enterprise"}
+    OPEN_TICKETS_LIMIT = 3
+
+    # Conversation signals (decision_input["thread"], from memory.session_service)
+    THREAD_MESSAGES_LIMIT = 3
+
+    def __init__(self, rules=None):
+        """
+        rules: tools.rule_store.RuleStore; the negative sentiments (rule 2)
+               and high-risk categories (rule 3) come from it (default:
+               the process-wide store for config/categories.yml)
+        """
+        self.rules = rules if rules is not None else rule_store()
+
+    def early_decision(self, category: str, sentiment: str, needs_escalation: bool,
+                       rules: RuleSet = None):
+        """
+        Rules 1-3, which need nothing but classifier output. Returns the
+        escalation decision when one of them fires, else None (the other
+        rules also need urgency and the CRM profile).
+        """
+        rules = rules or self.rules.get()
+        category = (category or "general_inquiry").lower()
+        sentiment = (sentiment or "calm").lower()
+
+        # Rule 1: explicit escalation signal
+        if needs_escalation:
+            reason = "Escalation flag from escalation/supervisor logic is true."
+            confidence = "high"
+        # Rule 2: strong negative sentiment
+        elif sentiment in rules.escalation_sentiments:
+            reason = f"Customer sentiment is '{sentiment}', which is high-risk."
+            confidence = "high"
+        # Rule 3: high-risk categories
+        elif category in rules.high_risk_categories:
+            reason = f"Email category '{category}' is considered high-risk."
+            confidence = "medium"
+        else:
+            return None
 
-    def __init__(self):
-        pass
+        return DecisionRecord("escalate_to_human", reason, confidence)
 
-    def decide(self, decision_input: Dict) -> Dict:
+    def decide(self, decision_input: dict, rules: RuleSet = None) -> DecisionRecord:
         """
         decision_input should contain:
           - id: str
@@ -25,13 +73,16 @@ class DecisionAgent:
           - urgency: str
           - sentiment: str
           - needs_escalation: bool
+          - customer: optional CRM profile {"tier": str, "open_tickets": int}
+          - thread: optional memory.session_service.ThreadState of the
+                    email's conversation (message_count, last_sentiment)
 
-        Returns:
-          {
-            "final_action": "approve" | "escalate_to_human",
-            "reason": str,
-            "confidence": "high" | "medium" | "low"
-          }
+        rules: the RuleSet to decide with (default: the current one).
+
+        Returns a DecisionRecord:
+            final_action: "approve" | "escalate_to_human"
+            reason: str
+            confidence: "high" | "medium" | "low"
         """
 
         category = (decision_input.get("category") or "general_inquiry").lower()
@@ -39,21 +90,39 @@ class DecisionAgent:
         needs_escalation = bool(decision_input.get("needs_escalation", False))
         urgency = (decision_input.get("urgency") or "normal").lower()
 
+        rules = rules or self.rules.get()
+        decision = self.early_decision(category, sentiment, needs_escalation, rules)
+        if decision is not None:
+            return decision
+
+        customer = decision_input.get("customer") or {}
+        tier = (customer.get("tier") or "").lower()
+        open_tickets = customer.get("open_tickets") or 0
+
+        thread = decision_input.get("thread")
+        message_count = thread.message_count if thread is not None else 1
+        last_sentiment = thread.last_sentiment if thread is not None else None
+
         reasons = []
 
-        # Rule 1: explicit escalation signal
-        if needs_escalation:
-            reasons.append("Escalation flag from escalation/supervisor logic is true.")
+        # Rule 4: customer already waiting on several tickets
+        if open_tickets >= self.OPEN_TICKETS_LIMIT:
+            reasons.append(f"Customer already has {open_tickets} open tickets.")
             final_action = "escalate_to_human"
-            confidence = "high"
-        # Rule 2: strong negative sentiment
-        elif sentiment in {"angry", "frustrated"}:
-            reasons.append(f"Customer sentiment is '{sentiment}', which is high-risk.")
+            confidence = "medium"
+        # Rule 5: urgent email from a priority account
+        elif tier in self.PRIORITY_TIERS and urgency == "high":
+            reasons.append(f"High-urgency email from a '{tier}' tier customer.")
             final_action = "escalate_to_human"
-            confidence = "high"
-        # Rule 3: high-risk categories
-        elif category in self.HIGH_RISK_CATEGORIES:
-            reasons.append(f"Email category '{category}' is considered high-risk.")
+            confidence = "medium"
+        # Rule 6: customer keeps writing in the same conversation
+        elif message_count >= self.THREAD_MESSAGES_LIMIT:
+            reasons.append(f"Customer has written {message_count} messages in this conversation.")
+            final_action = "escalate_to_human"
+            confidence = "medium"
+        # Rule 7: follow-up to a message that was escalated for its sentiment
+        elif last_sentiment in rules.escalation_sentiments:
+            reasons.append(f"Previous message in this conversation was '{last_sentiment}'.")
             final_action = "escalate_to_human"
             confidence = "medium"
         else:
@@ -67,8 +136,4 @@ class DecisionAgent:
 
         reason_text = " ".join(reasons)
 
-        return {
-            "final_action": final_action,
-            "reason": reason_text,
-            "confidence": confidence,
-        }
+        return DecisionRecord(final_action, reason_text, confidence)
@@ -1,5 +1,15 @@
-import re
 import json
+import os
+import re
+import sys
+
+# Make sure project root is on sys.path so we can import 'agents'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from agents.records import IntakeRecord
 
 class IntakeAgent:
     """
@@ -7,8 +17,40 @@ class IntakeAgent:
     Cleans and structures incoming raw emails.
     """
 
-    def __init__(self):
-        pass
+    # Start of quoted history: "On ... wrote:" (may wrap onto a second line),
+    # Outlook/Gmail original and forwarded message headers
+    QUOTE_HEADER = re.compile(
+        r"^[ \t]*(?:"
+        r"On\b[^\n]{0,300}?(?:\n[^\n]{0,300}?)?\bwrote:[ \t]*$"
+        r"|-{2,}[ \t]*(?:Original Message|Forwarded message)[ \t]*-{2,}"
+        r"|Begin forwarded message:"
+        r"|From:[^\n]*\n[ \t]*(?:Sent|Date):"
+        r")",
+        re.MULTILINE | re.IGNORECASE
+    )
+
+    # Signature delimiter ("-- ") and common mail client footers.
+    # Sign-offs like "Thanks" are kept: the classifier reads them.
+    SIGNATURE = re.compile(
+        r"^(?:--[ ]?[ \t]*$|Sent from my \w+|Get Outlook for )",
+        re.MULTILINE | re.IGNORECASE
+    )
+
+    QUOTED_LINE = re.compile(r"^[ \t]*>[^\n]*(?:\n|$)", re.MULTILINE)
+
+    # Reply / forward prefixes mail clients put on subjects, possibly
+    # stacked or numbered ("Re: Fwd:", "RE[2]:", German "AW:" / "WG:")
+    REPLY_PREFIX = re.compile(
+        r"^(?:[ \t]*(?:re|fwd?|aw|wg|sv|vs|antw|tr|rif|enc)[ \t]*(?:\[\d+\]|\(\d+\))?[ \t]*:)+[ \t]*",
+        re.IGNORECASE
+    )
+
+    def __init__(self, max_scan_chars: int = 20000):
+        """
+        max_scan_chars: hard cap on how much of the body is scanned for
+        quoted history and signatures.
+        """
+        self.max_scan_chars = max_scan_chars
 
     def clean_text(self, text: str) -> str:
         """
@@ -23,42 +65,90 @@ class IntakeAgent:
         # you can extend this later with more cleanup rules
         return text
 
-    def detect_thread(self, body: str) -> str:
+    def split_quoted(self, body: str):
         """
-        Detect whether the email is a reply or a single message.
-        Basic detection using common reply markers.
+        Split a raw body into (new_content, quoted_text).
+
+        Everything from the first quote header or signature on is quoted
+        text, as are "> " lines above it. Only the first max_scan_chars are
+        scanned; the rest is kept as is unless it follows a cut point.
         """
-        reply_indicators = [
-            "Re:", "RE:", "Fw:", "FW:", "On", "wrote:", "Forwarded message"
-        ]
+        if not body:
+            return "", ""
+
+        head = body[:self.max_scan_chars]
 
-        for marker in reply_indicators:
-            if marker.lower() in body.lower():
-                return "reply"
+        cut = None
+        for pattern in (self.QUOTE_HEADER, self.SIGNATURE):
+            match = pattern.search(head)
+            if match and (cut is None or match.start() < cut):
+                cut = match.start()
+
+        if cut is None:
+            new_content, quoted = body, ""
+        else:
+            new_content, quoted = body[:cut], body[cut:]
+
+        scanned = new_content[:self.max_scan_chars]
+        if ">" in scanned:
+            quoted_lines = self.QUOTED_LINE.findall(scanned)
+            if quoted_lines:
+                new_content = self.QUOTED_LINE.sub("", scanned) + new_content[self.max_scan_chars:]
+                quoted = "".join(quoted_lines) + quoted
+
+        # A bare forward has no new text of its own: keep the whole body
+        if not new_content.strip():
+            return body, ""
+
+        return new_content, quoted
+
+    def detect_thread(self, body: str, subject: str = "") -> str:
+        """
+        "reply" when the subject has a reply / forward prefix or the body
+        quotes earlier mail (a quote header or "> " lines), else "single".
+        Only the first max_scan_chars of the body are scanned.
+        """
+        if subject and self.REPLY_PREFIX.match(subject):
+            return "reply"
+
+        head = body[:self.max_scan_chars] if body else ""
+        if self.QUOTE_HEADER.search(head):
+            return "reply"
+        if ">" in head and self.QUOTED_LINE.search(head):
+            return "reply"
 
         return "single"
 
-    def process_email(self, subject: str, body: str):
+    @classmethod
+    def normalize_subject(cls, subject: str) -> str:
+        """
+        The subject a conversation is known by: reply / forward prefixes
+        stripped, whitespace collapsed, case folded.
+        """
+        if not subject:
+            return ""
+        return " ".join(cls.REPLY_PREFIX.sub("", subject).split()).casefold()
+
+    def process_email(self, subject: str, body: str, sender: str = None,
+                      thread_status: str = None):
         """
         Main processing function.
-        Takes raw email subject + body and returns clean JSON output.
+        Takes raw email subject + body and returns an IntakeRecord.
+
+        sender / thread_status: known from the mail headers when the email
+        was parsed from raw RFC 822 (see tools/email_parser.py). Without a
+        thread_status, it is guessed from the subject prefix and quoted
+        history in the body.
         """
 
         clean_subject = self.clean_text(subject)
-        clean_body = self.clean_text(body)
-
-        thread_status = self.detect_thread(body)
+        new_content, quoted_text = self.split_quoted(body)
+        clean_body = self.clean_text(new_content)
 
-        result = {
-            "clean_subject": clean_subject,
-            "clean_body": clean_body,
-            "sender_if_available": None,
-            "thread_status": thread_status,
-            "length": len(clean_body),
-            "notes": ""
-        }
+        if thread_status is None:
+            thread_status = self.detect_thread(body, subject)
 
-        return result
+        return IntakeRecord(clean_subject, clean_body, quoted_text.strip(), sender, thread_status)
 
 
 # quick local test (optional)
@@ -68,4 +158,4 @@ if __name__ == "__main__":
         subject="  RE: Issue with my invoice   ",
         body="Hi team,\nI received a wrong invoice.\nThanks\nJohn"
     )
-    print(json.dumps(test_output, indent=2))
+    print(json.dumps(test_output.to_dict(), indent=2))
@@ -0,0 +1,189 @@
+class Record:
+    """
+    Base for the slotted per-stage records.
+
+    FIELDS lists the public fields in output order. They read as
+    attributes, and also through read-only mapping access ([], get, in,
+    keys), so code written against the old result dicts keeps working.
+    to_dict() is the one serialization step, done at output time.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return default
+
+    def __contains__(self, key) -> bool:
+        return key in self.FIELDS
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_dict(self) -> dict:
+        result = {}
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            result[name] = value.to_dict() if isinstance(value, Record) else value
+        return result
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class IntakeRecord(Record):
+    __slots__ = ("clean_subject", "clean_body", "quoted_text", "sender_if_available", "thread_status")
+    FIELDS = (
+        "clean_subject", "clean_body", "quoted_text", "sender_if_available",
+        "thread_status", "length", "notes"
+    )
+
+    notes = ""
+
+    def __init__(self, clean_subject: str, clean_body: str, quoted_text: str,
+                 sender_if_available: str, thread_status: str):
+        self.clean_subject = clean_subject
+        self.clean_body = clean_body
+        self.quoted_text = quoted_text
+        self.sender_if_available = sender_if_available
+        self.thread_status = thread_status
+
+    @property
+    def length(self) -> int:
+        return len(self.clean_body)
+
+
+class ClassificationRecord(Record):
+    """
+    memory_update is whatever ClassificationAgent.update_memory returned,
+    held by reference. thread is the email's open conversation
+    (memory.session_service.ThreadState) when sessions are tracked; it is
+    not an output field.
+    """
+
+    __slots__ = (
+        "category", "urgency", "sentiment", "thread_status", "needs_escalation",
+        "memory_update", "thread"
+    )
+    FIELDS = (
+        "category", "urgency", "sentiment", "thread_status", "needs_escalation",
+        "memory_update", "notes"
+    )
+
+    notes = ""
+
+    def __init__(self, category: str, urgency: str, sentiment: str, thread_status: str,
+                 needs_escalation: bool, memory_update: dict, thread=None):
+        self.category = category
+        self.urgency = urgency
+        self.sentiment = sentiment
+        self.thread_status = thread_status
+        self.needs_escalation = needs_escalation
+        self.memory_update = memory_update
+        self.thread = thread
+
+
+class DecisionRecord(Record):
+    __slots__ = ("final_action", "reason", "confidence")
+    FIELDS = __slots__
+
+    def __init__(self, final_action: str, reason: str, confidence: str):
+        self.final_action = final_action
+        self.reason = reason
+        self.confidence = confidence
+
+
+class ReplyRecord(Record):
+    __slots__ = ("reply_text", "tone", "requires_human_review", "category", "generated_by")
+    FIELDS = (
+        "reply_text", "tone", "requires_human_review", "summary_for_supervisor", "generated_by"
+    )
+
+    def __init__(self, reply_text: str, tone: str, requires_human_review: bool,
+                 category: str, generated_by: str):
+        self.reply_text = reply_text
+        self.tone = tone
+        self.requires_human_review = requires_human_review
+        self.category = category
+        self.generated_by = generated_by
+
+    @property
+    def summary_for_supervisor(self) -> str:
+        return f"Generated reply for category '{self.category}' with tone '{self.tone}'."
+
+    @classmethod
+    def from_dict(cls, data: dict, category: str, generated_by: str = None) -> "ReplyRecord":
+        return cls(
+            data["reply_text"], data["tone"], data["requires_human_review"],
+            category, generated_by or data.get("generated_by")
+        )
+
+
+class SupervisorRecord(Record):
+    __slots__ = ("action", "final_reply", "reason", "needs_human", "quality_score", "sentiment")
+    FIELDS = ("action", "final_reply", "reason", "needs_human", "memory_update")
+
+    def __init__(self, action: str, final_reply: str, reason: str, needs_human: bool,
+                 quality_score: int, sentiment: str):
+        self.action = action
+        self.final_reply = final_reply
+        self.reason = reason
+        self.needs_human = needs_human
+        self.quality_score = quality_score
+        self.sentiment = sentiment
+
+    @property
+    def memory_update(self) -> dict:
+        return {
+            "quality_score": self.quality_score,
+            "last_interaction_sentiment": self.sentiment
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SupervisorRecord":
+        memory = data.get("memory_update") or {}
+        return cls(
+            data["action"], data["final_reply"], data["reason"], data["needs_human"],
+            memory.get("quality_score"), memory.get("last_interaction_sentiment")
+        )
+
+
+class PipelineResult(Record):
+    """
+    EmailSupportPipeline.run output: the stage records, shared as is.
+    reply and supervisor are None unless the email was approved.
+    cluster_id is the near-duplicate cluster of the email when the
+    pipeline deduplicates (memory/dedup_index.py), else None, and
+    conversation_id that of the email's conversation when it tracks
+    sessions (memory/session_service.py).
+
+    duplicate carries the near-duplicate lookup from triage to the end of
+    the pipeline; it is not an output field.
+    """
+
+    __slots__ = (
+        "intake", "classification", "decision", "reply", "supervisor", "cluster_id",
+        "conversation_id", "duplicate"
+    )
+    FIELDS = __slots__[:-1]
+
+    def __init__(self, intake: IntakeRecord, classification: ClassificationRecord,
+                 decision: DecisionRecord, reply: ReplyRecord = None,
+                 supervisor: SupervisorRecord = None, cluster_id: str = None,
+                 conversation_id: str = None):
+        self.intake = intake
+        self.classification = classification
+        self.decision = decision
+        self.reply = reply
+        self.supervisor = supervisor
+        self.cluster_id = cluster_id
+        self.conversation_id = conversation_id
+        self.duplicate = None
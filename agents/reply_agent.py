@@ -1,4 +1,16 @@
 import json
+import os
+import sys
+
+# Make sure project root is on sys.path so we can import 'agents'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from agents.records import ReplyRecord
+from tools.prompt_builder import PromptBuilder
+
 
 class ReplyAgent:
     """
@@ -6,12 +18,33 @@ class ReplyAgent:
     Generates a professional customer support reply.
     """
 
-    def __init__(self, llm=None):
+    def __init__(self, llm=None, timeout: float = 30.0, batch_size: int = None,
+                 batch_wait: float = 0.005, body_tokens: int = PromptBuilder.BODY_BUDGET,
+                 prompt_builder: PromptBuilder = None):
         """
-        llm: placeholder for Gemini model connection
-        For now, we simulate response generation.
+        llm: placeholder for Gemini model connection.
+             Any object with generate(prompt) -> str, and optionally an
+             async agenerate(prompt) -> str and a batched
+             agenerate_batch(prompts) / generate_batch(prompts) -> [str].
+             Without it, we simulate response generation with templates.
+        timeout: seconds allowed per async LLM call before falling back
+                 to the template reply.
+        batch_size / batch_wait: when batch_size is set, concurrent async
+                 replies are sent to the LLM together, up to batch_size
+                 prompts per call and waiting at most batch_wait seconds
+                 for a batch to fill (tools.llm_batcher.LLMBatcher, kept
+                 as self.batcher for its stats).
+        body_tokens: token budget for the email text in LLM prompts
+                 (tools.prompt_builder.PromptBuilder, kept as
+                 self.prompt_builder for its token counts).
         """
         self.llm = llm
+        self.timeout = timeout
+        self.prompt_builder = prompt_builder or PromptBuilder(body_budget=body_tokens)
+        self.batcher = None
+        if llm is not None and batch_size:
+            from tools.llm_batcher import LLMBatcher
+            self.batcher = LLMBatcher(llm, max_batch=batch_size, max_wait=batch_wait)
 
     def generate_safe_holding_message(self, sentiment: str):
         """
@@ -41,42 +74,126 @@ class ReplyAgent:
         }
         return templates.get(category, "Thanks for contacting us.")
 
-    def generate_reply(self, classification: dict, clean_email: dict):
+    def select_tone(self, sentiment: str, needs_escalation: bool) -> str:
+        if needs_escalation:
+            return "empathetic" if sentiment in ["angry", "frustrated"] else "professional"
+
+        # basic tone selection
+        if sentiment in ["angry", "frustrated"]:
+            return "empathetic"
+        if sentiment in ["happy"]:
+            return "friendly"
+        return "professional"
+
+    def build_llm_prompt(self, classification: dict, clean_email: dict, tone: str,
+                         feedback: str = None) -> str:
+        """
+        The reply_agent prompt from config/prompts.yml, with the email's
+        new text and quoted history cut to the token budget.
+        feedback: why the supervisor sent the previous draft back, when
+                  this is a rewrite.
+        """
+        values = {
+            "category": classification["category"],
+            "sentiment": classification["sentiment"],
+            "tone": tone,
+            "feedback": feedback,
+            "subject": clean_email.get("clean_subject", ""),
+        }
+        return self.prompt_builder.build(
+            "reply_agent", values,
+            clean_body=clean_email.get("clean_body", ""),
+            history=clean_email.get("quoted_text", "")
+        )
+
+    @staticmethod
+    def parse_llm_reply(output: str) -> str:
+        """
+        The prompt asks for JSON with a reply_text; a model that answers
+        in plain text is taken as is.
+        """
+        text = output.strip()
+        if text.startswith("{"):
+            try:
+                data = json.loads(text)
+            except ValueError:
+                return text
+            if isinstance(data, dict) and isinstance(data.get("reply_text"), str):
+                return data["reply_text"]
+        return text
+
+    def _build_result(self, category: str, reply_text: str, tone: str,
+                      requires_human: bool, generated_by: str) -> ReplyRecord:
+        return ReplyRecord(reply_text, tone, requires_human, category, generated_by)
+
+    def generate_reply(self, classification: dict, clean_email: dict, feedback: str = None):
         """
         Core logic:
         - If escalation is needed → safe holding message
-        - If not → generate a helpful reply
-        - Output JSON for supervisor
+        - If not → generate a helpful reply (LLM if attached, else template)
+        - Output a ReplyRecord for supervisor
+
+        feedback: the supervisor's reason for sending the previous draft
+                  back; passed to the LLM (templates can't use it).
         """
 
         category = classification["category"]
         sentiment = classification["sentiment"]
         needs_escalation = classification["needs_escalation"]
+        tone = self.select_tone(sentiment, needs_escalation)
 
         # 1. Escalation logic
         if needs_escalation:
             reply_text = self.generate_safe_holding_message(sentiment)
-            requires_human = True
-            tone = "empathetic" if sentiment in ["angry", "frustrated"] else "professional"
-        else:
-            reply_text = self.generate_normal_reply(category)
-            requires_human = False
-            # basic tone selection
-            if sentiment in ["angry", "frustrated"]:
-                tone = "empathetic"
-            elif sentiment in ["happy"]:
-                tone = "friendly"
-            else:
-                tone = "professional"
+            return self._build_result(category, reply_text, tone, True, "template")
 
-        result = {
-            "reply_text": reply_text,
-            "tone": tone,
-            "requires_human_review": requires_human,
-            "summary_for_supervisor": f"Generated reply for category '{category}' with tone '{tone}'."
-        }
+        if self.llm is not None:
+            try:
+                prompt = self.build_llm_prompt(classification, clean_email, tone, feedback)
+                reply_text = self.parse_llm_reply(self.llm.generate(prompt))
+                return self._build_result(category, reply_text, tone, False, "llm")
+            except Exception:
+                pass
+
+        reply_text = self.generate_normal_reply(category)
+        return self._build_result(category, reply_text, tone, False, "template")
+
+    async def agenerate_reply(self, classification: dict, clean_email: dict,
+                              feedback: str = None, timeout: float = None):
+        """
+        Async version of generate_reply.
+
+        The LLM call is awaited with a per-call timeout (self.timeout, or
+        timeout when shorter), so other emails keep moving while this one
+        waits on the network. Any failure or timeout falls back to the
+        template reply.
+        """
+        import asyncio
 
-        return result
+        category = classification["category"]
+        sentiment = classification["sentiment"]
+        needs_escalation = classification["needs_escalation"]
+
+        if needs_escalation or self.llm is None:
+            return self.generate_reply(classification, clean_email, feedback)
+
+        tone = self.select_tone(sentiment, needs_escalation)
+        prompt = self.build_llm_prompt(classification, clean_email, tone, feedback)
+        if timeout is None or timeout > self.timeout:
+            timeout = self.timeout
+
+        try:
+            if self.batcher is not None:
+                call = self.batcher.agenerate(prompt)
+            elif hasattr(self.llm, "agenerate"):
+                call = self.llm.agenerate(prompt)
+            else:
+                call = asyncio.to_thread(self.llm.generate, prompt)
+            reply_text = self.parse_llm_reply(await asyncio.wait_for(call, timeout=timeout))
+            return self._build_result(category, reply_text, tone, False, "llm")
+        except Exception:
+            reply_text = self.generate_normal_reply(category)
+            return self._build_result(category, reply_text, tone, False, "template")
 
 
 # quick test
@@ -93,4 +210,4 @@ if __name__ == "__main__":
     }
 
     output = agent.generate_reply(classification, clean_email)
-    print(json.dumps(output, indent=2))
+    print(json.dumps(output.to_dict(), indent=2))
@@ -1,4 +1,15 @@
 import json
+import os
+import sys
+
+# Make sure project root is on sys.path so we can import 'agents'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from agents.records import SupervisorRecord
+
 
 class SupervisorAgent:
     """
@@ -102,28 +113,20 @@ class SupervisorAgent:
 
     # Helper functions
     def _approve(self, final_reply, sentiment):
-        return {
-            "action": "approve",
-            "final_reply": final_reply,
-            "reason": "Reply approved.",
-            "needs_human": False,
-            "memory_update": {
-                "quality_score": 5,
-                "last_interaction_sentiment": sentiment
-            }
-        }
+        return SupervisorRecord("approve", final_reply, "Reply approved.", False, 5, sentiment)
 
     def _reject(self, reason, needs_human):
-        return {
-            "action": "rewrite" if not needs_human else "escalate_to_human",
-            "final_reply": "",
-            "reason": reason,
-            "needs_human": needs_human,
-            "memory_update": {
-                "quality_score": 2,
-                "last_interaction_sentiment": None
-            }
-        }
+        action = "rewrite" if not needs_human else "escalate_to_human"
+        return SupervisorRecord(action, "", reason, needs_human, 2, None)
+
+    def escalate_unfixed(self, verdict: SupervisorRecord, attempts: int) -> SupervisorRecord:
+        """
+        Hand a "rewrite" verdict to a human once rewriting stopped
+        (attempt limit or time budget reached) without an approved reply.
+        attempts is at least 1.
+        """
+        reason = f"{verdict.reason} Not fixed after {attempts} rewrite(s)."
+        return SupervisorRecord("escalate_to_human", "", reason, True, verdict.quality_score, None)
 
 
 # quick test
@@ -142,4 +145,4 @@ if __name__ == "__main__":
     }
 
     output = supervisor.evaluate_reply(classification, reply)
-    print(json.dumps(output, indent=2))
+    print(json.dumps(output.to_dict(), indent=2))
@@ -1,6 +1,8 @@
 import json
 import os
 import sys
+from functools import cached_property
+from time import perf_counter_ns
 
 # Make sure project root is on sys.path so we can import 'agents'
 CURRENT_DIR = os.path.dirname(__file__)
@@ -8,81 +10,594 @@ PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
 if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
 
-from agents.intake_agent import IntakeAgent
-from agents.classification_agent import ClassificationAgent
-from agents.reply_agent import ReplyAgent
-from agents.supervisor_agent import SupervisorAgent
-from agents.decision_agent import DecisionAgent
+from agents.records import PipelineResult, ReplyRecord, SupervisorRecord
+from tools.logging_tools import RewriteStats
+from tools.rule_store import rule_store
 
 
 class EmailSupportPipeline:
     """
     Multi-Agent Email Support Pipeline
     Intake -> Classification -> Decision -> (Reply + Supervisor)
+
+    Each agent (and its module) is loaded on first use, so a short-lived
+    process pays only for the stages its emails reach: the reply and
+    supervisor agents, and asyncio, stay unloaded until an email is
+    approved or an async method runs.
     """
 
-    def __init__(self):
-        self.intake = IntakeAgent()
-        self.classifier = ClassificationAgent()
-        self.decision = DecisionAgent()
-        self.reply_agent = ReplyAgent()
-        self.supervisor = SupervisorAgent()
+    def __init__(self, llm=None, reply_timeout: float = 30.0, reply_cache=None,
+                 memory_db=None, timings=None, crm=None, early_exit: bool = False, rules=None,
+                 dedup=None, sessions=None, max_rewrites: int = 2, rewrite_budget: float = 10.0,
+                 reply_batch: int = None, reply_batch_wait: float = 0.005,
+                 reply_body_tokens: int = 400):
+        """
+        reply_cache: optional memory.reply_cache.ReplyCache. Supervisor-approved
+                     replies are stored there and reused for near-identical emails.
+        memory_db: per-sender memory for the classifier, a dict (default) or
+                   e.g. memory.memory_bank.MemoryBank.
+        timings: optional tools.logging_tools.StageTimings; per-stage wall
+                 time is recorded only when set.
+        crm: optional tools.crm_lookup.CRMLookup. The sender's profile is
+             looked up in the background during intake/classification and
+             passed to DecisionAgent as "customer".
+        early_exit: when the classifier output alone settles escalation
+                    (escalation flag, negative sentiment, high-risk
+                    category), decide right there: no CRM lookup or
+                    decision_input build. Classification still runs in
+                    full (sender memory needs category and sentiment,
+                    every result carries urgency, all from one keyword
+                    scan) and escalations skip reply and supervisor
+                    either way, so without a CRM this saves next to
+                    nothing. With one it is a trade-off: escalations
+                    skip the lookup, but the others only start theirs
+                    after classification instead of overlapping intake
+                    and classification; CRMLookup.prefetch (as
+                    run_batch does) gets that overlap back.
+        rules: tools.rule_store.RuleStore for the classification and
+               routing rules (default: the process-wide store for
+               config/categories.yml, reloaded when the file changes;
+               pass rule_store(watch=False) in a process that handles one
+               email, to skip the watcher thread).
+               Each email is triaged with one RuleSet from start to end.
+        dedup: optional memory.dedup_index.NearDuplicateIndex. An email
+               whose clean_body is a near-duplicate of a recent email
+               with the same labels reuses its decision (unless there is
+               a CRM or a conversation, as they can change it) and its
+               reply and supervisor verdict. Results carry the cluster_id.
+        sessions: optional memory.session_service.SessionService. Emails
+                  of a known sender are assigned to a conversation by
+                  normalized subject; classification and decision see its
+                  state (message count, previous sentiment) and results
+                  carry the conversation_id.
+        max_rewrites / rewrite_budget: a reply the supervisor sends back
+                  ("rewrite") is regenerated with its reason as feedback,
+                  at most max_rewrites times and only while less than
+                  rewrite_budget seconds have passed since the reply stage
+                  began; if it is still sent back, it goes to a human.
+                  Needs an LLM (templates come out the same): without one,
+                  or with max_rewrites=0, the "rewrite" verdict is kept as
+                  the supervisor gave it. Rewrites overlap other emails'
+                  work only in arun / arun_batch; run() (and so
+                  app/run_batch.py) waits for them email by email. Counted
+                  in rewrite_stats (tools.logging_tools.RewriteStats).
+        reply_batch / reply_batch_wait: in arun / arun_batch, send up to
+                  reply_batch concurrent reply prompts to the LLM in one
+                  call, waiting at most reply_batch_wait seconds for
+                  others to join (ReplyAgent batch_size / batch_wait).
+                  Batch fill and queueing delay: reply_agent.batcher.stats().
+        reply_body_tokens: token budget for the email text (new message,
+                  then quoted history) in LLM reply prompts; prompt sizes
+                  before / after trimming: reply_agent.prompt_builder.stats().
+        """
+        self.rules = rules if rules is not None else rule_store()
+        self._memory_db = memory_db
+        self._llm = llm
+        self._reply_options = {
+            "timeout": reply_timeout, "batch_size": reply_batch, "batch_wait": reply_batch_wait,
+            "body_tokens": reply_body_tokens
+        }
+        self.reply_cache = reply_cache
+        self.timings = timings
+        self.crm = crm
+        self.early_exit = early_exit
+        self.dedup = dedup
+        self.sessions = sessions
+        self.max_rewrites = max_rewrites
+        self.rewrite_budget = rewrite_budget
+        self.rewrite_stats = RewriteStats()
+        # cache key -> future, so concurrent arun calls with the same key
+        # wait for one LLM call instead of each making their own
+        self._pending_replies = {}
+
+    @cached_property
+    def intake(self):
+        from agents.intake_agent import IntakeAgent
+        return IntakeAgent()
+
+    @cached_property
+    def classifier(self):
+        from agents.classification_agent import ClassificationAgent
+        return ClassificationAgent(memory_db=self._memory_db, rules=self.rules)
+
+    @cached_property
+    def decision(self):
+        from agents.decision_agent import DecisionAgent
+        return DecisionAgent(rules=self.rules)
 
-    def run(self, subject: str, body: str, sender: str = "unknown") -> dict:
+    @cached_property
+    def reply_agent(self):
+        from agents.reply_agent import ReplyAgent
+        return ReplyAgent(llm=self._llm, **self._reply_options)
+
+    @cached_property
+    def supervisor(self):
+        from agents.supervisor_agent import SupervisorAgent
+        return SupervisorAgent()
+
+    def _triage(self, subject: str, body: str, sender: str, thread_status: str = None):
         """
-        Run full pipeline on a single email.
+        Intake -> Classification -> Decision. Shared by run and arun.
+        Also returns the dedup lookup (None without dedup).
         """
+        timings = self.timings
+        if timings is not None:
+            start = perf_counter_ns()
+        rules = self.rules.get()
+
+        # Start the CRM lookup now so it overlaps intake/classification;
+        # with early_exit only once the email is known to need it
+        customer_lookup = None
+        if self.crm is not None and sender != "unknown" and not self.early_exit:
+            customer_lookup = self.crm.lookup_async(sender)
 
         # 1. Intake
         intake_output = self.intake.process_email(
             subject=subject,
-            body=body
+            body=body,
+            sender=None if sender == "unknown" else sender,
+            thread_status=thread_status
         )
+        thread = None
+        if self.sessions is not None and sender != "unknown":
+            thread = self.sessions.open(sender, self.intake.normalize_subject(subject))
+        if timings is not None:
+            start = timings.lap("intake", start)
 
         # 2. Classification
         classification_output = self.classifier.process(
             clean_email=intake_output,
-            sender=sender
+            sender=sender,
+            rules=rules,
+            thread=thread
         )
+        if timings is not None:
+            start = timings.lap("classification", start)
+
+        duplicate = None
+        if self.dedup is not None:
+            labels = (
+                rules.version,
+                classification_output.category,
+                classification_output.urgency,
+                classification_output.sentiment,
+                classification_output.needs_escalation
+            )
+            duplicate = self.dedup.lookup(intake_output.clean_body, labels)
+            if timings is not None:
+                start = timings.lap("dedup", start)
+            if duplicate.entry is not None and self.crm is None and thread is None:
+                # Same labels and no customer or conversation context: same decision
+                return intake_output, classification_output, duplicate.entry.value.decision, duplicate
+
+        if self.early_exit:
+            decision_output = self.decision.early_decision(
+                classification_output.category,
+                classification_output.sentiment,
+                classification_output.needs_escalation,
+                rules
+            )
+            if decision_output is not None:
+                if timings is not None:
+                    timings.lap("decision", start)
+                return intake_output, classification_output, decision_output, duplicate
+            if self.crm is not None and sender != "unknown":
+                customer_lookup = self.crm.lookup_async(sender)
 
         # 3. Decision (approve vs escalate_to_human)
         decision_input = {
             "id": intake_output.get("id"),
             "subject": subject,
             "body": body,
-            "category": classification_output.get("category", "general_inquiry"),
-            "urgency": classification_output.get("urgency", "normal"),
-            "sentiment": classification_output.get("sentiment", "calm"),
-            "needs_escalation": classification_output.get("needs_escalation", False),
+            "category": classification_output.category,
+            "urgency": classification_output.urgency,
+            "sentiment": classification_output.sentiment,
+            "needs_escalation": classification_output.needs_escalation,
+            "customer": self._customer(customer_lookup),
+            "thread": thread,
         }
 
-        decision_output = self.decision.decide(decision_input)
-        final_action = decision_output.get("final_action", "escalate_to_human")
+        decision_output = self.decision.decide(decision_input, rules)
+        if timings is not None:
+            timings.lap("decision", start)
 
-        # 4. Reply and Supervisor (only if approved)
-        reply_output = None
-        supervisor_output = None
+        return intake_output, classification_output, decision_output, duplicate
 
-        if final_action == "approve":
+    def _customer(self, lookup):
+        """
+        The CRM profile once the background lookup is done, or None when
+        there is no CRM, the sender is unknown or the lookup failed or
+        took longer than crm.timeout.
+        """
+        if lookup is None:
+            return None
+        try:
+            return lookup.result(timeout=self.crm.timeout)
+        except Exception:
+            return None
+
+    def _reply_cache_key(self, classification_output, intake_output) -> str:
+        tone = self.reply_agent.select_tone(
+            classification_output.sentiment,
+            classification_output.needs_escalation
+        )
+        return self.reply_cache.make_key(
+            classification_output.category,
+            classification_output.sentiment,
+            tone,
+            intake_output.clean_body
+        )
+
+    def _cached_reply(self, key: str, category: str):
+        """
+        Records rebuilt from a cached (reply, supervisor) pair, or (None, None).
+        category is part of the key, so the cached reply was made for it.
+        """
+        cached = self.reply_cache.get(key)
+        if cached is None:
+            return None, None
+
+        reply_output = ReplyRecord.from_dict(cached["reply"], category, generated_by="cache")
+        supervisor_output = SupervisorRecord.from_dict(cached["supervisor"])
+        return reply_output, supervisor_output
+
+    def _store_reply(self, key: str, reply_output: ReplyRecord, supervisor_output: SupervisorRecord):
+        if supervisor_output.action != "approve":
+            return
+        # Don't pin a template fallback in place of a real LLM reply
+        if self.reply_agent.llm is not None and reply_output.generated_by != "llm":
+            return
+        self.reply_cache.put(
+            key, {"reply": reply_output.to_dict(), "supervisor": supervisor_output.to_dict()}
+        )
+
+    def _can_rewrite(self, verdict: SupervisorRecord, attempts: int, deadline_ns: int) -> bool:
+        return (
+            verdict.action == "rewrite"
+            and attempts < self.max_rewrites
+            and self.reply_agent.llm is not None
+            and perf_counter_ns() < deadline_ns
+        )
+
+    def _rewrite(self, classification_output, intake_output, reply_output: ReplyRecord,
+                 verdict: SupervisorRecord, begun_ns: int):
+        """
+        Act on a "rewrite" verdict: regenerate the reply with the
+        supervisor's reason as feedback until the supervisor stops sending
+        it back, within max_rewrites and rewrite_budget (counted from
+        begun_ns, the start of the reply stage). Returns the last reply and
+        verdict; a reply still sent back after a rewrite goes to a human.
+        """
+        start = perf_counter_ns()
+        deadline = begun_ns + int(self.rewrite_budget * 1e9)
+        attempts = 0
+        while self._can_rewrite(verdict, attempts, deadline):
+            attempts += 1
             reply_output = self.reply_agent.generate_reply(
                 classification=classification_output,
-                clean_email=intake_output
+                clean_email=intake_output,
+                feedback=verdict.reason
+            )
+            verdict = self.supervisor.evaluate_reply(
+                classification=classification_output,
+                reply=reply_output
             )
+        return reply_output, self._rewritten(verdict, attempts, start)
 
-            supervisor_output = self.supervisor.evaluate_reply(
+    async def _arewrite(self, classification_output, intake_output, reply_output: ReplyRecord,
+                        verdict: SupervisorRecord, begun_ns: int):
+        """
+        Async version of _rewrite. Each LLM call is also cut off at the
+        end of the budget.
+        """
+        start = perf_counter_ns()
+        deadline = begun_ns + int(self.rewrite_budget * 1e9)
+        attempts = 0
+        while self._can_rewrite(verdict, attempts, deadline):
+            attempts += 1
+            reply_output = await self.reply_agent.agenerate_reply(
+                classification=classification_output,
+                clean_email=intake_output,
+                feedback=verdict.reason,
+                timeout=(deadline - perf_counter_ns()) / 1e9
+            )
+            verdict = self.supervisor.evaluate_reply(
                 classification=classification_output,
                 reply=reply_output
             )
+        return reply_output, self._rewritten(verdict, attempts, start)
 
-        full_result = {
-            "intake": intake_output,
-            "classification": classification_output,
-            "decision": decision_output,
-            "reply": reply_output,
-            "supervisor": supervisor_output
-        }
+    def _rewritten(self, verdict: SupervisorRecord, attempts: int, start_ns: int) -> SupervisorRecord:
+        """
+        Record the rewrites of one email and escalate if they did not
+        get the reply through. With no attempt made (no LLM, rewriting off
+        or no time left), the "rewrite" verdict is returned as it was and
+        the reply counts as not rewritten.
+        """
+        if not attempts:
+            self.rewrite_stats.record()
+            return verdict
+        added = perf_counter_ns() - start_ns
+        self.rewrite_stats.record(attempts, verdict.action == "approve", added)
+        if self.timings is not None:
+            self.timings.lap("rewrite", start_ns)
+        if verdict.action == "rewrite":
+            verdict = self.supervisor.escalate_unfixed(verdict, attempts)
+        return verdict
+
+    @staticmethod
+    def _duplicate_reply(duplicate):
+        """
+        Reply and supervisor records of the near-duplicate found in
+        triage, or (None, None).
+        """
+        if duplicate is None or duplicate.entry is None:
+            return None, None
+        original = duplicate.entry.value
+        return original.reply, original.supervisor
+
+    @staticmethod
+    def _update_thread(classification_output):
+        """
+        Record the email in its conversation once it has been decided, so
+        the decision saw the previous message's labels.
+        """
+        thread = classification_output.thread
+        if thread is not None:
+            thread.update(classification_output.category, classification_output.sentiment)
+
+    def _finish(self, result: PipelineResult) -> PipelineResult:
+        """
+        Set the result's cluster_id and conversation_id; an email with no
+        near-duplicate starts a new cluster.
+        """
+        thread = result.classification.thread
+        if thread is not None:
+            result.conversation_id = thread.conversation_id
+        duplicate = result.duplicate
+        if duplicate is not None:
+            result.duplicate = None
+            if duplicate.entry is not None:
+                result.cluster_id = duplicate.entry.cluster_id
+            elif duplicate.hashes:
+                result.cluster_id = self.dedup.add(duplicate, result)
+        return result
+
+    def triage(self, subject: str, body: str, sender: str = "unknown",
+               thread_status: str = None) -> PipelineResult:
+        """
+        Intake -> Classification -> Decision, the cheap CPU-only stages.
+        Returns a PipelineResult without reply / supervisor; respond()
+        (or arespond()) runs the rest. A scheduler can triage emails as
+        they arrive and respond in another order (see
+        tools/priority_scheduler.py); run() does both at once.
+        """
+        intake_output, classification_output, decision_output, duplicate = self._triage(
+            subject, body, sender, thread_status
+        )
+        self._update_thread(classification_output)
+        result = PipelineResult(intake_output, classification_output, decision_output)
+        result.duplicate = duplicate
+        return result
+
+    def run(self, subject: str, body: str, sender: str = "unknown",
+            thread_status: str = None) -> PipelineResult:
+        """
+        Run full pipeline on a single email.
+        thread_status: "reply"/"single" from mail headers, if known.
+
+        Returns a PipelineResult of per-stage records (agents/records.py);
+        call to_dict() for plain nested dicts.
+        """
+        return self.respond(self.triage(subject, body, sender, thread_status))
+
+    def respond(self, result: PipelineResult) -> PipelineResult:
+        """
+        Reply + Supervisor for a triage() result, if it was approved.
+        Fills in its reply and supervisor and returns it.
+        """
+        intake_output = result.intake
+        classification_output = result.classification
+        duplicate = result.duplicate
+        final_action = result.decision.final_action
+
+        # 4. Reply and Supervisor (only if approved)
+        reply_output = None
+        supervisor_output = None
+
+        if final_action == "approve":
+            timings = self.timings
+            if timings is not None:
+                start = perf_counter_ns()
+
+            reply_output, supervisor_output = self._duplicate_reply(duplicate)
+            cache_key = None
+            if reply_output is None and self.reply_cache is not None:
+                cache_key = self._reply_cache_key(classification_output, intake_output)
+                reply_output, supervisor_output = self._cached_reply(
+                    cache_key, classification_output.category
+                )
+
+            if reply_output is None:
+                begun = perf_counter_ns()
+                reply_output = self.reply_agent.generate_reply(
+                    classification=classification_output,
+                    clean_email=intake_output
+                )
+                if timings is not None:
+                    start = timings.lap("reply", start)
+
+                supervisor_output = self.supervisor.evaluate_reply(
+                    classification=classification_output,
+                    reply=reply_output
+                )
+                if timings is not None:
+                    timings.lap("supervisor", start)
+
+                if supervisor_output.action == "rewrite":
+                    reply_output, supervisor_output = self._rewrite(
+                        classification_output, intake_output, reply_output, supervisor_output, begun
+                    )
+                else:
+                    self.rewrite_stats.record()
+
+                if cache_key is not None:
+                    self._store_reply(cache_key, reply_output, supervisor_output)
+            elif timings is not None:
+                timings.lap("reply", start)
+
+        result.reply = reply_output
+        result.supervisor = supervisor_output
+        return self._finish(result)
+
+    async def arun(self, subject: str, body: str, sender: str = "unknown",
+                   thread_status: str = None) -> PipelineResult:
+        """
+        Async version of run. Only the reply stage awaits (LLM I/O);
+        intake, classification and decision run inline.
+        """
+        return await self.arespond(self.triage(subject, body, sender, thread_status))
+
+    async def arespond(self, result: PipelineResult) -> PipelineResult:
+        """
+        Async version of respond.
+        """
+        # Imported here, not at the top: only async callers need it, and
+        # by the time they get here their event loop has loaded it
+        import asyncio
+
+        intake_output = result.intake
+        classification_output = result.classification
+        duplicate = result.duplicate
+        final_action = result.decision.final_action
+
+        reply_output = None
+        supervisor_output = None
+
+        if final_action == "approve":
+            timings = self.timings
+            if timings is not None:
+                start = perf_counter_ns()
+
+            reply_output, supervisor_output = self._duplicate_reply(duplicate)
+            cache_key = None
+            if reply_output is None and self.reply_cache is not None:
+                cache_key = self._reply_cache_key(classification_output, intake_output)
+                reply_output, supervisor_output = self._cached_reply(
+                    cache_key, classification_output.category
+                )
+
+            pending = self._pending_replies.get(cache_key) if cache_key else None
+            if reply_output is None and pending is not None:
+                await pending
+                reply_output, supervisor_output = self._cached_reply(
+                    cache_key, classification_output.category
+                )
+
+            if reply_output is None:
+                owner = cache_key is not None and cache_key not in self._pending_replies
+                if owner:
+                    pending = asyncio.get_running_loop().create_future()
+                    self._pending_replies[cache_key] = pending
+
+                try:
+                    begun = perf_counter_ns()
+                    reply_output = await self.reply_agent.agenerate_reply(
+                        classification=classification_output,
+                        clean_email=intake_output
+                    )
+                    if timings is not None:
+                        start = timings.lap("reply", start)
+
+                    supervisor_output = self.supervisor.evaluate_reply(
+                        classification=classification_output,
+                        reply=reply_output
+                    )
+                    if timings is not None:
+                        timings.lap("supervisor", start)
+
+                    if supervisor_output.action == "rewrite":
+                        # Awaits like the first draft, so in arun_batch
+                        # other emails move on while this one is rewritten
+                        reply_output, supervisor_output = await self._arewrite(
+                            classification_output, intake_output, reply_output, supervisor_output, begun
+                        )
+                    else:
+                        self.rewrite_stats.record()
+
+                    if cache_key is not None:
+                        self._store_reply(cache_key, reply_output, supervisor_output)
+                finally:
+                    if owner:
+                        del self._pending_replies[cache_key]
+                        pending.set_result(None)
+            elif timings is not None:
+                timings.lap("reply", start)
+
+        result.reply = reply_output
+        result.supervisor = supervisor_output
+        return self._finish(result)
+
+    async def arun_batch(self, emails, concurrency: int = 8) -> list:
+        """
+        Run many emails concurrently, keeping at most `concurrency` emails
+        (and so LLM calls) in flight. emails: iterable of dicts with
+        subject, body and optional sender. Results come back in input order.
+
+        Slots are taken in input order and triage runs before the first
+        await, so per-sender memory and conversations are updated in the
+        same order as run().
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(concurrency)
+        results = []
+        tasks = []
+
+        async def run_one(index: int, email: dict):
+            try:
+                results[index] = await self.arun(
+                    subject=email["subject"],
+                    body=email["body"],
+                    sender=email.get("sender", "unknown"),
+                    thread_status=email.get("thread_status")
+                )
+            finally:
+                semaphore.release()
+
+        for index, email in enumerate(emails):
+            await semaphore.acquire()
+            results.append(None)
+            tasks.append(asyncio.create_task(run_one(index, email)))
+            # Drop finished tasks so only in-flight ones are held
+            if len(tasks) > concurrency * 4:
+                for task in tasks:
+                    if task.done():
+                        task.result()  # surface failures early
+                tasks = [task for task in tasks if not task.done()]
 
-        return full_result
+        await asyncio.gather(*tasks)
+        return results
 
 
 if __name__ == "__main__":
@@ -100,4 +615,4 @@ if __name__ == "__main__":
         sender="customer_123"
     )
 
-    print(json.dumps(result, indent=2))
+    print(json.dumps(result.to_dict(), indent=2))
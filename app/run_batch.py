@@ -1,7 +1,11 @@
+import argparse
 import csv
 import json
 import os
 import sys
+import time
+import zlib
+from itertools import islice
 
 # Make sure project root is on sys.path so we can import 'pipeline'
 CURRENT_DIR = os.path.dirname(__file__)
@@ -10,16 +14,18 @@ if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
 
 from pipeline import EmailSupportPipeline
+from agents.records import PipelineResult, Record
+from tools.logging_tools import RewriteStats, StageTimings
 
 
-def load_emails_from_csv(csv_path: str):
+def iter_emails_from_csv(csv_path: str, extra_columns=()):
     """
-    Load emails from a CSV file.
+    Lazily yield emails from a CSV file, one row at a time.
 
     Automatically handles non-UTF8 encodings like ANSI/Windows-1252.
+    extra_columns: other columns to copy onto each email when the CSV has
+    them (e.g. the gold labels evaluation/eval_pipeline.py scores against).
     """
-    emails = []
-
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"Input CSV file not found: {csv_path}")
 
@@ -36,117 +42,685 @@ def load_emails_from_csv(csv_path: str):
         has_id = "id" in reader.fieldnames
         has_subject = "subject" in reader.fieldnames
         has_body = "body" in reader.fieldnames
+        has_sender = "sender" in reader.fieldnames
+        extra_columns = [c for c in extra_columns if c in reader.fieldnames]
 
         if not has_subject or not has_body:
             raise ValueError("CSV must contain at least 'subject' and 'body' columns.")
 
         for i, row in enumerate(reader, start=1):
             email_id = row["id"] if has_id else str(i)
-            emails.append(
-                {
-                    "id": email_id,
-                    "subject": row["subject"],
-                    "body": row["body"],
-                }
+            email = {
+                "id": email_id,
+                "subject": row["subject"],
+                "body": row["body"],
+            }
+            if has_sender and row["sender"]:
+                email["sender"] = row["sender"]
+            for column in extra_columns:
+                email[column] = row[column]
+            yield email
+
+
+def load_emails_from_csv(csv_path: str):
+    """
+    Load all emails from a CSV file into a list.
+    """
+    return list(iter_emails_from_csv(csv_path))
+
+
+def iter_emails_from_mail(path: str):
+    """
+    Lazily yield emails from raw mail: a Maildir directory or an mbox file.
+    Sender and thread status come from the message headers.
+    """
+    from tools.email_parser import EmailParser
+
+    parser = EmailParser()
+    messages = parser.iter_maildir(path) if os.path.isdir(path) else parser.iter_mbox(path)
+
+    for i, message in enumerate(messages, start=1):
+        email = {
+            "id": message["id"] or str(i),
+            "subject": message["subject"],
+            "body": message["body"],
+            "thread_status": message["thread_status"],
+        }
+        if message["sender"]:
+            email["sender"] = message["sender"]
+        yield email
+
+
+def iter_emails(input_path: str):
+    """
+    CSV files go through iter_emails_from_csv; directories (Maildir) and
+    any other file (mbox) through the raw mail parser.
+    """
+    if not os.path.isdir(input_path) and input_path.lower().endswith(".csv"):
+        return iter_emails_from_csv(input_path)
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"Input mail source not found: {input_path}")
+    return iter_emails_from_mail(input_path)
+
+
+def load_done_ids(jsonl_path: str) -> set:
+    """
+    Ids already written to a JSONL output file, for --resume.
+
+    A partial last line left behind by a crash is cut off, so appending
+    starts on a clean line.
+    """
+    done_ids = set()
+    if not os.path.exists(jsonl_path):
+        return done_ids
+
+    with open(jsonl_path, "r+b") as f:
+        good_end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            good_end += len(line)
+            try:
+                done_ids.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+        f.truncate(good_end)
+
+    return done_ids
+
+
+def flatten_result(email: dict, pipeline_output: PipelineResult) -> dict:
+    """
+    Flatten pipeline output into a single result dict. This is the only
+    place the stage records are turned into a dict.
+    """
+    intake = pipeline_output.intake
+    classification = pipeline_output.classification
+    decision = pipeline_output.decision
+    reply = pipeline_output.reply
+    supervisor = pipeline_output.supervisor
+
+    result = {
+        "id": email["id"],
+        "subject": email["subject"],
+    }
+
+    # Intake fields
+    result["clean_subject"] = intake.clean_subject
+    result["clean_body"] = intake.clean_body
+
+    # Classification fields
+    result["category"] = classification.category
+    result["urgency"] = classification.urgency
+    result["sentiment"] = classification.sentiment
+    result["thread_status"] = classification.thread_status
+    result["needs_escalation"] = classification.needs_escalation
+
+    # Decision fields
+    result["final_action"] = decision.final_action
+    result["decision_reason"] = decision.reason
+    result["decision_confidence"] = decision.confidence
+
+    # Reply and supervisor
+    if reply is not None:
+        if isinstance(reply, (dict, Record)):
+            # Map to the actual keys returned by ReplyAgent
+            result["final_reply"] = (
+                reply.get("reply_text")
+                or reply.get("reply")
+                or reply.get("final_reply")
+                or reply.get("message")
+                or reply.get("content")
+            )
+        else:
+            result["final_reply"] = str(reply)
+    else:
+        result["final_reply"] = ""
+
+    if supervisor is not None:
+        if isinstance(supervisor, (dict, Record)):
+            result["supervisor_decision"] = supervisor.get("decision")
+            result["supervisor_notes"] = (
+                supervisor.get("summary_for_supervisor")
+                or supervisor.get("notes")
             )
+        else:
+            result["supervisor_decision"] = str(supervisor)
+            result["supervisor_notes"] = None
+    else:
+        result["supervisor_decision"] = None
+        result["supervisor_notes"] = None
 
-    return emails
+    # Only set when the pipeline deduplicates / tracks sessions
+    if pipeline_output.cluster_id is not None:
+        result["cluster_id"] = pipeline_output.cluster_id
+    if pipeline_output.conversation_id is not None:
+        result["conversation_id"] = pipeline_output.conversation_id
 
+    return result
 
-def main():
-    # Paths
-    data_dir = os.path.join(PROJECT_ROOT, "data")
-    input_csv = os.path.join(data_dir, "emails.csv")
-    output_json = os.path.join(data_dir, "batch_results.json")
 
-    print(f"Looking for file: {os.path.relpath(input_csv, PROJECT_ROOT)}")
+# Senders looked up in one CRM request while the previous window is processed
+CRM_PREFETCH_WINDOW = 256
+
+
+def make_pipeline(memory_db_path: str = None, timings: StageTimings = None,
+                  crm_source: str = None, early_exit: bool = False,
+                  dedup_threshold: float = None, sessions: bool = False):
+    """
+    Pipeline with a persistent MemoryBank when memory_db_path is given,
+    otherwise the classifier's default in-process dict, CRM lookups
+    when crm_source (SQLite file or http URL) is given, near-duplicate
+    reuse when dedup_threshold (Jaccard similarity) is given, and
+    conversation tracking when sessions is set.
 
-    # Load emails
-    emails = load_emails_from_csv(input_csv)
-    print(f"Loaded {len(emails)} emails from CSV")
+    Optional parts import their modules only when asked for (e.g. the
+    CRM client pulls in http.client), to keep startup short.
+    """
+    memory_db = None
+    if memory_db_path:
+        from memory.memory_bank import MemoryBank
+        memory_db = MemoryBank(memory_db_path)
+    crm = None
+    if crm_source:
+        from tools.crm_lookup import CRMLookup, open_crm_backend
+        crm = CRMLookup(open_crm_backend(crm_source))
+    dedup = None
+    if dedup_threshold:
+        from memory.dedup_index import NearDuplicateIndex
+        dedup = NearDuplicateIndex(threshold=dedup_threshold)
+    session_service = None
+    if sessions:
+        from memory.session_service import SessionService
+        session_service = SessionService()
+    return EmailSupportPipeline(
+        memory_db=memory_db, timings=timings, crm=crm, early_exit=early_exit, dedup=dedup,
+        sessions=session_service
+    )
 
-    # Initialize pipeline
-    pipeline = EmailSupportPipeline()
 
-    results = []
+def make_scheduler(schedule_window: int = None):
+    """
+    PriorityScheduler for process_emails when schedule_window is given,
+    otherwise None (arrival order).
+    """
+    if not schedule_window:
+        return None
+    from tools.priority_scheduler import PriorityScheduler
+    return PriorityScheduler()
+
+
+def flush_memory(pipeline, close: bool = False):
+    memory_db = pipeline.classifier.memory_db
+    if close and hasattr(memory_db, "close"):
+        memory_db.close()
+    elif hasattr(memory_db, "flush"):
+        memory_db.flush()
+
+
+def close_pipeline(pipeline):
+    flush_memory(pipeline, close=True)
+    if pipeline.crm is not None:
+        pipeline.crm.close()
+    if pipeline.dedup is not None:
+        print(pipeline.dedup.report())
+    if pipeline.sessions is not None:
+        print(pipeline.sessions.report())
+    if pipeline.rewrite_stats.rewritten:
+        print(pipeline.rewrite_stats.report())
 
-    for email in emails:
-        subject = email["subject"]
-        body = email["body"]
-        sender = email.get("sender", "unknown")
 
-        print(f"Processing email id={email['id']} subject={subject!r}")
-        pipeline_output = pipeline.run(
-            subject=subject,
-            body=body,
-            sender=sender
+def prefetch_customers(pipeline, emails, window: int = CRM_PREFETCH_WINDOW):
+    """
+    Yield emails unchanged, looking up the senders of the next `window`
+    emails in one background CRM request while the current ones run.
+    """
+    crm = pipeline.crm
+    if crm is None:
+        yield from emails
+        return
+
+    emails = iter(emails)
+    batch = list(islice(emails, window))
+    crm.prefetch(_known_senders(batch))
+    while batch:
+        next_batch = list(islice(emails, window))
+        if next_batch:
+            crm.prefetch(_known_senders(next_batch))
+        yield from batch
+        batch = next_batch
+
+
+def _known_senders(emails: list) -> set:
+    return {e["sender"] for e in emails if e.get("sender", "unknown") != "unknown"}
+
+
+def process_email(pipeline, email: dict) -> dict:
+    pipeline_output = pipeline.run(
+        subject=email["subject"],
+        body=email["body"],
+        sender=email.get("sender", "unknown"),
+        thread_status=email.get("thread_status")
+    )
+    return flatten_result(email, pipeline_output)
+
+
+def process_emails(pipeline, emails, scheduler: "PriorityScheduler" = None, window: int = 256):
+    """
+    Yield (position, email, result) for every email of the iterable.
+
+    Without a scheduler, emails run one by one in input order. With one,
+    each email is triaged as it is read (so per-sender memory and
+    conversations still see input order); approved ones then wait in the
+    scheduler for their reply + supervisor, and once `window` are waiting
+    the most pressing one goes next. Escalated emails need no reply and
+    come out at once. Time-to-reply counts from when an email was read.
+    """
+    if scheduler is None:
+        for position, email in enumerate(emails):
+            yield position, email, process_email(pipeline, email)
+        return
+
+    for position, email in enumerate(emails):
+        triaged = pipeline.triage(
+            subject=email["subject"],
+            body=email["body"],
+            sender=email.get("sender", "unknown"),
+            thread_status=email.get("thread_status")
         )
+        if triaged.decision.final_action != "approve":
+            yield position, email, flatten_result(email, pipeline.respond(triaged))
+            continue
+        scheduler.push((position, email, triaged), triaged.classification.urgency)
+        if len(scheduler) >= window:
+            yield _respond_next(pipeline, scheduler)
 
-        intake = pipeline_output.get("intake") or {}
-        classification = pipeline_output.get("classification") or {}
-        decision = pipeline_output.get("decision") or {}
-        reply = pipeline_output.get("reply")
-        supervisor = pipeline_output.get("supervisor")
+    while len(scheduler):
+        yield _respond_next(pipeline, scheduler)
 
-        # Flatten pipeline output into a single result dict
-        result = {
-            "id": email["id"],
-            "subject": subject,
-        }
 
-        # Intake fields
-        result["clean_subject"] = intake.get("clean_subject")
-        result["clean_body"] = intake.get("clean_body")
-
-        # Classification fields
-        result["category"] = classification.get("category")
-        result["urgency"] = classification.get("urgency")
-        result["sentiment"] = classification.get("sentiment")
-        result["thread_status"] = classification.get("thread_status")
-        result["needs_escalation"] = classification.get("needs_escalation")
-
-        # Decision fields
-        result["final_action"] = decision.get("final_action")
-        result["decision_reason"] = decision.get("reason")
-        result["decision_confidence"] = decision.get("confidence")
-
-        # Reply and supervisor
-        if reply is not None:
-            if isinstance(reply, dict):
-                # Map to the actual keys returned by ReplyAgent
-                result["final_reply"] = (
-                    reply.get("reply_text")
-                    or reply.get("reply")
-                    or reply.get("final_reply")
-                    or reply.get("message")
-                    or reply.get("content")
-                )
-            else:
-                result["final_reply"] = str(reply)
+def _respond_next(pipeline, scheduler: "PriorityScheduler"):
+    entry = scheduler.pop()
+    position, email, triaged = entry.item
+    result = flatten_result(email, pipeline.respond(triaged))
+    scheduler.done(entry)
+    return position, email, result
+
+
+def shard_emails(emails: list, n_chunks: int) -> list:
+    """
+    Split emails into chunks of (index, email) pairs for the worker pool.
+
+    Every email of a known sender lands in the same chunk, in input order,
+    so one pipeline sees that sender's whole history and per-sender memory
+    matches a serial run. Emails without a sender share no history and are
+    split into contiguous ranges.
+    """
+    chunks = [[] for _ in range(n_chunks)]
+    total = len(emails)
+
+    for index, email in enumerate(emails):
+        sender = email.get("sender", "unknown")
+        if sender == "unknown":
+            bucket = index * n_chunks // total
         else:
-            result["final_reply"] = ""
-
-        if supervisor is not None:
-            if isinstance(supervisor, dict):
-                result["supervisor_decision"] = supervisor.get("decision")
-                result["supervisor_notes"] = (
-                    supervisor.get("summary_for_supervisor")
-                    or supervisor.get("notes")
-                )
-            else:
-                result["supervisor_decision"] = str(supervisor)
-                result["supervisor_notes"] = None
+            bucket = zlib.crc32(sender.encode("utf-8")) % n_chunks
+        chunks[bucket].append((index, email))
+
+    return [chunk for chunk in chunks if chunk]
+
+
+# One warm pipeline per worker process
+_worker_pipeline = None
+
+
+def _init_worker(memory_db_path: str = None, with_timings: bool = False,
+                 crm_source: str = None, early_exit: bool = False,
+                 dedup_threshold: float = None, sessions: bool = False):
+    global _worker_pipeline
+    _worker_pipeline = make_pipeline(
+        memory_db_path, timings=StageTimings() if with_timings else None,
+        crm_source=crm_source, early_exit=early_exit, dedup_threshold=dedup_threshold,
+        sessions=sessions
+    )
+
+
+def _run_chunk(chunk: list):
+    crm = _worker_pipeline.crm
+    if crm is not None:
+        # One CRM request for the whole chunk
+        crm.prefetch(_known_senders([email for _, email in chunk]))
+    results = [(index, process_email(_worker_pipeline, email)) for index, email in chunk]
+    # Worker processes get no shutdown hook, so write memory per chunk
+    flush_memory(_worker_pipeline)
+
+    # Hand this chunk's timings and rewrite counts to the parent and start fresh
+    timings = _worker_pipeline.timings
+    if timings is not None:
+        _worker_pipeline.timings = StageTimings()
+    rewrites = _worker_pipeline.rewrite_stats
+    _worker_pipeline.rewrite_stats = RewriteStats()
+    return results, timings, rewrites
+
+
+def run_serial(emails: list, memory_db_path: str = None, timings: StageTimings = None,
+               crm_source: str = None, early_exit: bool = False,
+               dedup_threshold: float = None, sessions: bool = False,
+               schedule_window: int = None) -> list:
+    """
+    Results in input order. With schedule_window, replies are made in
+    priority order (see process_emails).
+    """
+    pipeline = make_pipeline(
+        memory_db_path, timings=timings, crm_source=crm_source, early_exit=early_exit,
+        dedup_threshold=dedup_threshold, sessions=sessions
+    )
+    scheduler = make_scheduler(schedule_window)
+
+    def read():
+        for email in prefetch_customers(pipeline, emails):
+            print(f"Processing email id={email['id']} subject={email['subject']!r}")
+            yield email
+
+    results = [None] * len(emails)
+    for position, _, result in process_emails(pipeline, read(), scheduler, schedule_window):
+        results[position] = result
+
+    close_pipeline(pipeline)
+    if scheduler is not None:
+        print(scheduler.report())
+    return results
+
+
+def run_parallel(emails: list, workers: int, memory_db_path: str = None,
+                 timings: StageTimings = None, crm_source: str = None,
+                 early_exit: bool = False, dedup_threshold: float = None,
+                 sessions: bool = False) -> list:
+    """
+    Run emails on a process pool and merge results back in input order.
+
+    Each worker keeps its own dedup index, so near-duplicates only match
+    within a worker's chunks. Conversations follow their sender into one
+    chunk, so they are the same as in a serial run, but conversation ids
+    are numbered per worker.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    results = [None] * len(emails)
+    chunks = shard_emails(emails, n_chunks=workers * 4)
+    rewrites = RewriteStats()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(
+            memory_db_path, timings is not None, crm_source, early_exit, dedup_threshold, sessions
+        )
+    ) as pool:
+        futures = [pool.submit(_run_chunk, chunk) for chunk in chunks]
+        for done, future in enumerate(as_completed(futures), start=1):
+            chunk_results, chunk_timings, chunk_rewrites = future.result()
+            for index, result in chunk_results:
+                results[index] = result
+            if timings is not None:
+                timings.merge(chunk_timings)
+            rewrites.merge(chunk_rewrites)
+            print(f"Finished chunk {done}/{len(chunks)}")
+
+    if rewrites.rewritten:
+        print(rewrites.report())
+
+    return results
+
+
+def run_streaming(emails, output_path: str, done_ids: set = None, flush_every: int = 100,
+                  memory_db_path: str = None, timings: StageTimings = None,
+                  crm_source: str = None, early_exit: bool = False,
+                  dedup_threshold: float = None, sessions: bool = False,
+                  schedule_window: int = None):
+    """
+    Stream emails through the pipeline and write one JSONL line per result.
+
+    Nothing is accumulated in memory, and the file is flushed every
+    flush_every results so a crash loses at most that many. With
+    schedule_window, lines come in the order replies were made (see
+    process_emails); at most that many triaged emails are held.
+    """
+    pipeline = make_pipeline(
+        memory_db_path, timings=timings, crm_source=crm_source, early_exit=early_exit,
+        dedup_threshold=dedup_threshold, sessions=sessions
+    )
+    done_ids = done_ids or set()
+    mode = "a" if done_ids else "w"
+
+    scheduler = make_scheduler(schedule_window)
+
+    written = 0
+    skipped = 0
+
+    def pending():
+        nonlocal skipped
+        for email in prefetch_customers(pipeline, emails):
+            if email["id"] in done_ids:
+                skipped += 1
+                continue
+            yield email
+
+    with open(output_path, mode, encoding="utf-8") as out:
+        for _, email, result in process_emails(pipeline, pending(), scheduler, schedule_window):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            written += 1
+
+            if written % flush_every == 0:
+                out.flush()
+                print(f"Processed {written} emails (last id={email['id']})")
+
+    close_pipeline(pipeline)
+    if scheduler is not None:
+        print(scheduler.report())
+    return written, skipped
+
+
+def run_parquet(emails, output_path: str, row_group_size: int = 10000,
+                memory_db_path: str = None, timings: StageTimings = None,
+                crm_source: str = None, early_exit: bool = False,
+                dedup_threshold: float = None, sessions: bool = False,
+                schedule_window: int = None) -> int:
+    """
+    Stream emails through the pipeline into a Parquet file, writing a row
+    group every row_group_size results (in reply order with
+    schedule_window, see process_emails).
+    """
+    from tools.parquet_writer import ParquetResultWriter
+
+    pipeline = make_pipeline(
+        memory_db_path, timings=timings, crm_source=crm_source, early_exit=early_exit,
+        dedup_threshold=dedup_threshold, sessions=sessions
+    )
+
+    scheduler = make_scheduler(schedule_window)
+
+    with ParquetResultWriter(output_path, row_group_size=row_group_size) as out:
+        row_groups = 0
+        emails = prefetch_customers(pipeline, emails)
+        for _, email, result in process_emails(pipeline, emails, scheduler, schedule_window):
+            out.write(result)
+            if out.row_groups != row_groups:
+                row_groups = out.row_groups
+                print(f"Wrote row group {row_groups} ({out.rows_written} emails, last id={email['id']})")
+        out.flush()
+        count = out.rows_written
+
+    close_pipeline(pipeline)
+    if scheduler is not None:
+        print(scheduler.report())
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the email pipeline over a CSV batch.")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of worker processes (default: 1, serial)."
+    )
+    parser.add_argument(
+        "--format", choices=["json", "jsonl", "parquet"], default="json",
+        help=(
+            "json: one indented array at the end. jsonl: stream one line per email. "
+            "parquet: stream typed columns in row groups (needs pyarrow)."
+        )
+    )
+    parser.add_argument(
+        "--input",
+        help="Input CSV, mbox file or Maildir directory (default: data/emails.csv)."
+    )
+    parser.add_argument("--output", help="Output file (default: data/batch_results.<format>).")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="jsonl only: skip ids already in the output file and append."
+    )
+    parser.add_argument(
+        "--flush-every", type=int, default=100,
+        help="jsonl only: flush the output after this many emails."
+    )
+    parser.add_argument(
+        "--row-group-size", type=int, default=10000,
+        help="parquet only: results per row group."
+    )
+    parser.add_argument(
+        "--memory-db",
+        help="SQLite file for persistent per-sender memory (default: in-process dict)."
+    )
+    parser.add_argument(
+        "--crm",
+        help="CRM for customer tier / open tickets: SQLite file or http(s) URL (default: none)."
+    )
+    parser.add_argument(
+        "--early-exit", action="store_true",
+        help=(
+            "Only helps with --crm: escalations settled by the classifier output skip their CRM "
+            "lookup, while other emails start theirs after classification instead of overlapping "
+            "it (prefetching hides that here). Same results."
+        )
+    )
+    parser.add_argument(
+        "--dedup", type=float, nargs="?", const=0.8, metavar="THRESHOLD",
+        help=(
+            "Reuse the results of a recent near-duplicate email (Jaccard similarity "
+            ">= THRESHOLD, default 0.8) and add a cluster_id column."
+        )
+    )
+    parser.add_argument(
+        "--sessions", action="store_true",
+        help=(
+            "Group each sender's emails into conversations by subject (Re:/Fw: stripped), "
+            "use their state in routing and add a conversation_id column."
+        )
+    )
+    parser.add_argument(
+        "--schedule", type=int, nargs="?", const=256, metavar="WINDOW",
+        help=(
+            "Triage up to WINDOW emails ahead (default 256) and reply to them by urgency "
+            "deadline instead of input order; prints time-to-reply per urgency."
+        )
+    )
+    parser.add_argument(
+        "--timings", action="store_true",
+        help="Record per-stage latency and print p50/p95/p99 at the end."
+    )
+    parser.add_argument(
+        "--timings-out",
+        help="Also export stage latencies (.prom: Prometheus text, otherwise JSON). Implies --timings."
+    )
+    args = parser.parse_args()
+
+    if args.format != "json" and args.workers > 1:
+        parser.error("--workers is only supported with --format json")
+    if args.schedule and args.workers > 1:
+        parser.error("--schedule is only supported with --workers 1")
+    if args.resume and args.format != "jsonl":
+        parser.error("--resume requires --format jsonl")
+
+    # Paths
+    data_dir = os.path.join(PROJECT_ROOT, "data")
+    input_csv = args.input or os.path.join(data_dir, "emails.csv")
+    output_path = args.output or os.path.join(data_dir, f"batch_results.{args.format}")
+
+    timings = StageTimings() if (args.timings or args.timings_out) else None
+
+    print(f"Looking for file: {os.path.relpath(input_csv, PROJECT_ROOT)}")
+
+    start = time.perf_counter()
+    if args.format == "jsonl":
+        done_ids = load_done_ids(output_path) if args.resume else set()
+        if done_ids:
+            print(f"Resuming: {len(done_ids)} emails already in output")
+
+        count, skipped = run_streaming(
+            iter_emails(input_csv),
+            output_path,
+            done_ids=done_ids,
+            flush_every=args.flush_every,
+            memory_db_path=args.memory_db,
+            timings=timings,
+            crm_source=args.crm,
+            early_exit=args.early_exit,
+            dedup_threshold=args.dedup,
+            sessions=args.sessions,
+            schedule_window=args.schedule
+        )
+        elapsed = time.perf_counter() - start
+        print(f"\nBatch processing completed. Wrote {count} results ({skipped} skipped) to {os.path.relpath(output_path, PROJECT_ROOT)}")
+    elif args.format == "parquet":
+        count = run_parquet(
+            iter_emails(input_csv),
+            output_path,
+            row_group_size=args.row_group_size,
+            memory_db_path=args.memory_db,
+            timings=timings,
+            crm_source=args.crm,
+            early_exit=args.early_exit,
+            dedup_threshold=args.dedup,
+            sessions=args.sessions,
+            schedule_window=args.schedule
+        )
+        elapsed = time.perf_counter() - start
+        print(f"\nBatch processing completed. Wrote {count} results to {os.path.relpath(output_path, PROJECT_ROOT)}")
+    else:
+        # Load emails
+        emails = list(iter_emails(input_csv))
+        print(f"Loaded {len(emails)} emails")
+
+        if args.workers > 1:
+            results = run_parallel(
+                emails, args.workers, memory_db_path=args.memory_db, timings=timings,
+                crm_source=args.crm, early_exit=args.early_exit, dedup_threshold=args.dedup,
+                sessions=args.sessions
+            )
         else:
-            result["supervisor_decision"] = None
-            result["supervisor_notes"] = None
+            results = run_serial(
+                emails, memory_db_path=args.memory_db, timings=timings, crm_source=args.crm,
+                early_exit=args.early_exit, dedup_threshold=args.dedup, sessions=args.sessions,
+                schedule_window=args.schedule
+            )
+        elapsed = time.perf_counter() - start
+
+        # Save batch results
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
 
-        results.append(result)
+        count = len(results)
+        print(f"\nBatch processing completed. Saved {count} results to {os.path.relpath(output_path, PROJECT_ROOT)}")
 
-    # Save batch results
-    with open(output_json, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    rate = count / elapsed if elapsed > 0 else float("inf")
+    print(f"Throughput: {rate:.1f} emails/sec ({elapsed:.2f}s, workers={args.workers})")
 
-    print(f"\nBatch processing completed. Saved {len(results)} results to {os.path.relpath(output_json, PROJECT_ROOT)}")
+    if timings is not None:
+        print("\nStage latency:")
+        print(timings.report())
+        if args.timings_out:
+            timings.export(args.timings_out)
+            print(f"Saved stage latency to {args.timings_out}")
 
 
 if __name__ == "__main__":
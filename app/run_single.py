@@ -1,10 +1,12 @@
 import json
 from pipeline import EmailSupportPipeline
+from tools.rule_store import rule_store
 
 
 
 if __name__ == "__main__":
-    pipeline = EmailSupportPipeline()
+    # One email and exit: no rules watcher thread
+    pipeline = EmailSupportPipeline(rules=rule_store(watch=False))
 
     test_email_subject = "Issue with my latest invoice"
     test_email_body = (
@@ -17,7 +19,7 @@ if __name__ == "__main__":
         subject=test_email_subject,
         body=test_email_body,
         sender="customer_123"
-    )
+    ).to_dict()
 
     # Pretty print pipeline stages
     print("=== INTAKE ===")
@@ -0,0 +1,163 @@
+"""
+Benchmark: KeywordMatcher vs the old chain of `in` substring scans in
+ClassificationAgent, on bodies from 1 KB to 1 MB, plus the compiled
+single-pass path vs per-phrase scans for rule sets of growing size.
+
+Run from the project root:
+    python benchmarks/bench_classification.py
+"""
+import os
+import random
+import sys
+import time
+
+# Make sure project root is on sys.path so we can import 'agents'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from agents.classification_agent import ClassificationAgent
+from tools.keyword_matcher import KeywordMatcher
+from tools.rule_store import rule_store
+
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+RULE_SET_SIZES = [50, 200, 1_000, 4_000]
+
+SAMPLES = {
+    "neutral": "Please send over the updated terms for the account we discussed last week. ",
+    "billing": "Hi, there is an extra charge on my invoice. Kind regards. ",
+    "angry": "This is the third time I write. Unacceptable, fix this now. ",
+}
+
+
+def legacy_labels(text: str):
+    """
+    Old per-detector scans, kept here as the reference for equivalence.
+    """
+    rules = rule_store().get()
+
+    low = text.lower()
+    if "invoice" in low or "subscription" in low or "charge" in low:
+        category = "billing"
+    elif "refund" in low or "return" in low:
+        category = "refund"
+    elif "not working" in low or "error" in low or "crash" in low:
+        category = "technical_issue"
+    elif "disappointed" in low or "complaint" in low or "poor service" in low:
+        category = "complaint"
+    else:
+        category = "general_inquiry"
+
+    low = text.lower()
+    sentiment = "neutral"
+    for label, keywords in rules.sentiment_keywords.items():
+        if any(word in low for word in keywords):
+            sentiment = label
+            break
+
+    low = text.lower()
+    if "as soon as possible" in low or "urgent" in low or "fix today" in low:
+        urgency = "high"
+    elif "not urgent" in low or "whenever you can" in low:
+        urgency = "low"
+    else:
+        urgency = "normal"
+
+    low = text.lower()
+    escalation = sentiment in ["angry", "frustrated"] or any(
+        keyword in low for keyword in rules.escalation_triggers
+    )
+
+    return category, sentiment, urgency, escalation
+
+
+def new_labels(agent: ClassificationAgent, text: str):
+    hits = agent.scan(text)
+    sentiment = agent.detect_sentiment(text, hits)
+    return (
+        agent.detect_category(text, hits),
+        sentiment,
+        agent.detect_urgency(text, hits),
+        agent.check_escalation(text, sentiment, hits),
+    )
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def synthetic_tables(n_phrases: int, labels: int = 10) -> dict:
+    """
+    Rule tables with n_phrases random two-word keywords spread over labels.
+    """
+    rng = random.Random(n_phrases)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+
+    def word():
+        return "".join(rng.choice(letters) for _ in range(rng.randint(4, 9)))
+
+    table = {f"label_{i}": [] for i in range(labels)}
+    for i in range(n_phrases):
+        table[f"label_{i % labels}"].append(f"{word()} {word()}")
+    return {"rules": table}
+
+
+def bench_rule_set_sizes(text: str):
+    print(f"\n{'phrases':>10}{'per-phrase ms':>16}{'compiled ms':>14}{'speedup':>10}")
+    for n_phrases in RULE_SET_SIZES:
+        tables = synthetic_tables(n_phrases)
+        lazy = KeywordMatcher(tables, compile_threshold=n_phrases + 1)
+        compiled = KeywordMatcher(tables, compile_threshold=0)
+
+        # Ask for every label, which forces a full scan on both paths
+        def labels(matcher):
+            hits = matcher.scan(text)
+            return [tag in hits for tag in sorted(matcher.tags)]
+
+        assert labels(lazy) == labels(compiled), n_phrases
+
+        per_phrase = best_of(lambda: labels(lazy), 3)
+        single = best_of(lambda: labels(compiled), 3)
+        print(
+            f"{n_phrases:>10}{per_phrase * 1000:>16.3f}"
+            f"{single * 1000:>14.3f}{per_phrase / single:>9.2f}x"
+        )
+
+
+def main():
+    agent = ClassificationAgent()
+
+    matcher = agent.rules.get().matcher
+    print(f"ClassificationAgent tables: {len(matcher.phrases)} phrases, "
+          f"compiled={matcher.compiled}\n")
+    print(f"{'sample':<10}{'size':>10}{'legacy ms':>12}{'matcher ms':>12}{'speedup':>10}")
+    for name, chunk in SAMPLES.items():
+        for size in SIZES:
+            # Put the signal at the end so early-exit scans still walk the body
+            filler = SAMPLES["neutral"] * (size // len(SAMPLES["neutral"]) + 1)
+            text = (filler[: size - len(chunk)] + chunk) if name != "neutral" else filler[:size]
+
+            assert legacy_labels(text) == new_labels(agent, text), (name, size)
+
+            repeat = 20 if size <= 100_000 else 5
+            legacy = best_of(lambda: legacy_labels(text), repeat)
+            single = best_of(lambda: new_labels(agent, text), repeat)
+            print(
+                f"{name:<10}{size:>10}{legacy * 1000:>12.3f}"
+                f"{single * 1000:>12.3f}{legacy / single:>9.2f}x"
+            )
+
+    filler = SAMPLES["neutral"] * (1_000_000 // len(SAMPLES["neutral"]) + 1)
+    bench_rule_set_sizes(filler[:1_000_000].lower())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: ClassificationAgent.classify_batch vs the per-email path on
+the same clean bodies, with a check that the labels are identical.
+
+Run from the project root:
+    python benchmarks/bench_classify_batch.py [--emails 100000] [--body-length 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Make sure project root is on sys.path so we can import 'agents'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from agents.classification_agent import ClassificationAgent
+from agents.intake_agent import IntakeAgent
+from benchmarks.corpus import generate_corpus
+
+
+def per_email(agent: ClassificationAgent, bodies: list) -> dict:
+    columns = {"category": [], "sentiment": [], "urgency": [], "needs_escalation": []}
+    for body in bodies:
+        result = agent.process({"clean_body": body, "thread_status": "single"})
+        for name, column in columns.items():
+            column.append(result[name])
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=100000)
+    parser.add_argument("--body-length", type=int, default=None)
+    args = parser.parse_args()
+
+    intake = IntakeAgent()
+    bodies = [
+        intake.process_email(email["subject"], email["body"])["clean_body"]
+        for email in generate_corpus(args.emails, body_length=args.body_length)
+    ]
+
+    start = time.perf_counter()
+    expected = per_email(ClassificationAgent(), bodies)
+    per_email_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = ClassificationAgent().classify_batch(bodies)
+    batch_s = time.perf_counter() - start
+
+    assert batch == expected, "classify_batch labels differ from the per-email path"
+
+    print(f"{'path':<14}{'seconds':>10}{'emails/sec':>14}")
+    print(f"{'per-email':<14}{per_email_s:>10.3f}{len(bodies) / per_email_s:>14.0f}")
+    print(f"{'batch':<14}{batch_s:>10.3f}{len(bodies) / batch_s:>14.0f}")
+    print(f"speedup: {per_email_s / batch_s:.2f}x (labels identical)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: CRM lookups in the batch pipeline against the fake HTTP CRM.
+
+Runs the same corpus three ways and reports throughput and CRM requests:
+  - no CRM
+  - per-email: one uncached request per email (lookup still overlaps
+    intake/classification)
+  - batched: TTL + negative cache, one request per prefetch window
+
+Run from the project root:
+    python benchmarks/bench_crm.py --emails 20000 --latency 0.002
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Make sure project root and app/ are on sys.path, like run_batch.py
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+for path in (PROJECT_ROOT, os.path.join(PROJECT_ROOT, "app")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from run_batch import make_pipeline, prefetch_customers, process_email
+from benchmarks.corpus import generate_corpus, load_templates
+from benchmarks.fake_crm import FakeCRMServer, build_crm_db
+from tools.crm_lookup import CRMLookup, HTTPCRM
+
+
+def run(emails, crm=None, prefetch=False):
+    pipeline = make_pipeline()
+    pipeline.crm = crm
+
+    start = time.perf_counter()
+    stream = prefetch_customers(pipeline, emails) if prefetch else emails
+    actions = [process_email(pipeline, email)["final_action"] for email in stream]
+    elapsed = time.perf_counter() - start
+
+    if crm is not None:
+        crm.close()
+    return elapsed, actions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CRM lookup benchmark.")
+    parser.add_argument("--emails", type=int, default=20000)
+    parser.add_argument("--senders", type=int, default=None, help="Sender pool size (default: emails // 10).")
+    parser.add_argument("--latency", type=float, default=0.002, help="Fake CRM seconds per request.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    templates = load_templates()
+    emails = list(generate_corpus(
+        args.emails, seed=args.seed, n_senders=args.senders, templates=templates
+    ))
+    n_senders = args.senders or max(1, args.emails // 10)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "crm.db")
+        build_crm_db(db_path, n_senders, seed=args.seed)
+
+        with FakeCRMServer(db_path, latency=args.latency) as server:
+            rows = []
+
+            elapsed, baseline = run(emails)
+            rows.append(("no CRM", elapsed, 0, None))
+
+            modes = (
+                ("per-email", dict(ttl_seconds=0, negative_ttl_seconds=0), False),
+                ("batched+cached", {}, True),
+            )
+            for name, cache_args, prefetch in modes:
+                server.requests = 0
+                crm = CRMLookup(HTTPCRM(server.url), **cache_args)
+                elapsed, actions = run(emails, crm, prefetch=prefetch)
+                rows.append((name, elapsed, server.requests, crm.stats()["hit_rate"]))
+                changed = sum(a != b for a, b in zip(actions, baseline))
+                print(f"{name}: {changed} emails escalated on CRM signals")
+
+    print(f"\n{'mode':<18}{'seconds':>10}{'emails/sec':>12}{'requests':>10}{'hit rate':>10}")
+    for name, elapsed, requests, hit_rate in rows:
+        hit = f"{hit_rate:.1%}" if hit_rate is not None else "-"
+        print(f"{name:<18}{elapsed:>10.3f}{len(emails) / elapsed:>12.0f}{requests:>10}{hit:>10}")
+
+
+if __name__ == "__main__":
+    main()
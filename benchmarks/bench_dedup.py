@@ -0,0 +1,182 @@
+"""
+Benchmark: near-duplicate reuse (memory/dedup_index.py) during an
+incident, when a large share of the inbox is the same few reports.
+
+The corpus mixes regular emails (benchmarks/corpus.py) with incident
+reports: a handful of base texts, each copy with its own greeting,
+sign-off, order / version numbers and a few words added or dropped.
+It runs through the pipeline (with a fake LLM) without dedup and then
+with dedup at each threshold, reporting throughput, LLM calls, hit rate
+and lookup cost. Dedup only reuses results across emails with the same
+labels, so results must match the run without it.
+
+A second table shows lookup cost as the index grows, with unrelated
+emails filling it.
+
+Run from the project root:
+    python benchmarks/bench_dedup.py
+    python benchmarks/bench_dedup.py --emails 20000 --incident-share 0.7 --thresholds 0.6 0.7 0.8 0.9
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Make sure project root and app/ are on sys.path, like run_batch.py
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+for path in (PROJECT_ROOT, os.path.join(PROJECT_ROOT, "app")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from pipeline import EmailSupportPipeline
+from run_batch import flatten_result
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_llm import FakeLLM
+from memory.dedup_index import NearDuplicateIndex
+from tools.logging_tools import LatencyHistogram
+
+INCIDENTS = [
+    (
+        "App not working",
+        "The app keeps crashing as soon as I open the dashboard since this morning. "
+        "I already reinstalled it on my phone and it is still not working. "
+        "I have a presentation later today so I need this fixed."
+    ),
+    (
+        "Payment failed",
+        "I tried to pay my invoice three times today and the payment page shows an error "
+        "every time. My card works everywhere else. Can you tell me what is going on "
+        "with the payment system?"
+    ),
+    (
+        "Cannot log in",
+        "Since the update last night I cannot log in to my account. The login page just "
+        "reloads after I enter my password and nothing happens. I reset my password "
+        "twice already and it did not help."
+    ),
+    (
+        "Sync broken",
+        "My data is not syncing between the web app and the mobile app anymore. Changes I "
+        "make on my laptop never show up on my phone. Is there an outage right now?"
+    ),
+]
+GREETINGS = ["Hi,", "Hello,", "Hi team,", "Dear support,", "Hey there,", ""]
+SIGN_OFFS = ["Thanks", "Thank you", "Regards", "Best regards", "Cheers", ""]
+NAMES = ["Anna", "Ben", "Carla", "Dev", "Emre", "Fatima", "Gil", "Hana", "Ivan", "Jo"]
+FILLERS = ["really", "please", "again", "now", "just", "also", "still", "urgently"]
+
+
+def incident_report(rng: random.Random) -> dict:
+    subject, body = rng.choice(INCIDENTS)
+    words = body.split()
+    for _ in range(rng.randint(0, 3)):
+        i = rng.randrange(len(words))
+        if rng.random() < 0.5:
+            del words[i]
+        else:
+            words.insert(i, rng.choice(FILLERS))
+    parts = [
+        rng.choice(GREETINGS),
+        " ".join(words),
+        f"Order {rng.randint(10000, 99999)}, app version {rng.randint(1, 9)}.{rng.randint(0, 20)}.",
+        f"{rng.choice(SIGN_OFFS)} {rng.choice(NAMES)}",
+    ]
+    return {"subject": subject, "body": " ".join(p for p in parts if p)}
+
+
+def incident_corpus(n_emails: int, incident_share: float, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    regular = generate_corpus(n_emails, seed=seed)
+    emails = []
+    for email in regular:
+        if rng.random() < incident_share:
+            email = dict(incident_report(rng), id=email["id"], sender=email["sender"])
+        emails.append(email)
+    return emails
+
+
+def run(emails: list, llm_latency: float, threshold: float = None):
+    llm = FakeLLM(latency=llm_latency)
+    dedup = NearDuplicateIndex(threshold=threshold) if threshold else None
+    pipeline = EmailSupportPipeline(llm=llm, dedup=dedup)
+
+    start = time.perf_counter()
+    results = []
+    for email in emails:
+        output = pipeline.run(subject=email["subject"], body=email["body"], sender=email["sender"])
+        results.append(flatten_result(email, output))
+    elapsed = time.perf_counter() - start
+    return elapsed, results, llm.calls, dedup
+
+
+def bench_index_size(sizes: list, seed: int = 0):
+    """
+    Lookup cost with `size` unrelated emails in the index.
+    """
+    rng = random.Random(seed)
+    vocabulary = [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+        for _ in range(5000)
+    ]
+
+    def text():
+        return " ".join(rng.choice(vocabulary) for _ in range(rng.randint(20, 80)))
+
+    print(f"\n{'indexed':>8}{'lookup mean us':>16}{'p99 us':>9}{'candidates':>12}")
+    probes = [text() for _ in range(2000)]
+    for size in sizes:
+        index = NearDuplicateIndex(max_entries=size, window_seconds=float("inf"))
+        for _ in range(size):
+            index.add(index.lookup(text()), None)
+        # Count the probes only
+        index.lookup_latency = LatencyHistogram()
+        index.hits = index.misses = index.candidates = 0
+        for probe in probes:
+            index.lookup(probe)
+        s = index.stats()
+        print(
+            f"{size:>8}{s['lookup_mean_us']:>16.1f}{s['lookup_p99_us']:>9.1f}"
+            f"{s['candidates_per_lookup']:>12.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate reuse benchmark.")
+    parser.add_argument("--emails", type=int, default=10000)
+    parser.add_argument("--incident-share", type=float, default=0.6)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.9])
+    parser.add_argument("--llm-latency", type=float, default=0.001, help="Seconds per fake LLM call.")
+    parser.add_argument("--index-sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    emails = incident_corpus(args.emails, args.incident_share, seed=args.seed)
+
+    print(
+        f"{'threshold':>9}{'seconds':>9}{'emails/s':>10}{'LLM calls':>11}{'hit rate':>10}"
+        f"{'lookup us':>11}{'p99 us':>8}{'clusters':>10}{'candidates':>12}"
+    )
+    elapsed, baseline, calls, _ = run(emails, args.llm_latency)
+    print(f"{'off':>9}{elapsed:>9.2f}{len(emails) / elapsed:>10.0f}{calls:>11}")
+
+    for threshold in args.thresholds:
+        elapsed, results, calls, dedup = run(emails, args.llm_latency, threshold)
+        s = dedup.stats()
+        print(
+            f"{threshold:>9.2f}{elapsed:>9.2f}{len(emails) / elapsed:>10.0f}{calls:>11}"
+            f"{s['hit_rate']:>10.1%}{s['lookup_mean_us']:>11.1f}{s['lookup_p99_us']:>8.1f}"
+            f"{s['size']:>10}{s['candidates_per_lookup']:>12.2f}"
+        )
+        for result in results:
+            del result["cluster_id"]
+        if results != baseline:
+            raise SystemExit(f"results with dedup at {threshold} differ from the full pipeline")
+
+    print("\nresults identical")
+    bench_index_size(args.index_sizes, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: early-exit pipeline on an escalation-heavy corpus.
+
+Escalating templates from data/emails.csv are oversampled to
+--escalation-share of the corpus, then the corpus runs through the
+pipeline with and without early_exit (and optionally with a local SQLite
+CRM, whose lookup wait early exit also skips). Flattened results must be
+identical.
+
+Run from the project root:
+    python benchmarks/bench_early_exit.py --emails 50000 --escalation-share 0.8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Make sure project root and app/ are on sys.path, like run_batch.py
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+for path in (PROJECT_ROOT, os.path.join(PROJECT_ROOT, "app")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from run_batch import close_pipeline, make_pipeline, prefetch_customers, process_email
+from benchmarks.corpus import generate_corpus, load_templates
+from benchmarks.fake_crm import build_crm_db
+
+
+def escalation_heavy_templates(templates: list, share: float) -> list:
+    """
+    Repeat the templates the pipeline escalates so they make up about
+    `share` of random draws.
+    """
+    pipeline = make_pipeline()
+    escalating, approved = [], []
+    for t in templates:
+        result = pipeline.run(subject=t["subject"], body=t["body"])
+        target = escalating if result["decision"]["final_action"] == "escalate_to_human" else approved
+        target.append(t)
+
+    if not escalating or not approved or share <= 0 or share >= 1:
+        return escalating if share >= 1 and escalating else templates
+    repeat = max(1, round(share * len(approved) / ((1 - share) * len(escalating))))
+    return escalating * repeat + approved
+
+
+def run(emails, early_exit: bool, crm_source: str = None, repeat: int = 3):
+    """
+    Best wall time of `repeat` runs, each on a fresh pipeline.
+    """
+    best = None
+    for _ in range(repeat):
+        pipeline = make_pipeline(crm_source=crm_source, early_exit=early_exit)
+        start = time.perf_counter()
+        results = [process_email(pipeline, email) for email in prefetch_customers(pipeline, emails)]
+        elapsed = time.perf_counter() - start
+        close_pipeline(pipeline)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Early-exit pipeline benchmark.")
+    parser.add_argument("--emails", type=int, default=50000)
+    parser.add_argument("--escalation-share", type=float, default=0.8)
+    parser.add_argument("--body-length", type=int, default=None)
+    parser.add_argument("--no-crm", action="store_true", help="Skip the runs with a local SQLite CRM.")
+    parser.add_argument("--repeat", type=int, default=3, help="Report the best of this many runs.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    templates = escalation_heavy_templates(load_templates(), args.escalation_share)
+    emails = list(generate_corpus(
+        args.emails, body_length=args.body_length, seed=args.seed, templates=templates
+    ))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        crm_sources = [None]
+        if not args.no_crm:
+            crm_db = os.path.join(tmp, "crm.db")
+            build_crm_db(crm_db, max(1, args.emails // 10), seed=args.seed)
+            crm_sources.append(crm_db)
+
+        print(f"{'crm':<8}{'mode':<12}{'seconds':>10}{'emails/sec':>12}{'escalated':>11}")
+        for crm_source in crm_sources:
+            baseline = None
+            for early_exit in (False, True):
+                elapsed, results = run(emails, early_exit, crm_source, repeat=args.repeat)
+                escalated = sum(r["final_action"] == "escalate_to_human" for r in results)
+                label = "sqlite" if crm_source else "none"
+                mode = "early-exit" if early_exit else "full"
+                print(f"{label:<8}{mode:<12}{elapsed:>10.3f}{len(emails) / elapsed:>12.0f}{escalated / len(emails):>11.1%}")
+                if baseline is None:
+                    baseline = results
+                elif results != baseline:
+                    raise SystemExit("early-exit results differ from the full pipeline")
+    print("\nresults identical")
+
+
+if __name__ == "__main__":
+    main()
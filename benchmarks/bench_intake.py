@@ -0,0 +1,88 @@
+"""
+Benchmark: quoted-reply and signature stripping in IntakeAgent on long
+threads. Compares the clean_body handed to later agents with and without
+stripping, and the intake + classification time per email.
+
+Run from the project root:
+    python benchmarks/bench_intake.py
+"""
+import os
+import sys
+import time
+
+# Make sure project root is on sys.path so we can import 'agents'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from agents.classification_agent import ClassificationAgent
+from agents.intake_agent import IntakeAgent
+
+
+THREAD_LENGTHS = [1, 5, 10, 20, 40]
+
+MESSAGES = [
+    "Hi, my invoice for this month still shows the extra charge. Can you check?",
+    "Thanks for getting back to me. The charge is still there after the refresh.",
+    "I have attached the screenshot again. Please fix this as soon as possible.",
+    "This is the third time I am writing about the same invoice.",
+]
+
+SIGNATURE = "\n--\nJane Doe\nACME Corp | +1 555 0100\nSent from my iPhone\n"
+
+
+def build_thread(n_messages: int) -> str:
+    """
+    Newest message on top, every earlier message quoted below it.
+    """
+    body = MESSAGES[0] + SIGNATURE
+    for i in range(1, n_messages):
+        quoted = "\n".join("> " + line for line in body.splitlines())
+        body = (
+            MESSAGES[i % len(MESSAGES)] + SIGNATURE
+            + f"\nOn Mon, Mar {i} 2025 at 10:{i % 60:02d} AM Support <support@example.com> wrote:\n"
+            + quoted + "\n"
+        )
+    return body
+
+
+def best_of(fn, repeat: int = 20) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    intake = IntakeAgent()
+    classifier = ClassificationAgent()
+
+    def without_stripping(body):
+        clean_body = intake.clean_text(body)
+        classifier.process({"clean_body": clean_body, "thread_status": "reply"})
+        return clean_body
+
+    def with_stripping(body):
+        clean = intake.process_email("Re: invoice", body)
+        classifier.process(clean)
+        return clean["clean_body"]
+
+    print(f"{'messages':>9}{'raw chars':>11}{'old body':>10}{'new body':>10}"
+          f"{'smaller':>9}{'old us':>10}{'new us':>10}")
+    for n in THREAD_LENGTHS:
+        body = build_thread(n)
+        old_len = len(without_stripping(body))
+        new_len = len(with_stripping(body))
+        old_t = best_of(lambda: without_stripping(body))
+        new_t = best_of(lambda: with_stripping(body))
+        print(
+            f"{n:>9}{len(body):>11}{old_len:>10}{new_len:>10}"
+            f"{old_len / new_len:>8.1f}x{old_t * 1e6:>10.1f}{new_t * 1e6:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
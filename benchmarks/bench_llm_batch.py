@@ -0,0 +1,80 @@
+"""
+Benchmark: micro-batched LLM reply calls (tools/llm_batcher.py).
+
+A FakeLLM whose per-call overhead (`latency`) dominates the per-prompt
+cost, and which serves at most `max_concurrent` calls at a time (a
+provider concurrency limit), answers the replies of pipeline.arun_batch:
+first one call per reply, then with ReplyAgent batching at several
+batch sizes and waits.
+Reported: throughput, LLM calls made, mean batch and fill ratio, and
+the time replies spent queued for their batch.
+
+Run from the project root:
+    python benchmarks/bench_llm_batch.py
+    python benchmarks/bench_llm_batch.py --emails 5000 --concurrency 128 --batch-sizes 8 32 64 --waits 0.002 0.01
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Make sure project root is on sys.path so we can import 'app'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from app.pipeline import EmailSupportPipeline
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_llm import FakeLLM
+
+
+def run(emails: list, args, batch_size: int = None, batch_wait: float = 0.0):
+    llm = FakeLLM(
+        latency=args.latency, per_prompt=args.per_prompt, max_concurrent=args.max_concurrent,
+        seed=args.seed
+    )
+    pipeline = EmailSupportPipeline(llm=llm, reply_batch=batch_size, reply_batch_wait=batch_wait)
+    start = time.perf_counter()
+    outputs = asyncio.run(pipeline.arun_batch(emails, concurrency=args.concurrency))
+    elapsed = time.perf_counter() - start
+    by_llm = sum(o.reply is not None and o.reply.generated_by == "llm" for o in outputs)
+    batcher = pipeline.reply_agent.batcher
+    return elapsed, llm.calls, by_llm, batcher.stats() if batcher is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM micro-batching benchmark.")
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM overhead per call, seconds.")
+    parser.add_argument("--per-prompt", type=float, default=0.001, help="Fake LLM cost per prompt, seconds.")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="Fake LLM calls in flight at most.")
+    parser.add_argument("--concurrency", type=int, default=64, help="arun_batch emails in flight.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 16, 32])
+    parser.add_argument("--waits", type=float, nargs="+", default=[0.005, 0.02])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    emails = list(generate_corpus(args.emails, seed=args.seed))
+    print(
+        f"{'batch':>6}{'wait ms':>9}{'seconds':>9}{'emails/s':>10}{'llm replies':>13}{'calls':>7}"
+        f"{'per call':>10}{'fill':>7}{'queue ms':>10}{'p95 ms':>8}"
+    )
+
+    elapsed, calls, by_llm, _ = run(emails, args)
+    print(f"{'off':>6}{'-':>9}{elapsed:>9.2f}{len(emails) / elapsed:>10.0f}{by_llm:>13}{calls:>7}"
+          f"{by_llm / calls if calls else 0:>10.1f}")
+
+    for batch_size in args.batch_sizes:
+        for wait in args.waits:
+            elapsed, calls, by_llm, s = run(emails, args, batch_size, wait)
+            print(
+                f"{batch_size:>6}{wait * 1000:>9.1f}{elapsed:>9.2f}{len(emails) / elapsed:>10.0f}"
+                f"{by_llm:>13}{calls:>7}{s['mean_batch']:>10.1f}{s['fill_ratio']:>7.0%}"
+                f"{s['queue_mean_ms']:>10.1f}{s['queue_p95_ms']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Benchmark: per-agent and end-to-end throughput on a synthetic corpus.
+
+Times IntakeAgent.process_email, ClassificationAgent.process,
+DecisionAgent.decide, ReplyAgent.generate_reply and
+SupervisorAgent.evaluate_reply call by call, then the full
+EmailSupportPipeline.run, and writes machine-readable JSON so runs can be
+compared across commits.
+
+Run from the project root:
+    python benchmarks/bench_pipeline.py --emails 10000 --output bench.json
+    python benchmarks/bench_pipeline.py --emails 10000 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# Make sure project root is on sys.path so we can import 'app'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from agents.intake_agent import IntakeAgent
+from agents.classification_agent import ClassificationAgent
+from agents.decision_agent import DecisionAgent
+from agents.reply_agent import ReplyAgent
+from agents.supervisor_agent import SupervisorAgent
+from app.pipeline import EmailSupportPipeline
+from benchmarks.corpus import generate_corpus, load_templates
+from tools.logging_tools import LatencyHistogram
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def histogram_stats(histogram: LatencyHistogram, wall_s: float = None) -> dict:
+    total_s = histogram.total_ns / 1e9
+    stats = {
+        "calls": histogram.count,
+        "total_s": total_s,
+        "per_sec": histogram.count / total_s if total_s else None,
+        "mean_us": histogram.total_ns / histogram.count / 1e3 if histogram.count else None,
+        "p50_us": histogram.percentile(50) / 1e3,
+        "p95_us": histogram.percentile(95) / 1e3,
+        "p99_us": histogram.percentile(99) / 1e3,
+    }
+    if wall_s is not None:
+        stats["wall_s"] = wall_s
+        stats["per_sec"] = histogram.count / wall_s if wall_s else None
+    return stats
+
+
+def bench_agents(emails) -> dict:
+    """
+    Call each agent in pipeline order and time every call on its own.
+    """
+    intake = IntakeAgent()
+    classifier = ClassificationAgent()
+    decision = DecisionAgent()
+    reply_agent = ReplyAgent()
+    supervisor = SupervisorAgent()
+
+    histograms = {
+        "IntakeAgent.process_email": LatencyHistogram(),
+        "ClassificationAgent.process": LatencyHistogram(),
+        "DecisionAgent.decide": LatencyHistogram(),
+        "ReplyAgent.generate_reply": LatencyHistogram(),
+        "SupervisorAgent.evaluate_reply": LatencyHistogram(),
+    }
+    h_intake, h_classify, h_decide, h_reply, h_supervise = histograms.values()
+    clock = time.perf_counter_ns
+
+    for email in emails:
+        t0 = clock()
+        clean = intake.process_email(subject=email["subject"], body=email["body"])
+        t1 = clock()
+        classification = classifier.process(clean_email=clean, sender=email["sender"])
+        t2 = clock()
+        verdict = decision.decide({
+            "category": classification["category"],
+            "urgency": classification["urgency"],
+            "sentiment": classification["sentiment"],
+            "needs_escalation": classification["needs_escalation"],
+        })
+        t3 = clock()
+        h_intake.record(t1 - t0)
+        h_classify.record(t2 - t1)
+        h_decide.record(t3 - t2)
+
+        if verdict["final_action"] == "approve":
+            t4 = clock()
+            reply = reply_agent.generate_reply(classification, clean)
+            t5 = clock()
+            supervisor.evaluate_reply(classification, reply)
+            t6 = clock()
+            h_reply.record(t5 - t4)
+            h_supervise.record(t6 - t5)
+
+    return {name: histogram_stats(h) for name, h in histograms.items()}
+
+
+def bench_pipeline(emails) -> dict:
+    pipeline = EmailSupportPipeline()
+    histogram = LatencyHistogram()
+    clock = time.perf_counter_ns
+
+    start = time.perf_counter()
+    for email in emails:
+        t0 = clock()
+        pipeline.run(subject=email["subject"], body=email["body"], sender=email["sender"])
+        histogram.record(clock() - t0)
+    wall_s = time.perf_counter() - start
+
+    return histogram_stats(histogram, wall_s=wall_s)
+
+
+def print_results(results: dict, baseline: dict = None):
+    rows = dict(results["agents"], **{"EmailSupportPipeline.run": results["pipeline"]})
+    base_rows = {}
+    if baseline:
+        base_rows = dict(baseline["agents"], **{"EmailSupportPipeline.run": baseline["pipeline"]})
+
+    header = f"{'stage':<34}{'calls':>9}{'per sec':>12}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    print(header)
+    for name, s in rows.items():
+        if not s["calls"]:
+            continue
+        line = (
+            f"{name:<34}{s['calls']:>9}{s['per_sec']:>12.0f}{s['p50_us']:>10.2f}"
+            f"{s['p95_us']:>10.2f}{s['p99_us']:>10.2f}"
+        )
+        base = base_rows.get(name)
+        if base and base.get("per_sec"):
+            line += f"{s['per_sec'] / base['per_sec']:>9.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent pipeline benchmark suite.")
+    parser.add_argument("--emails", type=int, default=10000, help="Corpus size (e.g. 10000-1000000).")
+    parser.add_argument("--body-length", type=int, default=None,
+                        help="Pad bodies to this many characters (default: template length).")
+    parser.add_argument("--senders", type=int, default=None, help="Sender pool size.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    parser.add_argument("--compare", help="Earlier JSON result to print speedups against.")
+    args = parser.parse_args()
+
+    templates = load_templates()
+
+    def corpus():
+        return generate_corpus(
+            args.emails, body_length=args.body_length, seed=args.seed,
+            n_senders=args.senders, templates=templates
+        )
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "params": {
+            "emails": args.emails,
+            "body_length": args.body_length,
+            "senders": args.senders,
+            "seed": args.seed,
+        },
+        "agents": bench_agents(corpus()),
+        "pipeline": bench_pipeline(corpus()),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: reply prompt size with the token-budgeted PromptBuilder
+(tools/prompt_builder.py).
+
+Emails from the synthetic corpus are padded to several body lengths and
+given quoted thread history (earlier messages under an "On ... wrote:"
+header). For each, the reply prompt is built the way ReplyAgent does,
+and compared with feeding the whole raw body after the same prefix.
+Reported per body length and budget: prompt tokens per email (mean,
+p95) for the raw body, before trimming (new text + whole history) and
+after, how many emails were trimmed, the share of the prompt that is
+the stable (cacheable) prefix, and the build time per prompt.
+
+Run from the project root:
+    python benchmarks/bench_prompts.py
+    python benchmarks/bench_prompts.py --emails 5000 --body-lengths 1000 8000 --history 10 --budgets 200 800
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# Make sure project root is on sys.path so we can import 'agents'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from agents.classification_agent import ClassificationAgent
+from agents.intake_agent import IntakeAgent
+from agents.reply_agent import ReplyAgent
+from benchmarks.corpus import generate_corpus
+from tools.prompt_builder import estimate_tokens
+
+
+def with_history(email: dict, messages: int, rng: random.Random) -> dict:
+    """
+    The email with `messages` earlier messages quoted under it, newest first.
+    """
+    body = email["body"]
+    for i in range(messages):
+        quoted = "\n".join("> " + line for line in email["body"][:600].splitlines() or [""])
+        body += (
+            f"\n\nOn Mon, Mar {rng.randrange(1, 28)}, 2025 at 10:{i:02d} AM "
+            f"Support <support@example.com> wrote:\n{quoted}"
+        )
+    return dict(email, body=body)
+
+
+def prepare(args, body_length: int) -> list:
+    rng = random.Random(args.seed)
+    intake = IntakeAgent()
+    classifier = ClassificationAgent()
+    prepared = []
+    for email in generate_corpus(args.emails, body_length=body_length, seed=args.seed):
+        email = with_history(email, args.history, rng)
+        clean = intake.process_email(email["subject"], email["body"], email["sender"])
+        classification = classifier.process(clean_email=clean, sender=email["sender"])
+        prepared.append((email, clean, classification))
+    return prepared
+
+
+def measure(prepared: list, budget: int) -> dict:
+    agent = ReplyAgent(body_tokens=budget)
+    builder = agent.prompt_builder
+    raw, before, after = [], [], []
+    elapsed = 0
+    for email, clean, classification in prepared:
+        tone = agent.select_tone(classification.sentiment, classification.needs_escalation)
+        previous = builder.tokens_before
+        start = time.perf_counter_ns()
+        prompt = agent.build_llm_prompt(classification, clean, tone)
+        elapsed += time.perf_counter_ns() - start
+        after.append(estimate_tokens(prompt))
+        before.append(builder.tokens_before - previous)
+        raw.append(after[-1] - estimate_tokens(prompt.split("Email:\n", 1)[-1]) + estimate_tokens(email["body"]))
+
+    def p95(values):
+        return statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+
+    prefix = builder.template("reply_agent").prefix_tokens
+    return {
+        "raw_mean": statistics.mean(raw), "raw_p95": p95(raw),
+        "before_mean": statistics.mean(before), "before_p95": p95(before),
+        "after_mean": statistics.mean(after), "after_p95": p95(after),
+        "trimmed": builder.trimmed / builder.built,
+        "prefix_share": prefix / statistics.mean(after),
+        "build_us": elapsed / builder.built / 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt builder benchmark.")
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--body-lengths", type=int, nargs="+", default=[300, 2000, 8000],
+                        help="Characters of new text per email (before the quoted history).")
+    parser.add_argument("--history", type=int, default=3, help="Quoted earlier messages per email.")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[200, 400, 1000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        f"{'body':>6}{'budget':>8}{'raw':>7}{'p95':>7}{'before':>8}{'p95':>7}{'after':>7}{'p95':>7}"
+        f"{'trimmed':>9}{'prefix':>8}{'build us':>10}"
+    )
+    for body_length in args.body_lengths:
+        prepared = prepare(args, body_length)
+        for budget in args.budgets:
+            s = measure(prepared, budget)
+            print(
+                f"{body_length:>6}{budget:>8}{s['raw_mean']:>7.0f}{s['raw_p95']:>7.0f}"
+                f"{s['before_mean']:>8.0f}{s['before_p95']:>7.0f}{s['after_mean']:>7.0f}{s['after_p95']:>7.0f}"
+                f"{s['trimmed']:>9.0%}{s['prefix_share']:>8.0%}{s['build_us']:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
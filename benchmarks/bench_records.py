@@ -0,0 +1,89 @@
+"""
+Benchmark: memory and allocations per pipeline result.
+
+Keeps every result of a corpus in memory (as arun_batch and run_serial
+do) and reports, per email, the bytes and blocks still allocated, and the
+tracemalloc peak while processing. Done for raw pipeline.run output and
+for the flattened run_batch records.
+
+Run from the project root:
+    python benchmarks/bench_records.py --emails 20000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+# Make sure project root and app/ are on sys.path, like run_batch.py
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+for path in (PROJECT_ROOT, os.path.join(PROJECT_ROOT, "app")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from run_batch import flatten_result, make_pipeline
+from benchmarks.corpus import generate_corpus, load_templates
+
+
+def measure(emails, keep) -> dict:
+    """
+    Run every email through a fresh pipeline, keep(email, output) for
+    each, and return what the kept results cost.
+    """
+    pipeline = make_pipeline()
+    gc.collect()
+    tracemalloc.start()
+    before_bytes, _ = tracemalloc.get_traced_memory()
+    before_blocks = sys.getallocatedblocks()
+
+    start = time.perf_counter()
+    kept = [
+        keep(email, pipeline.run(
+            subject=email["subject"], body=email["body"], sender=email["sender"]
+        ))
+        for email in emails
+    ]
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    after_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    after_blocks = sys.getallocatedblocks()
+    tracemalloc.stop()
+
+    n = len(kept)
+    return {
+        "bytes_per_email": (after_bytes - before_bytes) / n,
+        "blocks_per_email": (after_blocks - before_blocks) / n,
+        "peak_mb": peak_bytes / 1e6,
+        "us_per_email": elapsed / n * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-result memory benchmark.")
+    parser.add_argument("--emails", type=int, default=20000)
+    parser.add_argument("--body-length", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    emails = list(generate_corpus(
+        args.emails, body_length=args.body_length, seed=args.seed, templates=load_templates()
+    ))
+
+    rows = {
+        "pipeline.run output": measure(emails, lambda email, output: output),
+        "flattened record": measure(emails, flatten_result),
+    }
+
+    print(f"{'kept per email':<22}{'bytes':>10}{'blocks':>9}{'peak MB':>10}{'us/email':>10}")
+    for name, r in rows.items():
+        print(
+            f"{name:<22}{r['bytes_per_email']:>10.0f}{r['blocks_per_email']:>9.1f}"
+            f"{r['peak_mb']:>10.1f}{r['us_per_email']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Benchmark: compiling and hot-reloading classification rules
+(tools/rule_store.py) for rule sets with thousands of phrases.
+
+For each size, a synthetic categories.yml is written and timed:
+  parse    YAML to dict
+  compile  RuleSet.from_dict (keyword tables + KeywordMatcher), with
+           the re module's pattern cache cleared first
+  get      RuleStore.get() on the hot path, between checks
+Then a thread classifies emails in a loop while the file is rewritten a
+few times, and reports how long until the new rules were in use, the
+usual per-email latency and the slowest email between a rewrite and its
+swap, with the check done inside get() (inline) or by a watcher thread.
+
+Run from the project root:
+    python benchmarks/bench_rules.py
+    python benchmarks/bench_rules.py --sizes 1000 5000 20000 --reloads 5
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Make sure project root is on sys.path so we can import 'tools'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from agents.classification_agent import ClassificationAgent
+from benchmarks.corpus import load_templates
+from config.settings import CATEGORIES_PATH, load_yaml
+from tools.logging_tools import LatencyHistogram
+from tools.rule_store import RuleSet, RuleStore
+
+
+def synthetic_rules(n_phrases: int, seed: int) -> dict:
+    """
+    The shipped rules plus n_phrases random two-word phrases spread over
+    its labels, so classification still behaves like the real tables.
+    """
+    with open(CATEGORIES_PATH, "rb") as f:
+        rules = load_yaml(f)
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+
+    def phrase():
+        return " ".join(
+            "".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(2)
+        )
+
+    tables = [rules["categories"], rules["sentiments"], rules["urgency"]]
+    labels = [(table, label) for table in tables for label in table]
+    for i in range(n_phrases):
+        table, label = labels[i % len(labels)]
+        table[label] = list(table[label]) + [phrase()]
+    return rules
+
+
+def dump_yaml(rules: dict) -> str:
+    import yaml
+    return yaml.safe_dump(rules, sort_keys=False)
+
+
+def write_atomic(path: str, text: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_reload(path: str, texts: list, versions: list, watcher: bool, check_interval: float) -> dict:
+    """
+    Classify texts in a loop on one thread while versions are written to
+    path one after another.
+    """
+    write_atomic(path, versions[0])
+    store = RuleStore(path, check_interval=check_interval)
+    if watcher:
+        store.start_watcher()
+    agent = ClassificationAgent(rules=store)
+
+    latency = LatencyHistogram()
+    emails = []  # (finished at, seconds)
+    seen = {}
+    stop = threading.Event()
+
+    def classify():
+        i = 0
+        clock = time.perf_counter
+        while not stop.is_set():
+            start = clock()
+            rules = store.get()
+            agent.process({"clean_body": texts[i % len(texts)], "thread_status": "single"}, rules=rules)
+            end = clock()
+            seen.setdefault(rules.version, end)
+            latency.record(int((end - start) * 1e9))
+            emails.append((end, end - start))
+            i += 1
+
+    thread = threading.Thread(target=classify)
+    thread.start()
+    time.sleep(0.2)
+
+    windows = []
+    for text in versions[1:]:
+        written = time.perf_counter()
+        write_atomic(path, text)
+        # RuleSet.version is a hash of the file bytes
+        version = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+        while version not in seen:
+            time.sleep(0.001)
+        windows.append((written, seen[version]))
+        time.sleep(0.2)
+
+    stop.set()
+    thread.join()
+    store.stop_watcher()
+
+    delays = [swapped - written for written, swapped in windows]
+    swap_max = max(
+        seconds for end, seconds in emails
+        if any(written <= end <= swapped for written, swapped in windows)
+    )
+    return {
+        "delay_ms": sum(delays) / len(delays) * 1000,
+        "max_delay_ms": max(delays) * 1000,
+        "p99_ms": latency.percentile(99) / 1e6,
+        "swap_max_ms": swap_max * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rule compile and hot-reload benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--reloads", type=int, default=3, help="File rewrites per reload run.")
+    parser.add_argument("--check-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    texts = [t["body"].lower() for t in load_templates()]
+    workdir = tempfile.mkdtemp(prefix="bench_rules_")
+    path = os.path.join(workdir, "categories.yml")
+    try:
+        print(f"{'phrases':>8}{'parse ms':>10}{'compile ms':>12}{'get() ns':>10}")
+        for size in args.sizes:
+            text = dump_yaml(synthetic_rules(size, seed=0))
+            parse = best_of(lambda: load_yaml(text))
+            data = load_yaml(text)
+
+            def compile_rules():
+                re.purge()
+                RuleSet.from_dict(data)
+
+            compile_ = best_of(compile_rules)
+
+            write_atomic(path, text)
+            store = RuleStore(path, check_interval=60.0)
+            n = 200000
+            start = time.perf_counter()
+            for _ in range(n):
+                store.get()
+            get_ns = (time.perf_counter() - start) / n * 1e9
+            print(f"{size:>8}{parse * 1000:>10.1f}{compile_ * 1000:>12.1f}{get_ns:>10.0f}")
+
+        print(
+            f"\n{'phrases':>8}  {'mode':<8}{'delay ms':>10}{'max ms':>9}"
+            f"{'email p99 ms':>14}{'slowest email in reload ms':>28}"
+        )
+        for size in args.sizes:
+            versions = [dump_yaml(synthetic_rules(size, seed=i)) for i in range(args.reloads + 1)]
+            for watcher in (False, True):
+                r = bench_reload(path, texts, versions, watcher, args.check_interval)
+                print(
+                    f"{size:>8}  {'watcher' if watcher else 'inline':<8}{r['delay_ms']:>10.1f}"
+                    f"{r['max_delay_ms']:>9.1f}{r['p99_ms']:>14.3f}{r['swap_max_ms']:>28.1f}"
+                )
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: conversation tracking (memory/session_service.py).
+
+First table: SessionService.open() cost and memory per open thread as
+the number of open threads grows, with every email starting or
+continuing one of `threads` conversations. The last row opens twice
+max_threads conversations to show memory staying at the cap.
+
+Second table: the pipeline (fake LLM) over a synthetic corpus with and
+without sessions: throughput, follow-up share and how many emails the
+conversation rules (DecisionAgent rules 6-7) send to a human.
+
+Run from the project root:
+    python benchmarks/bench_sessions.py
+    python benchmarks/bench_sessions.py --threads 10000 100000 1000000 --emails 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Make sure project root and app/ are on sys.path, like run_batch.py
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+for path in (PROJECT_ROOT, os.path.join(PROJECT_ROOT, "app")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from pipeline import EmailSupportPipeline
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_llm import FakeLLM
+from memory.session_service import SessionService
+
+
+def bench_service(n_threads: int, n_emails: int, max_threads: int, seed: int = 0):
+    rng = random.Random(seed)
+    keys = [(f"customer_{rng.randrange(n_threads)}", f"subject {i}") for i in range(n_threads)]
+
+    tracemalloc.start()
+    sessions = SessionService(max_threads=max_threads)
+    for sender, subject in keys:
+        sessions.open(sender, subject)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    probes = [keys[rng.randrange(n_threads)] for _ in range(n_emails)]
+    start = time.perf_counter()
+    for sender, subject in probes:
+        sessions.open(sender, subject)
+    elapsed = time.perf_counter() - start
+    return sessions, memory, elapsed / n_emails
+
+
+def run(emails: list, llm_latency: float, sessions: SessionService = None):
+    pipeline = EmailSupportPipeline(llm=FakeLLM(latency=llm_latency), sessions=sessions)
+    start = time.perf_counter()
+    outputs = [
+        pipeline.run(subject=email["subject"], body=email["body"], sender=email["sender"])
+        for email in emails
+    ]
+    return time.perf_counter() - start, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session service benchmark.")
+    parser.add_argument("--threads", type=int, nargs="+", default=[10000, 100000, 250000])
+    parser.add_argument("--max-threads", type=int, default=250000)
+    parser.add_argument("--probes", type=int, default=200000, help="open() calls timed per row.")
+    parser.add_argument("--emails", type=int, default=10000)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per fake LLM call.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'threads':>9}{'open':>9}{'open us':>9}{'bytes/thread':>14}{'MB':>8}{'evicted':>10}")
+    for n_threads in args.threads + [args.max_threads * 2]:
+        sessions, memory, per_open = bench_service(
+            n_threads, args.probes, args.max_threads, seed=args.seed
+        )
+        print(
+            f"{n_threads:>9}{len(sessions):>9}{per_open * 1e6:>9.2f}"
+            f"{memory / len(sessions):>14.0f}{memory / 2**20:>8.1f}{sessions.evicted:>10}"
+        )
+
+    emails = list(generate_corpus(args.emails, seed=args.seed))
+    print(f"\n{'sessions':>9}{'seconds':>9}{'emails/s':>10}{'replies':>9}{'escalated':>11}{'by thread':>11}")
+    for sessions in (None, SessionService()):
+        elapsed, outputs = run(emails, args.llm_latency, sessions)
+        replies = sum(o.classification.thread_status == "reply" for o in outputs)
+        escalated = sum(o.decision.final_action == "escalate_to_human" for o in outputs)
+        by_thread = sum("conversation" in o.decision.reason for o in outputs)
+        print(
+            f"{'on' if sessions else 'off':>9}{elapsed:>9.2f}{len(emails) / elapsed:>10.0f}"
+            f"{replies:>9}{escalated:>11}{by_thread:>11}"
+        )
+        if sessions is not None:
+            print(sessions.report())
+
+
+if __name__ == "__main__":
+    main()
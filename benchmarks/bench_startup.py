@@ -0,0 +1,125 @@
+"""
+Benchmark: cold start of a short-lived process (e.g. a per-message MTA
+hook) that builds a pipeline and handles one email.
+
+Every run is a fresh interpreter. Reported per scenario: median wall time
+of the whole process, median time from the first import to the result
+(in-process), and how many modules were loaded. Scenarios: an email
+that is escalated (no reply stage) and one that gets a reply, each with
+no config snapshots (first run after a YAML change: parse, compile,
+write the snapshot) and with current ones (config/__pycache__).
+
+Then the slowest imports of the warm run, from `python -X importtime`.
+
+Run from the project root:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --top 25
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Make sure project root is on sys.path so we can import 'config'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from config.settings import CATEGORIES_PATH, PROMPTS_PATH, snapshot_path
+
+EMAILS = {
+    "escalated": (
+        "Refund request not processed",
+        "This is the third time I'm asking about my refund. This is unacceptable.",
+    ),
+    "replied": (
+        "Copy of my invoice",
+        "Hello, could you send me a copy of my September invoice? Thanks.",
+    ),
+}
+
+CHILD = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {app!r})
+from pipeline import EmailSupportPipeline
+from tools.rule_store import rule_store
+result = EmailSupportPipeline(rules=rule_store(watch=False)).run(subject={subject!r}, body={body!r}, sender="customer_1")
+print(time.perf_counter() - start, len(sys.modules), result.decision.final_action)
+"""
+
+
+def remove_snapshots():
+    for path, kind in ((CATEGORIES_PATH, "rules"), (PROMPTS_PATH, "yaml")):
+        try:
+            os.remove(snapshot_path(path, kind))
+        except FileNotFoundError:
+            pass
+
+
+def child_code(email: str) -> str:
+    subject, body = EMAILS[email]
+    return CHILD.format(app=os.path.join(PROJECT_ROOT, "app"), subject=subject, body=body)
+
+
+def run_child(code: str, cold: bool):
+    if cold:
+        remove_snapshots()
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.split()
+    return time.perf_counter() - start, float(out[0]), int(out[1]), out[2]
+
+
+def import_times(code: str) -> list:
+    """
+    [(cumulative_us, self_us, module)] from -X importtime, slowest first.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return sorted(rows, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark.")
+    parser.add_argument("--runs", type=int, default=10, help="Processes per scenario.")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list.")
+    args = parser.parse_args()
+
+    baseline = statistics.median(
+        run_child("print(0, 0, '-')", cold=False)[0] for _ in range(args.runs)
+    )
+    print(f"bare interpreter: {baseline * 1000:.1f} ms\n")
+
+    print(f"{'email':<11}{'snapshots':>11}{'process ms':>12}{'in-process ms':>15}{'modules':>9}  action")
+    for email in EMAILS:
+        code = child_code(email)
+        for cold in (True, False):
+            run_child(code, cold=False)  # warm the OS file cache
+            runs = [run_child(code, cold) for _ in range(args.runs)]
+            print(
+                f"{email:<11}{'none' if cold else 'current':>11}"
+                f"{statistics.median(r[0] for r in runs) * 1000:>12.1f}"
+                f"{statistics.median(r[1] for r in runs) * 1000:>15.1f}"
+                f"{runs[-1][2]:>9}  {runs[-1][3]}"
+            )
+
+    print(f"\nSlowest imports (replied, current snapshots):")
+    print(f"{'cumulative ms':>14}{'self ms':>9}  module")
+    for cumulative_us, self_us, module in import_times(child_code("replied"))[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>9.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Local CRM stand-ins for tools/crm_lookup.py: a SQLite customers table and
+an HTTP server in front of it with configurable per-request latency.
+
+    python benchmarks/fake_crm.py --db data/crm.db --senders 10000
+    python benchmarks/fake_crm.py --db data/crm.db --serve --port 8765 --latency 0.005
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Make sure project root is on sys.path so we can import 'tools'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from tools.crm_lookup import SQLiteCRM
+
+TIERS = ("free", "standard", "premium", "enterprise")
+TIER_WEIGHTS = (50, 30, 15, 5)
+
+
+def build_crm_db(path: str, n_senders: int, known_ratio: float = 0.8, seed: int = 0):
+    """
+    Customers customer_0 .. customer_{n_senders - 1} (the sender names
+    benchmarks/corpus.py generates); about known_ratio of them exist.
+    """
+    rng = random.Random(seed)
+    db = sqlite3.connect(path)
+    db.execute("DROP TABLE IF EXISTS customers")
+    db.execute(
+        "CREATE TABLE customers ("
+        " email TEXT PRIMARY KEY,"
+        " tier TEXT NOT NULL,"
+        " open_tickets INTEGER NOT NULL)"
+    )
+    rows = (
+        (f"customer_{i}", rng.choices(TIERS, TIER_WEIGHTS)[0], int(min(rng.expovariate(0.8), 6)))
+        for i in range(n_senders)
+        if rng.random() < known_ratio
+    )
+    db.executemany("INSERT INTO customers VALUES (?, ?, ?)", rows)
+    db.commit()
+    db.close()
+
+
+class FakeCRMServer:
+    """
+    Threaded HTTP server answering POST /customers/lookup from a SQLite
+    customers table, sleeping `latency` seconds per request to stand in
+    for the network round trip. Counts requests.
+    """
+
+    def __init__(self, db_path: str, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.store = SQLiteCRM(db_path, pool_size=16)
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in two writes; without this, Nagle
+            # plus delayed ACKs add ~40 ms to every keep-alive response
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                emails = json.loads(self.rfile.read(length))["emails"]
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                body = json.dumps({"customers": server.store.fetch_many(emails)}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.store.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and/or serve a fake CRM.")
+    parser.add_argument("--db", default=os.path.join(PROJECT_ROOT, "data", "crm.db"))
+    parser.add_argument("--senders", type=int, default=10000, help="Build the table with this many senders.")
+    parser.add_argument("--known-ratio", type=float, default=0.8)
+    parser.add_argument("--serve", action="store_true", help="Serve the table over HTTP.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request.")
+    args = parser.parse_args()
+
+    if not args.serve or not os.path.exists(args.db):
+        build_crm_db(args.db, args.senders, known_ratio=args.known_ratio)
+        print(f"Built {args.db} for {args.senders} senders")
+
+    if args.serve:
+        server = FakeCRMServer(args.db, port=args.port, latency=args.latency)
+        print(f"Serving fake CRM on {server.url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
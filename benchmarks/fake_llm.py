@@ -0,0 +1,92 @@
+"""
+Local stand-in for a hosted LLM, for offline benchmarks.
+
+Every call sleeps for `latency` seconds (plus optional jitter) to mimic
+network round trips, and can be told to fail or hang for a fraction of
+calls to exercise fallbacks, or to write a draft the supervisor sends
+back (too long) to exercise rewrites.
+
+Each prompt takes `per_prompt` seconds on top of the call's `latency`;
+generate_batch / agenerate_batch answer many prompts in one call, so
+they pay `latency` once. max_concurrent caps the calls in flight, like
+a provider's concurrency limit; callers over it wait their turn.
+"""
+import asyncio
+import random
+import threading
+import time
+
+
+class FakeLLM:
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0,
+                 failure_rate: float = 0.0, hang_rate: float = 0.0, bad_draft_rate: float = 0.0,
+                 per_prompt: float = 0.0, max_concurrent: int = None, seed: int = 0):
+        self.latency = latency
+        self.per_prompt = per_prompt
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.bad_draft_rate = bad_draft_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self._async_slots = {}  # event loop -> asyncio.Semaphore
+
+    def _reply(self, prompt: str) -> str:
+        category = "your request"
+        for line in prompt.splitlines():
+            if line.startswith("Category:"):
+                category = line.split(":", 1)[1].strip()
+        if self.bad_draft_rate and self._rng.random() < self.bad_draft_rate:
+            return " ".join(
+                f"Point {i} about {category} is covered here." for i in range(1, 9)
+            )
+        return (
+            f"Thanks for reaching out about {category}. "
+            "We have looked into your message and will follow up shortly."
+        )
+
+    def _plan_call(self) -> float:
+        self.calls += 1
+        if self._rng.random() < self.failure_rate:
+            raise RuntimeError("fake LLM failure")
+        delay = self.latency + self._rng.uniform(0, self.jitter)
+        if self._rng.random() < self.hang_rate:
+            delay = 3600.0
+        return delay
+
+    def _wait(self, delay: float):
+        if self._slots is None:
+            time.sleep(delay)
+            return
+        with self._slots:
+            time.sleep(delay)
+
+    async def _await(self, delay: float):
+        if self.max_concurrent is None:
+            await asyncio.sleep(delay)
+            return
+        loop = asyncio.get_running_loop()
+        slots = self._async_slots.get(loop)
+        if slots is None:
+            slots = self._async_slots[loop] = asyncio.Semaphore(self.max_concurrent)
+        async with slots:
+            await asyncio.sleep(delay)
+
+    def generate(self, prompt: str) -> str:
+        self._wait(self._plan_call() + self.per_prompt)
+        return self._reply(prompt)
+
+    async def agenerate(self, prompt: str) -> str:
+        await self._await(self._plan_call() + self.per_prompt)
+        return self._reply(prompt)
+
+    def generate_batch(self, prompts: list) -> list:
+        self._wait(self._plan_call() + self.per_prompt * len(prompts))
+        return [self._reply(prompt) for prompt in prompts]
+
+    async def agenerate_batch(self, prompts: list) -> list:
+        await self._await(self._plan_call() + self.per_prompt * len(prompts))
+        return [self._reply(prompt) for prompt in prompts]
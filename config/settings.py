@@ -1,3 +1,89 @@
-from .prompts import prompts_yml
+import marshal
+import os
+import sys
 
-DECISION_AGENT_PROMPT = prompts_yml["decision_agent"]
+CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Keyword tables, escalation triggers and high-risk categories
+# (tools/rule_store.py), reloaded by running services when the file changes
+CATEGORIES_PATH = os.path.join(CONFIG_DIR, "categories.yml")
+PROMPTS_PATH = os.path.join(CONFIG_DIR, "prompts.yml")
+
+# Bump when the snapshot file layout changes
+SNAPSHOT_FORMAT = 1
+
+
+def load_yaml(source):
+    """
+    Parse YAML text, bytes or an open file. Needs PyYAML; uses its libyaml
+    loader when built with it (several times faster on large rule files).
+    """
+    try:
+        import yaml
+    except ImportError as e:
+        raise ImportError("Config files need PyYAML: pip install pyyaml") from e
+    return yaml.load(source, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def snapshot_path(path: str, kind: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, "__pycache__", f"{name}.{kind}.snapshot")
+
+
+def load_snapshot(path: str, build, kind: str, version: int = 1):
+    """
+    build(raw_bytes) for the config file at path, cached in a binary
+    snapshot (config/__pycache__/<file>.<kind>.snapshot) so later
+    processes skip importing PyYAML, parsing and compiling.
+
+    build must return plain data (dicts, lists, tuples, sets, str, int...)
+    as the snapshot is written with marshal, which loads without importing
+    anything. The snapshot is used while the file's mtime and size, the
+    snapshot format, `version` (bump it when build's output changes) and
+    the marshal version all match what it was written with; otherwise
+    the file is built again and the snapshot rewritten. Snapshots are
+    trusted like the .pyc files next to them. If the snapshot can't be
+    written (read-only install), the file is just built every time.
+    """
+    st = os.stat(path)
+    key = (SNAPSHOT_FORMAT, kind, version, marshal.version, st.st_mtime_ns, st.st_size)
+    cached = snapshot_path(path, kind)
+    try:
+        with open(cached, "rb") as f:
+            if marshal.load(f) == key:
+                return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    with open(path, "rb") as f:
+        data = build(f.read())
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            marshal.dump(key, f)
+            marshal.dump(data, f)
+        os.replace(tmp, cached)
+    except OSError:
+        pass
+    return data
+
+
+def load_prompts(path: str = PROMPTS_PATH) -> dict:
+    """
+    The agent prompts (config/prompts.yml), from its snapshot when current.
+    """
+    return load_snapshot(path, load_yaml, "yaml")
+
+
+def __getattr__(name):
+    # prompts_yml / DECISION_AGENT_PROMPT are loaded on first use, so
+    # importing settings (every agent does) reads no YAML
+    if name == "prompts_yml":
+        value = load_prompts()
+    elif name == "DECISION_AGENT_PROMPT":
+        value = load_prompts()["decision_agent"]
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    setattr(sys.modules[__name__], name, value)
+    return value
@@ -1,41 +1,139 @@
 import json
+import sys
 from collections import Counter
 
-# Load the batch results file
-path = "data/batch_results.json"   # Update the path if your file is somewhere else
+# Batch results file: .json (one array), .jsonl (one result per line) or .parquet
+path = sys.argv[1] if len(sys.argv) > 1 else "data/batch_results.json"   # Update the path if your file is somewhere else
 
-with open(path, "r", encoding="utf-8") as f:
-    results = json.load(f)
+SAMPLE_SIZE = 3
+SAMPLE_FIELDS = ["id", "subject", "final_action", "needs_escalation", "sentiment", "final_reply"]
 
-print(f"Total emails processed: {len(results)}")
+
+def is_empty_reply(r):
+    return not r.get("final_reply")
+
+
+def is_weird(r):
+    return r.get("needs_escalation") is False and r.get("final_action") == "escalate_to_human"
+
+
+def new_stats():
+    return {
+        "total": 0,
+        "actions": Counter(),
+        "sentiments": Counter(),
+        "empty_replies": 0,
+        "empty_samples": [],
+        "weird_cases": 0,
+        "weird_samples": [],
+    }
+
+
+def scan_rows(rows):
+    """
+    Stats from result dicts, one at a time (JSON / JSONL).
+    """
+    stats = new_stats()
+    for r in rows:
+        stats["total"] += 1
+        stats["actions"][r.get("final_action", "None")] += 1
+        stats["sentiments"][r.get("sentiment", "None")] += 1
+        if is_empty_reply(r):
+            stats["empty_replies"] += 1
+            if len(stats["empty_samples"]) < SAMPLE_SIZE:
+                stats["empty_samples"].append(r)
+        if is_weird(r):
+            stats["weird_cases"] += 1
+            if len(stats["weird_samples"]) < SAMPLE_SIZE:
+                stats["weird_samples"].append(r)
+    return stats
+
+
+def iter_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def scan_parquet(path):
+    """
+    Stats from a Parquet file with column reads, one row group at a time.
+    Only the four columns the checks need are read; sample fields are read
+    only for row groups that still have samples to fill.
+    """
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    stats = new_stats()
+    parquet_file = pq.ParquetFile(path)
+
+    for group in range(parquet_file.num_row_groups):
+        table = parquet_file.read_row_group(
+            group, columns=["final_action", "sentiment", "needs_escalation", "final_reply"]
+        )
+        stats["total"] += table.num_rows
+
+        for key, column in (("actions", "final_action"), ("sentiments", "sentiment")):
+            for item in pc.value_counts(table[column]).to_pylist():
+                value = item["values"] if item["values"] is not None else "None"
+                stats[key][value] += item["counts"]
+
+        reply = table["final_reply"]
+        empty = pc.fill_null(pc.equal(reply, ""), True)
+        weird = pc.fill_null(
+            pc.and_(
+                pc.equal(table["needs_escalation"], False),
+                pc.equal(table["final_action"], "escalate_to_human")
+            ),
+            False
+        )
+
+        for key, mask in (("empty", empty), ("weird", weird)):
+            hits = pc.sum(mask).as_py() or 0
+            if key == "empty":
+                stats["empty_replies"] += hits
+            else:
+                stats["weird_cases"] += hits
+
+            samples = stats[f"{key}_samples"]
+            if hits and len(samples) < SAMPLE_SIZE:
+                rows = parquet_file.read_row_group(group, columns=SAMPLE_FIELDS).filter(mask)
+                samples.extend(rows.slice(0, SAMPLE_SIZE - len(samples)).to_pylist())
+
+    return stats
+
+
+if path.endswith(".parquet"):
+    stats = scan_parquet(path)
+elif path.endswith(".jsonl"):
+    stats = scan_rows(iter_jsonl(path))
+else:
+    # Load the batch results file
+    with open(path, "r", encoding="utf-8") as f:
+        stats = scan_rows(json.load(f))
+
+print(f"Total emails processed: {stats['total']}")
 
 # Count final actions
-actions = Counter(r.get("final_action", "None") for r in results)
 print("\nFinal actions distribution:")
-for action, count in actions.items():
+for action, count in stats["actions"].items():
     print(f"  {action}: {count}")
 
 # Count sentiments
-sentiments = Counter(r.get("sentiment", "None") for r in results)
 print("\nSentiment distribution:")
-for sentiment, count in sentiments.items():
+for sentiment, count in stats["sentiments"].items():
     print(f"  {sentiment}: {count}")
 
 # Find items with empty final_reply
-empty_replies = [r for r in results if not r.get("final_reply")]
-print(f"\nEmails with EMPTY final_reply: {len(empty_replies)}")
+print(f"\nEmails with EMPTY final_reply: {stats['empty_replies']}")
 
 # Check for logical inconsistencies
-weird_cases = [
-    r for r in results
-    if r.get("needs_escalation") is False and r.get("final_action") == "escalate_to_human"
-]
-
-print(f"\nWeird cases (needs_escalation is False but final_action is escalate_to_human): {len(weird_cases)}")
+print(f"\nWeird cases (needs_escalation is False but final_action is escalate_to_human): {stats['weird_cases']}")
 
 # Show sample weird cases
 print("\nSample weird cases:")
-for r in weird_cases[:3]:
+for r in stats["weird_samples"]:
     print(" id:", r.get("id"))
     print(" subject:", r.get("subject"))
     print(" needs_escalation:", r.get("needs_escalation"))
@@ -45,7 +143,7 @@ for r in weird_cases[:3]:
 
 # Show sample empty replies
 print("\nSample emails with empty final_reply:")
-for r in empty_replies[:3]:
+for r in stats["empty_samples"]:
     print(" id:", r.get("id"))
     print(" subject:", r.get("subject"))
     print(" final_action:", r.get("final_action"))
@@ -0,0 +1,162 @@
+"""
+Offline evaluation: score the pipeline against the gold labels in a CSV.
+
+Per-field accuracy and confusion matrices for category, urgency,
+sentiment and thread, plus precision / recall of escalation and
+reply-needed against the labeled yes/no columns gold_escalation and
+gold_reply_needed (each only when the CSV has it), reported next to the
+evaluation wall time and per-email pipeline latency.
+
+Also reported, as derived rather than gold: escalation against what
+DecisionAgent decides from the gold category, urgency and sentiment. It
+runs the agent under evaluation on both sides, so it only shows how
+classification mistakes turn into different routing, not whether the
+routing is right. No CRM is used on either side.
+
+Emails are streamed in chunks to a process pool; each worker returns the
+metrics of its chunk (evaluation/metrics.py), never the results, so
+memory stays flat however large the labeled corpus is.
+
+Run from the project root:
+    python evaluation/eval_pipeline.py
+    python evaluation/eval_pipeline.py --input data/labeled.csv --workers 4 --output data/eval_report.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+# Make sure project root and app/ are on sys.path, like run_batch.py
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+for path in (PROJECT_ROOT, os.path.join(PROJECT_ROOT, "app")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from run_batch import close_pipeline, iter_emails_from_csv, make_pipeline, process_email
+from agents.decision_agent import DecisionAgent
+from evaluation.metrics import EvalMetrics
+
+GOLD_COLUMNS = ("category", "urgency", "sentiment", "thread", "gold_escalation", "gold_reply_needed")
+
+
+def derived_escalation(decider: DecisionAgent, email: dict):
+    """
+    True / False from DecisionAgent on the gold labels, None if one of
+    them is missing.
+    """
+    labels = {c: (email.get(c) or "").strip().lower() for c in ("category", "urgency", "sentiment")}
+    if not all(labels.values()):
+        return None
+    decision = decider.decide(dict(labels, needs_escalation=False))
+    return decision.final_action == "escalate_to_human"
+
+
+def score_emails(pipeline, decider: DecisionAgent, emails) -> EvalMetrics:
+    metrics = EvalMetrics()
+    clock = time.perf_counter_ns
+    for email in emails:
+        start = clock()
+        result = process_email(pipeline, email)
+        latency = clock() - start
+        metrics.update(email, result, derived_escalation(decider, email), latency)
+    return metrics
+
+
+# One warm pipeline per worker process
+_worker_pipeline = None
+_worker_decider = None
+
+
+def _init_worker():
+    global _worker_pipeline, _worker_decider
+    _worker_pipeline = make_pipeline()
+    _worker_decider = DecisionAgent()
+
+
+def _score_chunk(chunk: list) -> EvalMetrics:
+    return score_emails(_worker_pipeline, _worker_decider, chunk)
+
+
+def evaluate(input_path: str, workers: int = 1, chunk_size: int = 500) -> EvalMetrics:
+    """
+    Score every email of a labeled CSV. With workers > 1, at most
+    2 * workers chunks are read ahead of the pool.
+
+    Per-sender memory does not feed any scored field, so chunks need no
+    sender affinity and the metrics match a serial run exactly.
+    """
+    emails = iter_emails_from_csv(input_path, extra_columns=GOLD_COLUMNS)
+    metrics = EvalMetrics()
+
+    if workers <= 1:
+        pipeline = make_pipeline()
+        metrics.merge(score_emails(pipeline, DecisionAgent(), emails))
+        close_pipeline(pipeline)
+        return metrics
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+        while True:
+            while len(pending) < workers * 2:
+                chunk = list(islice(emails, chunk_size))
+                if not chunk:
+                    break
+                pending.add(pool.submit(_score_chunk, chunk))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                metrics.merge(future.result())
+                print(f"Scored {metrics.emails} emails")
+
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the pipeline against gold labels.")
+    parser.add_argument(
+        "--input", default=os.path.join(PROJECT_ROOT, "data", "emails.csv"),
+        help=(
+            "CSV with subject, body and gold category / urgency / sentiment / thread columns, "
+            "optionally gold_escalation / gold_reply_needed (yes/no)."
+        )
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default: 1, serial).")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Emails per worker task.")
+    parser.add_argument("--output", help="Also write the full summary here as JSON.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    metrics = evaluate(args.input, workers=args.workers, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
+
+    summary = metrics.summary()
+    summary["eval_seconds"] = elapsed
+    summary["emails_per_second"] = metrics.emails / elapsed if elapsed else 0.0
+    summary["workers"] = args.workers
+
+    print(metrics.report())
+    print()
+    print(
+        f"Evaluated {metrics.emails} emails in {elapsed:.2f}s "
+        f"({summary['emails_per_second']:.0f} emails/s, {args.workers} worker(s))"
+    )
+    latency = summary.get("pipeline_latency")
+    if latency:
+        print(
+            f"Pipeline latency per email: mean {latency['mean_ms']:.3f} ms, "
+            f"p50 {latency['p50_ms']:.3f} ms, p95 {latency['p95_ms']:.3f} ms, p99 {latency['p99_ms']:.3f} ms"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
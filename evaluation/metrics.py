@@ -0,0 +1,265 @@
+import os
+import sys
+
+# Make sure project root is on sys.path so we can import 'tools'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from tools.logging_tools import LatencyHistogram
+
+
+class ConfusionMatrix:
+    """
+    Counts of (gold, predicted) label pairs for one field.
+
+    Memory grows with the number of distinct label pairs, not with the
+    number of emails, and two matrices built on different shards of a
+    corpus merge() into the matrix of the whole corpus.
+    """
+
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        self.counts = {}
+
+    def update(self, gold: str, predicted: str):
+        key = (gold, predicted)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def merge(self, other: "ConfusionMatrix"):
+        for key, n in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def correct(self) -> int:
+        return sum(n for (gold, predicted), n in self.counts.items() if gold == predicted)
+
+    @property
+    def accuracy(self) -> float:
+        total = self.total
+        return self.correct / total if total else 0.0
+
+    def labels(self) -> list:
+        return sorted({label for pair in self.counts for label in pair})
+
+    def per_label(self) -> dict:
+        """
+        {label: {"precision", "recall", "support"}}, support being the
+        number of emails with that gold label.
+        """
+        stats = {}
+        for label in self.labels():
+            tp = self.counts.get((label, label), 0)
+            predicted = sum(n for (_, p), n in self.counts.items() if p == label)
+            support = sum(n for (g, _), n in self.counts.items() if g == label)
+            stats[label] = {
+                "precision": tp / predicted if predicted else 0.0,
+                "recall": tp / support if support else 0.0,
+                "support": support,
+            }
+        return stats
+
+    def to_dict(self) -> dict:
+        """
+        {gold: {predicted: count}}
+        """
+        matrix = {}
+        for (gold, predicted), n in sorted(self.counts.items()):
+            matrix.setdefault(gold, {})[predicted] = n
+        return matrix
+
+    def format(self) -> str:
+        """
+        Gold labels down, predicted labels across.
+        """
+        labels = self.labels()
+        width = max([len(label) for label in labels] + [10]) + 2
+        corner = "gold \\ pred"
+        lines = [f"{corner:<{width}}" + "".join(f"{label:>{width}}" for label in labels)]
+        for gold in labels:
+            lines.append(
+                f"{gold:<{width}}"
+                + "".join(f"{self.counts.get((gold, predicted), 0):>{width}}" for predicted in labels)
+            )
+        return "\n".join(lines)
+
+
+class BinaryCounts:
+    """
+    Confusion counts for a yes/no outcome, mergeable like ConfusionMatrix.
+    """
+
+    __slots__ = ("tp", "fp", "fn", "tn")
+
+    def __init__(self):
+        self.tp = self.fp = self.fn = self.tn = 0
+
+    def update(self, gold: bool, predicted: bool):
+        if predicted:
+            if gold:
+                self.tp += 1
+            else:
+                self.fp += 1
+        elif gold:
+            self.fn += 1
+        else:
+            self.tn += 1
+
+    @property
+    def total(self) -> int:
+        return self.tp + self.fp + self.fn + self.tn
+
+    def merge(self, other: "BinaryCounts"):
+        self.tp += other.tp
+        self.fp += other.fp
+        self.fn += other.fn
+        self.tn += other.tn
+
+    @property
+    def precision(self) -> float:
+        flagged = self.tp + self.fp
+        return self.tp / flagged if flagged else 0.0
+
+    @property
+    def recall(self) -> float:
+        relevant = self.tp + self.fn
+        return self.tp / relevant if relevant else 0.0
+
+    @property
+    def f1(self) -> float:
+        p, r = self.precision, self.recall
+        return 2 * p * r / (p + r) if p + r else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "tp": self.tp, "fp": self.fp, "fn": self.fn, "tn": self.tn,
+            "precision": self.precision, "recall": self.recall, "f1": self.f1,
+        }
+
+
+class EvalMetrics:
+    """
+    Streaming quality and latency metrics for one evaluation run.
+
+    update() is called once per email with its gold labels and the
+    flattened pipeline result (app/run_batch.flatten_result); nothing per
+    email is kept. Workers each fill their own EvalMetrics and the parent
+    merge()s them, so the result does not depend on how emails were split.
+
+    FIELDS maps gold CSV columns to result fields. A gold label left empty
+    is not scored for that field.
+
+    OUTCOMES maps yes/no gold columns to the outcomes scored against them:
+    escalation (the email went to a human) and reply_needed (it gets a
+    reply: drafted by the pipeline or left to a human). A value other
+    than yes/no (true/false, 1/0) is not scored.
+
+    derived_escalation is kept apart: its "gold" side is computed, not
+    labeled (see update()), so it is reported as derived.
+    """
+
+    FIELDS = {
+        "category": "category",
+        "urgency": "urgency",
+        "sentiment": "sentiment",
+        "thread": "thread_status",
+    }
+    OUTCOMES = {
+        "gold_escalation": "escalation",
+        "gold_reply_needed": "reply_needed",
+    }
+    QUANTILES = (50, 95, 99)
+
+    YES = frozenset(("yes", "true", "1"))
+    NO = frozenset(("no", "false", "0"))
+
+    def __init__(self):
+        self.emails = 0
+        self.matrices = {field: ConfusionMatrix() for field in self.FIELDS}
+        self.outcomes = {outcome: BinaryCounts() for outcome in self.OUTCOMES.values()}
+        self.derived_escalation = BinaryCounts()
+        self.latency = LatencyHistogram()
+
+    @staticmethod
+    def predicted(outcome: str, result: dict) -> bool:
+        escalated = result.get("final_action") == "escalate_to_human"
+        if outcome == "escalation":
+            return escalated
+        return escalated or bool(result.get("final_reply"))
+
+    def update(self, gold: dict, result: dict, derived_escalation: bool = None,
+               latency_ns: int = None):
+        """
+        derived_escalation: whether the email should be escalated as
+        derived from its other gold labels (e.g. by a DecisionAgent), or
+        None when unknown (not scored).
+        """
+        self.emails += 1
+        for column, field in self.FIELDS.items():
+            label = (gold.get(column) or "").strip().lower()
+            if label:
+                self.matrices[column].update(label, result.get(field))
+        for column, outcome in self.OUTCOMES.items():
+            label = (gold.get(column) or "").strip().lower()
+            if label in self.YES or label in self.NO:
+                self.outcomes[outcome].update(label in self.YES, self.predicted(outcome, result))
+        if derived_escalation is not None:
+            self.derived_escalation.update(derived_escalation, self.predicted("escalation", result))
+        if latency_ns is not None:
+            self.latency.record(latency_ns)
+
+    def merge(self, other: "EvalMetrics"):
+        self.emails += other.emails
+        for column, matrix in other.matrices.items():
+            self.matrices[column].merge(matrix)
+        for outcome, counts in other.outcomes.items():
+            self.outcomes[outcome].merge(counts)
+        self.derived_escalation.merge(other.derived_escalation)
+        self.latency.merge(other.latency)
+
+    def summary(self) -> dict:
+        summary = {
+            "emails": self.emails,
+            "accuracy": {column: m.accuracy for column, m in self.matrices.items() if m.total},
+            "outcomes": {outcome: c.to_dict() for outcome, c in self.outcomes.items() if c.total},
+            "derived_escalation": self.derived_escalation.to_dict(),
+            "confusion": {column: m.to_dict() for column, m in self.matrices.items() if m.total},
+            "per_label": {column: m.per_label() for column, m in self.matrices.items() if m.total},
+        }
+        h = self.latency
+        if h.count:
+            latency = {"mean_ms": h.total_ns / h.count / 1e6, "max_ms": h.max_ns / 1e6}
+            for q in self.QUANTILES:
+                latency[f"p{q}_ms"] = h.percentile(q) / 1e6
+            summary["pipeline_latency"] = latency
+        return summary
+
+    def report(self) -> str:
+        lines = [f"{'field':<12}{'scored':>9}{'accuracy':>10}"]
+        for column, m in self.matrices.items():
+            if m.total:
+                lines.append(f"{column:<12}{m.total:>9}{m.accuracy:>10.3f}")
+
+        scored = [(outcome, c) for outcome, c in self.outcomes.items() if c.total]
+        if self.derived_escalation.total:
+            scored.append(("escalation, derived from the gold labels", self.derived_escalation))
+        if scored:
+            lines.append("")
+        for name, c in scored:
+            lines.append(
+                f"{name}: precision {c.precision:.3f}  recall {c.recall:.3f}  f1 {c.f1:.3f}"
+                f"  (tp={c.tp} fp={c.fp} fn={c.fn} tn={c.tn})"
+            )
+
+        for column, m in self.matrices.items():
+            if m.total:
+                lines.append("")
+                lines.append(f"{column} confusion:")
+                lines.append(m.format())
+        return "\n".join(lines)
@@ -0,0 +1,444 @@
+"""
+Long-running email ingestion service.
+
+Claims emails from a local spool directory or a SQLite queue, runs them
+through warm EmailSupportPipeline instances in worker processes, appends
+each result to a JSONL file and acks the message only once its result is
+written. Delivery is at-least-once: a crash between writing and acking
+processes that message again after restart.
+
+    python main.py enqueue --spool data/spool --input data/emails.csv
+    python main.py serve --spool data/spool --workers 4 --metrics-out data/service.prom
+    python main.py serve --queue-db data/queue.db --exit-when-empty
+
+SIGTERM / SIGINT stop claiming, finish and ack what is in flight, then
+exit. A second signal exits at once; its unacked messages are recovered
+on the next start.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+import zlib
+from collections import deque
+
+# Make sure project root and app/ are on sys.path, like the app/ scripts
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(CURRENT_DIR, "app")
+for path in (CURRENT_DIR, APP_DIR):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from run_batch import close_pipeline, flatten_result, iter_emails, make_pipeline, process_email
+from tools.logging_tools import ServiceMetrics
+from tools.priority_scheduler import PriorityScheduler
+from tools.work_queue import QueueFull, SpoolQueue, SQLiteQueue
+
+
+def _worker_main(inbox, outbox, memory_db_path: str = None, crm_source: str = None,
+                 schedule: bool = False):
+    """
+    Worker process: one warm pipeline, (token, email) in, (token, result,
+    error) out, until the parent sends None.
+
+    schedule: triage every email as soon as it arrives and make replies
+    in urgency-deadline order (tools/priority_scheduler.py) among the
+    emails this worker holds, i.e. its share of max_inflight.
+    """
+    # The parent owns shutdown: it drains in-flight work, then sends None
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    parent = os.getppid()
+
+    pipeline = make_pipeline(memory_db_path, crm_source=crm_source)
+    scheduler = PriorityScheduler() if schedule else None
+    try:
+        while True:
+            try:
+                if scheduler is not None and len(scheduler):
+                    # Take in everything that has arrived before the next reply
+                    item = inbox.get_nowait()
+                else:
+                    item = inbox.get(timeout=1.0)
+            except queue.Empty:
+                if scheduler is not None and len(scheduler):
+                    _respond_next(pipeline, scheduler, outbox)
+                elif os.getppid() != parent:
+                    break
+                continue
+            if item is None:
+                break
+
+            token, email = item
+            try:
+                if scheduler is None:
+                    outbox.put((token, process_email(pipeline, email), None))
+                    continue
+                triaged = pipeline.triage(
+                    subject=email["subject"],
+                    body=email["body"],
+                    sender=email.get("sender", "unknown"),
+                    thread_status=email.get("thread_status")
+                )
+                if triaged.decision.final_action == "approve":
+                    scheduler.push((token, email, triaged), triaged.classification.urgency)
+                else:
+                    outbox.put((token, flatten_result(email, pipeline.respond(triaged)), None))
+            except Exception as e:
+                outbox.put((token, None, repr(e)))
+    finally:
+        close_pipeline(pipeline)
+        if scheduler is not None:
+            print(scheduler.report())
+
+
+def _respond_next(pipeline, scheduler: PriorityScheduler, outbox):
+    entry = scheduler.pop()
+    token, email, triaged = entry.item
+    try:
+        outbox.put((token, flatten_result(email, pipeline.respond(triaged)), None))
+    except Exception as e:
+        outbox.put((token, None, repr(e)))
+    scheduler.done(entry)
+
+
+class IngestService:
+    """
+    Claim -> dispatch -> collect -> write -> ack loop over a WorkQueue.
+
+    Backpressure: at most max_inflight messages are claimed and not yet
+    acked; the rest stay in the queue (where producers see it through
+    WorkQueue.put's max_depth). Each worker gets at most
+    max_inflight // workers of them at once. Known senders always go to
+    the same worker, so per-sender memory sees their emails in order, as
+    in run_batch's sharding.
+
+    With schedule, workers reply to the emails they hold by urgency
+    (see _worker_main); claim-to-ack latency is reported per urgency
+    either way.
+
+    A message held by a worker that dies goes back to the queue, unless
+    it has been delivered max_deliveries times: then it is failed as a
+    dead letter, so a message that crashes its worker (e.g. a
+    pathological MIME body) cannot kill every fresh worker in turn.
+    Messages the worker held alongside it are charged a delivery too.
+    """
+
+    def __init__(self, work_queue, output_path: str, workers: int = 2, max_inflight: int = 64,
+                 memory_db_path: str = None, crm_source: str = None, metrics_out: str = None,
+                 metrics_every: float = 10.0, poll_interval: float = 0.5,
+                 exit_when_empty: bool = False, schedule: bool = False, max_deliveries: int = 3):
+        self.work_queue = work_queue
+        self.output_path = output_path
+        self.workers = workers
+        self.max_inflight = max(max_inflight, workers)
+        self.prefetch = max(1, self.max_inflight // workers)
+        self.memory_db_path = memory_db_path
+        self.crm_source = crm_source
+        self.metrics_out = metrics_out
+        self.metrics_every = metrics_every
+        self.poll_interval = poll_interval
+        self.exit_when_empty = exit_when_empty
+        self.schedule = schedule
+        self.max_deliveries = max_deliveries
+
+        self.metrics = ServiceMetrics()
+        self._stopping = False
+        self._inflight = {}                      # token -> (worker index, claimed at ns)
+        self._pending = [deque() for _ in range(workers)]  # claimed, waiting for a worker slot
+        self._load = [0] * workers               # messages sent to each worker, not yet back
+        self._procs = [None] * workers
+        self._inboxes = [None] * workers
+        self._outbox = multiprocessing.Queue()
+        self._round_robin = 0
+        self._out = None
+
+    # ------------------------------
+    # Workers
+    # ------------------------------
+    def _start_worker(self, index: int):
+        inbox = multiprocessing.Queue()
+        proc = multiprocessing.Process(
+            target=_worker_main,
+            args=(inbox, self._outbox, self.memory_db_path, self.crm_source, self.schedule),
+            name=f"pipeline-worker-{index}",
+            daemon=True
+        )
+        proc.start()
+        self._inboxes[index] = inbox
+        self._procs[index] = proc
+
+    def _check_workers(self):
+        """
+        Restart dead workers and hand the messages they held back to the
+        queue, or fail those already delivered max_deliveries times.
+        """
+        for index, proc in enumerate(self._procs):
+            if proc.is_alive():
+                continue
+            waiting = {token for token, _ in self._pending[index]}
+            lost = [
+                token for token, (i, _) in self._inflight.items()
+                if i == index and token not in waiting
+            ]
+            failed = 0
+            now = time.perf_counter_ns()
+            for token in lost:
+                _, claimed_at = self._inflight.pop(token)
+                deliveries = self.work_queue.deliveries(token)
+                if deliveries < self.max_deliveries:
+                    self.work_queue.nack(token)
+                    continue
+                self.work_queue.fail(
+                    token, f"worker exited (code {proc.exitcode}) holding it, delivery {deliveries}"
+                )
+                self.metrics.record(now - claimed_at, ok=False)
+                failed += 1
+            note = f", failed {failed} delivered {self.max_deliveries} times" if failed else ""
+            print(
+                f"Worker {index} exited (code {proc.exitcode}); "
+                f"returned {len(lost) - failed} messages to the queue{note}"
+            )
+            self._load[index] = 0
+            self._start_worker(index)
+
+    def _stop_workers(self, timeout: float = 30.0):
+        for index, inbox in enumerate(self._inboxes):
+            if inbox is not None and self._procs[index].is_alive():
+                inbox.put(None)
+        deadline = time.monotonic() + timeout
+        for proc in self._procs:
+            if proc is None:
+                continue
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+
+    # ------------------------------
+    # Claim / dispatch / collect
+    # ------------------------------
+    def _route(self, email: dict) -> int:
+        sender = email.get("sender", "unknown")
+        if sender == "unknown":
+            self._round_robin = (self._round_robin + 1) % self.workers
+            return self._round_robin
+        return zlib.crc32(sender.encode("utf-8")) % self.workers
+
+    def _claim(self) -> int:
+        room = self.max_inflight - len(self._inflight)
+        if self._stopping or room <= 0:
+            return 0
+
+        batch = self.work_queue.claim(room)
+        now = time.perf_counter_ns()
+        for token, email in batch:
+            index = self._route(email)
+            self._inflight[token] = (index, now)
+            self._pending[index].append((token, email))
+        return len(batch)
+
+    def _dispatch(self):
+        for index, pending in enumerate(self._pending):
+            inbox = self._inboxes[index]
+            while pending and self._load[index] < self.prefetch:
+                inbox.put(pending.popleft())
+                self._load[index] += 1
+
+    def _collect(self, timeout: float) -> int:
+        """
+        Wait up to timeout for results, write them, then ack the batch.
+        """
+        results = []
+        try:
+            results.append(self._outbox.get(timeout=timeout))
+            while True:
+                results.append(self._outbox.get_nowait())
+        except queue.Empty:
+            pass
+
+        acks = []
+        now = time.perf_counter_ns()
+        for token, result, error in results:
+            entry = self._inflight.pop(token, None)
+            if entry is None:
+                # Already handed back by _check_workers
+                continue
+            index, claimed_at = entry
+            self._load[index] -= 1
+            if error is None:
+                self._out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                acks.append(token)
+            else:
+                self.work_queue.fail(token, error)
+            self.metrics.record(
+                now - claimed_at, ok=error is None,
+                urgency=result.get("urgency") if result is not None else None
+            )
+
+        if acks:
+            # Results must be written before their messages leave the queue
+            self._out.flush()
+            self.work_queue.ack_many(acks)
+        return len(results)
+
+    # ------------------------------
+    # Metrics / signals
+    # ------------------------------
+    def _report(self):
+        self.metrics.queue_depth = self.work_queue.depth()
+        self.metrics.inflight = len(self._inflight)
+        snapshot = self.metrics.snapshot()
+        print(self.metrics.report(snapshot))
+        if self.metrics_out:
+            self.metrics.export(self.metrics_out, snapshot)
+
+    def request_stop(self, signum=None, frame=None):
+        if self._stopping:
+            raise SystemExit(f"Second signal: exiting with {len(self._inflight)} messages unacked")
+        self._stopping = True
+        print(f"Stopping: draining {len(self._inflight)} in-flight messages")
+
+    # ------------------------------
+    # Main loop
+    # ------------------------------
+    def run(self):
+        recovered = self.work_queue.recover()
+        if recovered:
+            print(f"Recovered {recovered} unacked messages from a previous run")
+
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        for index in range(self.workers):
+            self._start_worker(index)
+
+        self._out = open(self.output_path, "a", encoding="utf-8")
+        next_report = time.monotonic() + self.metrics_every
+        try:
+            while True:
+                claimed = self._claim()
+                self._dispatch()
+
+                if self._inflight:
+                    if not self._collect(self.poll_interval):
+                        self._check_workers()
+                elif self._stopping or (self.exit_when_empty and not claimed):
+                    break
+                elif not claimed:
+                    time.sleep(self.poll_interval)
+
+                if time.monotonic() >= next_report:
+                    self._report()
+                    next_report = time.monotonic() + self.metrics_every
+        finally:
+            self._stop_workers()
+            self._out.close()
+            self._report()
+
+
+def open_queue(args):
+    if args.spool:
+        return SpoolQueue(args.spool, max_depth=args.max_depth)
+    return SQLiteQueue(args.queue_db, max_depth=args.max_depth)
+
+
+def enqueue(work_queue, input_path: str, timeout: float = None) -> int:
+    count = 0
+    for email in iter_emails(input_path):
+        work_queue.put(email, timeout=timeout)
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-running email ingestion service.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="Process queued emails until SIGTERM.")
+    fill = sub.add_parser("enqueue", help="Add emails from a CSV / mbox / Maildir to the queue.")
+
+    for p in (serve, fill):
+        source = p.add_mutually_exclusive_group(required=True)
+        source.add_argument("--spool", help="Spool directory (tmp/ incoming/ processing/ failed/).")
+        source.add_argument("--queue-db", help="SQLite queue file.")
+        p.add_argument(
+            "--max-depth", type=int, default=None,
+            help="Producers wait while this many emails are queued (default: unbounded)."
+        )
+
+    serve.add_argument("--workers", type=int, default=2, help="Worker processes (warm pipelines).")
+    serve.add_argument(
+        "--max-inflight", type=int, default=64,
+        help="Emails claimed but not yet acked, across all workers."
+    )
+    serve.add_argument(
+        "--output", default=os.path.join(CURRENT_DIR, "data", "service_results.jsonl"),
+        help="JSONL file results are appended to."
+    )
+    serve.add_argument("--memory-db", help="SQLite file for persistent per-sender memory.")
+    serve.add_argument("--crm", help="CRM for customer context: SQLite file or http(s) URL.")
+    serve.add_argument(
+        "--metrics-out",
+        help="Export metrics here every --metrics-every seconds (.prom: Prometheus text, otherwise JSON)."
+    )
+    serve.add_argument("--metrics-every", type=float, default=10.0)
+    serve.add_argument(
+        "--poll-interval", type=float, default=0.5, help="Seconds between polls of an empty queue."
+    )
+    serve.add_argument(
+        "--exit-when-empty", action="store_true",
+        help="Exit once the queue is empty and nothing is in flight."
+    )
+    serve.add_argument(
+        "--schedule", action="store_true",
+        help=(
+            "Workers triage the emails they hold first and reply by urgency deadline; "
+            "raise --max-inflight to widen the window."
+        )
+    )
+    serve.add_argument(
+        "--max-deliveries", type=int, default=3,
+        help="Fail a message as a dead letter once a worker died holding it on its Nth delivery."
+    )
+
+    fill.add_argument("--input", required=True, help="Input CSV, mbox file or Maildir directory.")
+    fill.add_argument(
+        "--timeout", type=float, default=None,
+        help="With --max-depth: give up after waiting this many seconds for room."
+    )
+    args = parser.parse_args()
+
+    with open_queue(args) as work_queue:
+        if args.command == "enqueue":
+            try:
+                count = enqueue(work_queue, args.input, timeout=args.timeout)
+            except QueueFull as e:
+                sys.exit(f"Queue full: {e}")
+            print(f"Enqueued {count} emails (queue depth {work_queue.depth()})")
+            return
+
+        service = IngestService(
+            work_queue,
+            args.output,
+            workers=args.workers,
+            max_inflight=args.max_inflight,
+            memory_db_path=args.memory_db,
+            crm_source=args.crm,
+            metrics_out=args.metrics_out,
+            metrics_every=args.metrics_every,
+            poll_interval=args.poll_interval,
+            exit_when_empty=args.exit_when_empty,
+            schedule=args.schedule,
+            max_deliveries=args.max_deliveries
+        )
+        service.run()
+        print(f"Service stopped. Results in {os.path.relpath(args.output, CURRENT_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+import hashlib
+import os
+import string
+import sys
+import time
+import zlib
+from collections import OrderedDict
+
+# Make sure project root is on sys.path so we can import 'tools'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from tools.logging_tools import LatencyHistogram
+
+# Digits and punctuation separate words and are dropped, so order numbers,
+# amounts and formatting don't count
+_SEPARATORS = str.maketrans(
+    {c: " " for c in string.punctuation + string.digits + "\u2018\u2019\u201c\u201d\u2013\u2014\u2026"}
+)
+
+
+class MinHasher:
+    """
+    Word shingles of a text and MinHash signatures over them.
+
+    Shingles are hashed with crc32, so hashes and signatures are the same
+    in every process and run. Signatures use one-permutation hashing: each
+    shingle hash lands in one of num_perm bins by its top bits and each bin
+    keeps its smallest hash, instead of hashing every shingle num_perm
+    times. Bins no shingle landed in borrow the value of the next filled
+    bin (rotation densification), so short emails still get a full
+    signature.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3):
+        if num_perm < 2 or num_perm & (num_perm - 1):
+            raise ValueError("num_perm must be a power of two")
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._bin_shift = 32 - (num_perm.bit_length() - 1)
+
+    @staticmethod
+    def words(text: str) -> list:
+        return text.lower().translate(_SEPARATORS).split()
+
+    def shingles(self, text: str) -> list:
+        """
+        Word n-grams as strings. A text shorter than shingle_size words is
+        one shingle.
+        """
+        words = self.words(text)
+        n = self.shingle_size
+        if len(words) <= n:
+            return [" ".join(words)] if words else []
+        return list(map(" ".join, zip(*[words[i:] for i in range(n)])))
+
+    def shingle_hashes(self, text: str) -> frozenset:
+        return frozenset(map(zlib.crc32, map(str.encode, self.shingles(text))))
+
+    def signature(self, hashes) -> tuple:
+        """
+        Tuple of num_perm ints for a non-empty set of shingle hashes.
+        """
+        # A hash's bin is its top bits, so the smallest value of a bin is
+        # its smallest hash: with hashes sorted descending, the last
+        # (smallest) write per bin wins
+        shift = self._bin_shift
+        bins = {h >> shift: h for h in sorted(hashes, reverse=True)}
+        if len(bins) == self.num_perm:
+            return tuple(map(bins.__getitem__, range(self.num_perm)))
+        return self._densify(bins)
+
+    def _densify(self, bins: dict) -> tuple:
+        # An empty bin takes the value of the next filled bin to its right
+        # (wrapping around), offset by 2**32 per bin skipped so borrowed
+        # values never equal real ones
+        size = self.num_perm
+        signature = [0] * size
+        start = max(bins)
+        value = signature[start] = bins[start]
+        distance = 0
+        for offset in range(1, size):
+            i = (start - offset) % size
+            filled = bins.get(i)
+            if filled is None:
+                distance += 1
+                signature[i] = value + (distance << 32)
+            else:
+                signature[i] = value = filled
+                distance = 0
+        return tuple(signature)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+class DedupEntry:
+    """
+    One indexed email: the representative of a near-duplicate cluster.
+    """
+
+    __slots__ = ("cluster_id", "hashes", "value", "key", "added_at", "band_keys")
+
+    def __init__(self, cluster_id: str, hashes: frozenset, value, key, added_at: float,
+                 band_keys: tuple):
+        self.cluster_id = cluster_id
+        self.hashes = hashes
+        self.value = value
+        self.key = key
+        self.added_at = added_at
+        self.band_keys = band_keys
+
+
+class DedupMatch:
+    """
+    lookup() result. entry is the matching cluster representative (None
+    on a miss) and similarity its Jaccard similarity. The shingle hashes,
+    signature and key are kept so a miss can be add()ed without
+    hashing the text again.
+    """
+
+    __slots__ = ("hashes", "signature", "key", "entry", "similarity")
+
+    def __init__(self, hashes: frozenset, signature: tuple, key=None,
+                 entry: DedupEntry = None, similarity: float = 0.0):
+        self.hashes = hashes
+        self.signature = signature
+        self.key = key
+        self.entry = entry
+        self.similarity = similarity
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH index over the clean_body of recently processed emails.
+
+    lookup() finds an indexed email whose Jaccard similarity over word
+    shingles is at least `threshold`. Only misses are add()ed, each
+    starting a cluster, so during an incident thousands of near-identical
+    emails hit one entry and the index stays small.
+
+    Signatures are split into bands of rows_per_band values, and emails
+    sharing any band are candidates. Candidates are then checked on their
+    exact shingle-hash sets: short emails have few shingles, which makes
+    signature estimates too noisy to decide on (+-0.1 at ~12 shingles).
+    The defaults (64 values, 16 bands of 4) put the LSH threshold near
+    0.5, well below `threshold`.
+
+    Candidates are checked newest first (per band) and the first one over
+    the threshold is the match. At most max_candidates are checked per
+    lookup: at a high threshold, variants of one incident report just
+    under it each start a cluster, and all of them share bands.
+
+    Bounded: entries older than window_seconds are dropped, and the oldest
+    beyond max_entries. An entry only matches lookups with an equal key
+    (e.g. the rules version and labels the email was classified with).
+
+    stats() reports hit rate and lookup latency (hashing + search).
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, rows_per_band: int = 4,
+                 shingle_size: int = 3, window_seconds: float = 600.0, max_entries: int = 10000,
+                 max_candidates: int = 32, clock=time.monotonic):
+        if num_perm % rows_per_band:
+            raise ValueError("num_perm must be a multiple of rows_per_band")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+        self.rows_per_band = rows_per_band
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.max_candidates = max_candidates
+        self.clock = clock
+
+        self._entries = OrderedDict()  # cluster_id -> DedupEntry, oldest first
+        # (band, band values) -> {cluster_id: None}, an ordered set
+        self._buckets = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.candidates = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.lookup_latency = LatencyHistogram()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, signature: tuple) -> tuple:
+        r = self.rows_per_band
+        return tuple((band, signature[band * r:band * r + r]) for band in range(len(signature) // r))
+
+    def lookup(self, text: str, key=None) -> DedupMatch:
+        """
+        The most recently indexed near-duplicate with an equal key found
+        in the candidates. A text without words is never matched or
+        indexed (hashes empty).
+        """
+        start = time.perf_counter_ns()
+        self._expire(self.clock())
+
+        hashes = self.hasher.shingle_hashes(text)
+        if not hashes:
+            self.skipped += 1
+            return DedupMatch(hashes, None, key)
+        signature = self.hasher.signature(hashes)
+
+        match = self._search(hashes, signature, key)
+        if match.entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        self.lookup_latency.record(time.perf_counter_ns() - start)
+        return match
+
+    def _search(self, hashes: frozenset, signature: tuple, key) -> DedupMatch:
+        threshold = self.threshold
+        entries = self._entries
+        buckets = self._buckets
+        seen = set()
+        checked = 0
+        for band_key in self._band_keys(signature):
+            bucket = buckets.get(band_key)
+            if bucket is None:
+                continue
+            for cluster_id in reversed(bucket):
+                if cluster_id in seen:
+                    continue
+                seen.add(cluster_id)
+                entry = entries[cluster_id]
+                if entry.key != key:
+                    continue
+                checked += 1
+                similarity = jaccard(hashes, entry.hashes)
+                if similarity >= threshold:
+                    self.candidates += checked
+                    return DedupMatch(hashes, signature, key, entry, similarity)
+                if checked == self.max_candidates:
+                    self.candidates += checked
+                    return DedupMatch(hashes, signature, key)
+        self.candidates += checked
+        return DedupMatch(hashes, signature, key)
+
+    def add(self, match: DedupMatch, value) -> str:
+        """
+        Index a lookup() miss as a new cluster; value is what its later
+        near-duplicates get back (entry.value). Returns the cluster id, a
+        hash of the key and the shingles, so it is the same in every
+        process, and the same text under another key (e.g. other labels)
+        is a separate cluster with its own id, as lookup() treats it.
+        """
+        hashes = match.hashes
+        digest = hashlib.blake2b(repr(match.key).encode("utf-8") + b"\x00", digest_size=6)
+        digest.update(b"".join(h.to_bytes(4, "big") for h in sorted(hashes)))
+        cluster_id = digest.hexdigest()
+        if cluster_id in self._entries:
+            self._remove(cluster_id)
+
+        band_keys = self._band_keys(match.signature)
+        self._entries[cluster_id] = DedupEntry(
+            cluster_id, hashes, value, match.key, self.clock(), band_keys
+        )
+        buckets = self._buckets
+        for band_key in band_keys:
+            bucket = buckets.get(band_key)
+            if bucket is None:
+                bucket = buckets[band_key] = {}
+            bucket[cluster_id] = None
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return cluster_id
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        entries = self._entries
+        while entries:
+            entry = entries[next(iter(entries))]
+            if entry.added_at > cutoff:
+                break
+            self._remove(entry.cluster_id)
+            self.expirations += 1
+
+    def _remove(self, cluster_id: str):
+        entry = self._entries.pop(cluster_id)
+        for band_key in entry.band_keys:
+            bucket = self._buckets[band_key]
+            del bucket[cluster_id]
+            if not bucket:
+                del self._buckets[band_key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        h = self.lookup_latency
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "candidates_per_lookup": self.candidates / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self._entries),
+            "buckets": len(self._buckets),
+            "lookup_mean_us": h.total_ns / h.count / 1e3 if h.count else 0.0,
+            "lookup_p99_us": h.percentile(99) / 1e3,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"Dedup: {s['hits']} hits / {s['hits'] + s['misses']} lookups "
+            f"(hit rate {s['hit_rate']:.1%}), {s['size']} clusters indexed, "
+            f"{s['candidates_per_lookup']:.2f} candidates per lookup, "
+            f"lookup mean {s['lookup_mean_us']:.1f} us, p99 {s['lookup_p99_us']:.1f} us"
+        )
@@ -0,0 +1,185 @@
+import sqlite3
+import time
+from collections import OrderedDict
+
+
+class MemoryRecord:
+    """
+    Per-sender memory, the same fields ClassificationAgent keeps in its
+    plain dict memory.
+    """
+
+    __slots__ = ("message_count", "last_category", "last_sentiment", "updated_at")
+
+    def __init__(self, message_count: int = 0, last_category: str = None,
+                 last_sentiment: str = None, updated_at: float = 0.0):
+        self.message_count = message_count
+        self.last_category = last_category
+        self.last_sentiment = last_sentiment
+        self.updated_at = updated_at
+
+    def to_dict(self) -> dict:
+        return {
+            "message_count": self.message_count,
+            "last_category": self.last_category,
+            "last_sentiment": self.last_sentiment
+        }
+
+
+class MemoryBank:
+    """
+    Persistent, bounded per-sender memory.
+
+    - SQLite store (WAL mode) holds every sender
+    - in-process LRU hot tier of `hot_size` records in front of it
+    - update_memory() is write-behind: changes are batched and written
+      every `flush_every` dirty senders, and on flush()/close()
+    - `max_senders` caps the store; the senders updated longest ago are
+      evicted first
+
+    Pass it as ClassificationAgent(memory_db=MemoryBank(path)). Call
+    close() (or use it as a context manager) so the last batch is written.
+    """
+
+    def __init__(self, db_path: str, hot_size: int = 10000, max_senders: int = None,
+                 flush_every: int = 500, clock=time.time):
+        self.hot_size = hot_size
+        self.max_senders = max_senders
+        self.flush_every = flush_every
+        self.clock = clock
+
+        self._hot = OrderedDict()  # sender -> MemoryRecord
+        self._dirty = {}           # sender -> MemoryRecord, not yet written
+
+        self._db = sqlite3.connect(db_path, isolation_level=None, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sender_memory ("
+            " sender TEXT PRIMARY KEY,"
+            " message_count INTEGER NOT NULL,"
+            " last_category TEXT,"
+            " last_sentiment TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS sender_memory_updated_at"
+            " ON sender_memory (updated_at)"
+        )
+        self._row_count = self._db.execute("SELECT COUNT(*) FROM sender_memory").fetchone()[0]
+        self._new_senders = 0
+
+    def _load(self, sender: str):
+        record = self._hot.get(sender)
+        if record is not None:
+            self._hot.move_to_end(sender)
+            return record
+
+        record = self._dirty.get(sender)
+        if record is None:
+            row = self._db.execute(
+                "SELECT message_count, last_category, last_sentiment, updated_at"
+                " FROM sender_memory WHERE sender = ?",
+                (sender,)
+            ).fetchone()
+            if row is None:
+                return None
+            record = MemoryRecord(*row)
+
+        self._cache(sender, record)
+        return record
+
+    def _cache(self, sender: str, record: MemoryRecord):
+        self._hot[sender] = record
+        self._hot.move_to_end(sender)
+        # Dirty records stay reachable through self._dirty until flushed
+        while len(self._hot) > self.hot_size:
+            self._hot.popitem(last=False)
+
+    def update_memory(self, sender: str, category: str, sentiment: str) -> dict:
+        record = self._load(sender)
+        if record is None:
+            record = MemoryRecord()
+            self._cache(sender, record)
+            self._new_senders += 1
+
+        record.message_count += 1
+        record.last_category = category
+        record.last_sentiment = sentiment
+        record.updated_at = self.clock()
+
+        self._dirty[sender] = record
+        if len(self._dirty) >= self.flush_every:
+            self.flush()
+
+        return record.to_dict()
+
+    def flush(self):
+        """
+        Write all dirty records in one transaction, then enforce max_senders.
+        """
+        if not self._dirty:
+            return
+
+        rows = [
+            (sender, r.message_count, r.last_category, r.last_sentiment, r.updated_at)
+            for sender, r in self._dirty.items()
+        ]
+        self._db.execute("BEGIN")
+        self._db.executemany(
+            "INSERT OR REPLACE INTO sender_memory"
+            " (sender, message_count, last_category, last_sentiment, updated_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        self._db.execute("COMMIT")
+        self._dirty.clear()
+
+        self._row_count += self._new_senders
+        self._new_senders = 0
+        if self.max_senders is not None and self._row_count > self.max_senders:
+            self._evict(self._row_count - self.max_senders)
+
+    def _evict(self, count: int):
+        oldest = [
+            row[0] for row in self._db.execute(
+                "SELECT sender FROM sender_memory ORDER BY updated_at LIMIT ?", (count,)
+            )
+        ]
+        self._db.execute("BEGIN")
+        self._db.executemany(
+            "DELETE FROM sender_memory WHERE sender = ?", [(s,) for s in oldest]
+        )
+        self._db.execute("COMMIT")
+        for sender in oldest:
+            self._hot.pop(sender, None)
+        self._row_count -= len(oldest)
+
+    # dict-style read access, like the plain memory_db dict
+    def get(self, sender: str, default=None):
+        record = self._load(sender)
+        return record.to_dict() if record is not None else default
+
+    def __getitem__(self, sender: str) -> dict:
+        record = self._load(sender)
+        if record is None:
+            raise KeyError(sender)
+        return record.to_dict()
+
+    def __contains__(self, sender: str) -> bool:
+        return self._load(sender) is not None
+
+    def __len__(self) -> int:
+        return self._row_count + self._new_senders
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
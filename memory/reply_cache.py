@@ -0,0 +1,160 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+
+
+class ReplyCache:
+    """
+    Cache of supervisor-approved replies.
+
+    Keyed on a hash of (category, sentiment, tone, normalized clean_body),
+    so near-identical emails (invoice copies, password resets, ...) reuse
+    one reply instead of paying for a new LLM call and supervisor check.
+
+    - in-memory LRU with a per-entry TTL
+    - optional SQLite file (db_path) that survives restarts; entries
+      evicted from memory are still found there until they expire
+    - hit / miss / eviction counters via stats()
+    """
+
+    _NON_WORD = re.compile(r"[^a-z0-9]+")
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0,
+                 db_path: str = None, db_max_entries: int = None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._db = None
+        self._puts_since_cleanup = 0
+        self.db_max_entries = db_max_entries or max_entries * 10
+        if db_path:
+            self._db = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS reply_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+
+    @classmethod
+    def normalize_body(cls, clean_body: str) -> str:
+        """
+        Lowercase and drop punctuation, so emails that differ only in
+        formatting share a fingerprint. Numbers are kept: a reply may quote
+        an invoice, order or account number, and must not be served to
+        another customer's email.
+        """
+        return cls._NON_WORD.sub(" ", (clean_body or "").lower()).strip()
+
+    @classmethod
+    def make_key(cls, category: str, sentiment: str, tone: str, clean_body: str) -> str:
+        raw = "\x1f".join([category, sentiment, tone, cls.normalize_body(clean_body)])
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str):
+        now = self.clock()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM reply_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] > now:
+                value = json.loads(row[0])
+                self._db.execute(
+                    "UPDATE reply_cache SET last_used = ? WHERE key = ?", (now, key)
+                )
+                self._remember(key, row[1], value)
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value):
+        """
+        value must be JSON-serializable when the SQLite backend is on.
+        """
+        now = self.clock()
+        expires_at = now + self.ttl_seconds
+        self._remember(key, expires_at, value)
+
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO reply_cache (key, value, expires_at, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at, now)
+            )
+            self._puts_since_cleanup += 1
+            if self._puts_since_cleanup >= 1000:
+                self._cleanup_db(now)
+
+    def _remember(self, key: str, expires_at: float, value):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _cleanup_db(self, now: float):
+        """
+        Drop expired rows, then the least recently used rows over the cap.
+        """
+        self._puts_since_cleanup = 0
+        self._db.execute("DELETE FROM reply_cache WHERE expires_at <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM reply_cache WHERE key IN ("
+            " SELECT key FROM reply_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.db_max_entries,)
+        )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self._entries),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+# quick test
+if __name__ == "__main__":
+    first = ReplyCache.make_key("billing", "neutral", "neutral", "Please resend invoice 1234.")
+    same = ReplyCache.make_key("billing", "neutral", "neutral", "please resend   INVOICE 1234")
+    other = ReplyCache.make_key("billing", "neutral", "neutral", "Please resend invoice 5678.")
+    assert first == same, "formatting should not change the key"
+    assert first != other, "different invoice numbers must not share a key"
+    print("ok", first, other)
@@ -0,0 +1,149 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+
+class ThreadState:
+    """
+    One open conversation. message_count includes the email being
+    processed; last_category / last_sentiment are those of the message
+    before it until update() records the current one.
+    """
+
+    __slots__ = ("key", "seq", "message_count", "last_category", "last_sentiment", "last_seen")
+
+    def __init__(self, key: int, seq: int, last_seen: float):
+        self.key = key
+        self.seq = seq
+        self.message_count = 0
+        self.last_category = None
+        self.last_sentiment = None
+        self.last_seen = last_seen
+
+    @property
+    def conversation_id(self) -> str:
+        # Built on read, so open threads hold two ints instead of a string
+        return f"{self.key:016x}-{self.seq}"
+
+    @property
+    def is_followup(self) -> bool:
+        return self.message_count > 1
+
+    def update(self, category: str, sentiment: str):
+        self.last_category = category
+        self.last_sentiment = sentiment
+
+    def to_dict(self) -> dict:
+        return {
+            "conversation_id": self.conversation_id,
+            "message_count": self.message_count,
+            "last_category": self.last_category,
+            "last_sentiment": self.last_sentiment
+        }
+
+
+class SessionService:
+    """
+    Open conversations, keyed by sender and normalized subject
+    (agents.intake_agent.IntakeAgent.normalize_subject), so "Re: Invoice"
+    from a sender continues their "Invoice" thread.
+
+    - open() is one hash lookup: the thread's state is kept up to date as
+      emails arrive, never rebuilt from history
+    - keys are 64-bit blake2b hashes of (sender, subject), not the strings
+    - threads idle for more than idle_seconds are closed; the next email
+      on that subject starts a new conversation
+    - at most max_threads are kept; the one idle longest is closed first
+
+    Threads are ordered by last activity (LRU), so closing idle ones only
+    ever looks at the front. conversation_id is the key plus the number of
+    threads the service had started before it: the same in every run over
+    the same emails in the same order.
+    """
+
+    def __init__(self, idle_seconds: float = 7 * 24 * 3600, max_threads: int = 1_000_000,
+                 clock=time.time):
+        self.idle_seconds = idle_seconds
+        self.max_threads = max_threads
+        self.clock = clock
+
+        self._threads = OrderedDict()  # key -> ThreadState, least recently active first
+
+        self.started = 0
+        self.continued = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._threads)
+
+    @staticmethod
+    def thread_key(sender: str, subject: str) -> int:
+        digest = hashlib.blake2b(
+            f"{sender.casefold()}\x00{subject}".encode("utf-8"), digest_size=8
+        ).digest()
+        return int.from_bytes(digest, "big")
+
+    def open(self, sender: str, subject: str) -> ThreadState:
+        """
+        The conversation an incoming email belongs to, with the email
+        counted. subject: the normalized subject.
+        """
+        now = self.clock()
+        self._expire(now)
+
+        key = self.thread_key(sender, subject)
+        threads = self._threads
+        state = threads.get(key)
+        if state is None:
+            state = threads[key] = ThreadState(key, self.started, now)
+            self.started += 1
+            if len(threads) > self.max_threads:
+                threads.popitem(last=False)
+                self.evicted += 1
+        else:
+            threads.move_to_end(key)
+            state.last_seen = now
+            self.continued += 1
+
+        state.message_count += 1
+        return state
+
+    def get(self, sender: str, subject: str) -> ThreadState:
+        """
+        The open conversation for sender and normalized subject, or None.
+        Does not count as activity.
+        """
+        state = self._threads.get(self.thread_key(sender, subject))
+        if state is None or state.last_seen <= self.clock() - self.idle_seconds:
+            return None
+        return state
+
+    def _expire(self, now: float):
+        cutoff = now - self.idle_seconds
+        threads = self._threads
+        while threads:
+            state = threads[next(iter(threads))]
+            if state.last_seen > cutoff:
+                break
+            threads.popitem(last=False)
+            self.expired += 1
+
+    def stats(self) -> dict:
+        opened = self.started + self.continued
+        return {
+            "open_threads": len(self._threads),
+            "started": self.started,
+            "continued": self.continued,
+            "followup_rate": self.continued / opened if opened else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"Sessions: {s['started']} conversations started, {s['continued']} follow-ups "
+            f"({s['followup_rate']:.1%} of emails), {s['open_threads']} open, "
+            f"{s['expired']} closed idle, {s['evicted']} evicted"
+        )
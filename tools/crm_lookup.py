@@ -0,0 +1,324 @@
+import http.client
+import json
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+class CRMBackend(ABC):
+    """
+    Where customer profiles come from.
+
+    fetch_many(senders) looks up many senders in one round trip and
+    returns {sender: profile}; senders the CRM does not know are left out.
+    A profile is a dict:
+      {"tier": "free" | "standard" | "premium" | "enterprise", "open_tickets": int}
+
+    Subclasses must implement fetch_many; one that doesn't fails when it
+    is built, not at its first lookup in the middle of a batch.
+    """
+
+    @abstractmethod
+    def fetch_many(self, senders: list) -> dict:
+        ...
+
+    def close(self):
+        pass
+
+
+class ConnectionPool:
+    """
+    At most `size` connections, created on first use and reused after.
+    A connection that raised is closed instead of going back to the pool.
+    """
+
+    def __init__(self, factory, size: int = 4):
+        self.factory = factory
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self.factory()
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SQLiteCRM(CRMBackend):
+    """
+    CRM stand-in backed by a local SQLite file with a table
+      customers (email TEXT PRIMARY KEY, tier TEXT, open_tickets INTEGER)
+    (benchmarks/fake_crm.py builds one).
+    """
+
+    def __init__(self, db_path: str, pool_size: int = 4, max_batch: int = 500):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.pool = ConnectionPool(self._connect, pool_size)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
+
+    def fetch_many(self, senders: list) -> dict:
+        profiles = {}
+        with self.pool.connection() as conn:
+            for i in range(0, len(senders), self.max_batch):
+                batch = senders[i:i + self.max_batch]
+                rows = conn.execute(
+                    "SELECT email, tier, open_tickets FROM customers"
+                    f" WHERE email IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                for email, tier, open_tickets in rows:
+                    profiles[email] = {"tier": tier, "open_tickets": open_tickets}
+        return profiles
+
+    def close(self):
+        self.pool.close()
+
+
+class _NoDelayMixin:
+    # http.client writes headers and body separately; with Nagle on, the
+    # delayed ACK of the first write stalls every keep-alive request ~40 ms
+    def connect(self):
+        super().connect()
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class _HTTPConnection(_NoDelayMixin, http.client.HTTPConnection):
+    pass
+
+
+class _HTTPSConnection(_NoDelayMixin, http.client.HTTPSConnection):
+    pass
+
+
+class HTTPCRM(CRMBackend):
+    """
+    CRM reached over HTTP with keep-alive connections from a pool.
+
+    POST {base_url}/customers/lookup  {"emails": [...]}
+      -> {"customers": {email: profile}}
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 4, timeout: float = 5.0,
+                 max_batch: int = 500):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path.rstrip("/") + "/customers/lookup"
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.pool = ConnectionPool(self._connect, pool_size)
+
+    def _connect(self):
+        cls = _HTTPSConnection if self.scheme == "https" else _HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _post(self, conn, body: bytes) -> dict:
+        conn.request("POST", self.path, body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"CRM lookup failed: HTTP {response.status}")
+        return json.loads(data)["customers"]
+
+    def fetch_many(self, senders: list) -> dict:
+        profiles = {}
+        for i in range(0, len(senders), self.max_batch):
+            body = json.dumps({"emails": senders[i:i + self.max_batch]}).encode("utf-8")
+            try:
+                with self.pool.connection() as conn:
+                    profiles.update(self._post(conn, body))
+            except (http.client.RemoteDisconnected, ConnectionError):
+                # The server closed an idle keep-alive connection; retry once on a new one
+                with self.pool.connection() as conn:
+                    profiles.update(self._post(conn, body))
+        return profiles
+
+    def close(self):
+        self.pool.close()
+
+
+def open_crm_backend(source: str, pool_size: int = 4) -> CRMBackend:
+    """
+    http(s):// URLs -> HTTPCRM, anything else is a SQLite file.
+    """
+    if source.startswith(("http://", "https://")):
+        return HTTPCRM(source, pool_size=pool_size)
+    return SQLiteCRM(source, pool_size=pool_size)
+
+
+class CRMLookup:
+    """
+    Cached, batched, concurrent customer lookups for the pipeline.
+
+    - TTL cache of profiles; senders the CRM does not know are cached too
+      (for negative_ttl_seconds) so they are not asked for again and again
+    - get_many() sends every uncached sender in one backend call
+    - prefetch() / lookup_async() run on a small thread pool, so lookups
+      overlap intake and classification; a sender already being fetched
+      is waited for, not fetched twice
+    - backend errors are not cached; callers fall back to no profile
+
+    `timeout` is how long the pipeline waits for a profile at decision time.
+    """
+
+    def __init__(self, backend: CRMBackend, ttl_seconds: float = 300.0,
+                 negative_ttl_seconds: float = 60.0, max_entries: int = 100000,
+                 max_workers: int = 4, timeout: float = 2.0, clock=time.time):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.clock = clock
+
+        self._entries = OrderedDict()  # sender -> (expires_at, profile or None)
+        self._pending = {}             # sender -> Future, fetch in progress
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crm")
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.backend_calls = 0
+        self.errors = 0
+
+    def _lookup_cached(self, sender: str, now: float):
+        """
+        (True, profile or None) for a fresh entry, (False, None) otherwise.
+        Call with the lock held.
+        """
+        entry = self._entries.get(sender)
+        if entry is None:
+            return False, None
+        expires_at, profile = entry
+        if expires_at <= now:
+            del self._entries[sender]
+            return False, None
+        self._entries.move_to_end(sender)
+        if profile is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return True, profile
+
+    def get_many(self, senders) -> dict:
+        """
+        {sender: profile or None} for every sender, one backend call for
+        all the uncached ones.
+        """
+        results = {}
+        waiting = {}
+        to_fetch = {}
+
+        with self._lock:
+            now = self.clock()
+            for sender in senders:
+                if sender in results or sender in waiting or sender in to_fetch:
+                    continue
+                found, profile = self._lookup_cached(sender, now)
+                if found:
+                    results[sender] = profile
+                elif sender in self._pending:
+                    waiting[sender] = self._pending[sender]
+                else:
+                    future = Future()
+                    self._pending[sender] = future
+                    to_fetch[sender] = future
+            self.misses += len(to_fetch)
+
+        if to_fetch:
+            self._fetch(to_fetch)
+            for sender, future in to_fetch.items():
+                results[sender] = future.result()
+
+        for sender, future in waiting.items():
+            results[sender] = future.result()
+        return results
+
+    def _fetch(self, to_fetch: dict):
+        with self._lock:
+            self.backend_calls += 1
+        try:
+            profiles = self.backend.fetch_many(list(to_fetch))
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                for sender, future in to_fetch.items():
+                    del self._pending[sender]
+                    future.set_exception(e)
+            raise
+
+        with self._lock:
+            now = self.clock()
+            for sender, future in to_fetch.items():
+                profile = profiles.get(sender)
+                ttl = self.ttl_seconds if profile is not None else self.negative_ttl_seconds
+                self._entries[sender] = (now + ttl, profile)
+                self._entries.move_to_end(sender)
+                del self._pending[sender]
+                future.set_result(profile)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, sender: str):
+        return self.get_many([sender])[sender]
+
+    def prefetch(self, senders) -> Future:
+        """
+        Look senders up in the background (e.g. a whole run_batch chunk).
+        """
+        return self._executor.submit(self.get_many, list(senders))
+
+    def lookup_async(self, sender: str) -> Future:
+        with self._lock:
+            found, profile = self._lookup_cached(sender, self.clock())
+        if found:
+            future = Future()
+            future.set_result(profile)
+            return future
+        return self._executor.submit(self.get, sender)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            "backend_calls": self.backend_calls,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.backend.close()
@@ -0,0 +1,299 @@
+import binascii
+import html
+import os
+import quopri
+import re
+from email.header import decode_header, make_header
+from email.utils import getaddresses, parseaddr
+
+
+class EmailParser:
+    """
+    Streaming parser for raw RFC 822 mail (single files, mbox, Maildir).
+
+    Messages are read line by line. Only the first text/plain part (or,
+    failing that, the first text/html part with tags stripped) is kept and
+    decoded; attachment payloads and other parts are skipped line by line
+    without being stored or decoded. Memory per message is bounded by
+    max_body_bytes, so multi-GB mailboxes stream through in constant memory.
+
+    Each parsed message is a dict:
+      {
+        "id", "subject", "body", "sender",
+        "in_reply_to", "references", "thread_status",
+        "skipped_parts"
+      }
+    thread_status comes from the In-Reply-To / References headers.
+    """
+
+    KEPT_HEADERS = {
+        "from", "subject", "message-id", "in-reply-to", "references",
+        "content-type", "content-transfer-encoding", "content-disposition"
+    }
+
+    _PARAM = re.compile(r';\s*([\w-]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;\s]+)')
+    _MSG_ID = re.compile(r"<[^<>]+>")
+    _HTML_DROP = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+    _HTML_BREAK = re.compile(r"<\s*(br|/p|/div|/li|/tr|/h\d)\b[^>]*>", re.IGNORECASE)
+    _HTML_TAG = re.compile(r"<[^>]+>")
+
+    def __init__(self, max_body_bytes: int = 1_000_000, max_header_bytes: int = 64_000):
+        self.max_body_bytes = max_body_bytes
+        self.max_header_bytes = max_header_bytes
+
+    # ------------------------------
+    # Sources
+    # ------------------------------
+    def parse_file(self, path: str) -> dict:
+        """
+        Parse one RFC 822 message file (e.g. a Maildir entry or .eml).
+        """
+        with open(path, "rb") as f:
+            return self.parse_lines(f)
+
+    def iter_maildir(self, maildir: str):
+        """
+        Yield parsed messages from a Maildir (cur/ and new/), in name order.
+        """
+        for sub in ("cur", "new"):
+            folder = os.path.join(maildir, sub)
+            if not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                path = os.path.join(folder, name)
+                if os.path.isfile(path):
+                    yield self.parse_file(path)
+
+    def iter_mbox(self, path: str):
+        """
+        Yield parsed messages from an mbox file, reading it line by line.
+        """
+        with open(path, "rb") as f:
+            lines = iter(f)
+
+            # Skip anything before the first From_ line
+            for line in lines:
+                if line.startswith(b"From "):
+                    break
+            else:
+                return
+
+            while True:
+                state = {"eof": False}
+                message_lines = self._mbox_message_lines(lines, state)
+                yield self.parse_lines(message_lines)
+                # Drain lines the parser did not need (skipped tail of a message)
+                for _ in message_lines:
+                    pass
+                if state["eof"]:
+                    return
+
+    @staticmethod
+    def _mbox_message_lines(lines, state: dict):
+        """
+        Lines of one mbox message, up to the next From_ line. Undoes
+        mboxrd '>From ' quoting.
+        """
+        previous_blank = False
+        for line in lines:
+            if previous_blank and line.startswith(b"From "):
+                return
+            previous_blank = line in (b"\n", b"\r\n")
+            if line.startswith(b">") and line.lstrip(b">").startswith(b"From "):
+                line = line[1:]
+            yield line
+        state["eof"] = True
+
+    # ------------------------------
+    # Message parsing
+    # ------------------------------
+    def parse_lines(self, lines) -> dict:
+        """
+        Parse one message from an iterator of raw byte lines.
+        """
+        lines = iter(lines)
+        headers = self._read_headers(lines)
+
+        collected = {"plain": None, "html": None, "skipped": 0}
+        self._walk_part(lines, headers, None, collected)
+
+        if collected["plain"] is not None:
+            body = collected["plain"]
+        elif collected["html"] is not None:
+            body = self.strip_html(collected["html"])
+        else:
+            body = ""
+
+        in_reply_to = self._first_msg_id(headers.get("in-reply-to", ""))
+        references = self._MSG_ID.findall(headers.get("references", ""))
+        sender = self._sender(headers.get("from", ""))
+
+        return {
+            "id": self._first_msg_id(headers.get("message-id", "")),
+            "subject": self._decode_header(headers.get("subject", "")),
+            "body": body,
+            "sender": sender,
+            "in_reply_to": in_reply_to,
+            "references": references,
+            "thread_status": "reply" if (in_reply_to or references) else "single",
+            "skipped_parts": collected["skipped"],
+        }
+
+    def _read_headers(self, lines) -> dict:
+        """
+        Read headers up to the blank line, unfolding continuations.
+        Only KEPT_HEADERS are stored, each capped at max_header_bytes.
+        """
+        headers = {}
+        name = None
+        for raw in lines:
+            line = raw.rstrip(b"\r\n")
+            if not line:
+                break
+            if line[:1] in (b" ", b"\t"):
+                if name is not None and len(headers[name]) < self.max_header_bytes:
+                    headers[name] += " " + line.strip().decode("latin1")
+                continue
+
+            key, sep, value = line.partition(b":")
+            if not sep:
+                name = None
+                continue
+            key = key.strip().lower().decode("latin1")
+            if key in self.KEPT_HEADERS and key not in headers:
+                name = key
+                headers[name] = value.strip().decode("latin1")
+            else:
+                name = None
+        return headers
+
+    def _walk_part(self, lines, headers: dict, parent_boundary: bytes, collected: dict) -> str:
+        """
+        Consume one part's body up to the parent's next boundary.
+        Returns "next" (another sibling follows), "end" (closing boundary)
+        or "eof".
+        """
+        content_type, params = self._content_type(headers)
+        disposition = headers.get("content-disposition", "").lower()
+        is_attachment = disposition.startswith("attachment")
+
+        if content_type.startswith("multipart/") and params.get("boundary"):
+            boundary = params["boundary"].encode("latin1")
+            ended = self._walk_multipart(lines, boundary, collected)
+            if ended == "eof" or parent_boundary is None:
+                return ended
+            # Skip the nested epilogue up to our own next boundary
+            return self._consume(lines, parent_boundary, None)
+
+        wanted = None
+        if not is_attachment:
+            if content_type == "text/plain" and collected["plain"] is None:
+                wanted = "plain"
+            elif (content_type == "text/html" and collected["html"] is None
+                  and collected["plain"] is None):
+                wanted = "html"
+
+        if wanted is None:
+            collected["skipped"] += 1
+            return self._consume(lines, parent_boundary, None)
+
+        buffer = []
+        ended = self._consume(lines, parent_boundary, buffer)
+        collected[wanted] = self._decode_payload(
+            b"".join(buffer),
+            headers.get("content-transfer-encoding", ""),
+            params.get("charset", "utf-8")
+        )
+        return ended
+
+    def _walk_multipart(self, lines, boundary: bytes, collected: dict) -> str:
+        # Preamble, up to the first boundary
+        ended = self._consume(lines, boundary, None)
+        while ended == "next":
+            part_headers = self._read_headers(lines)
+            ended = self._walk_part(lines, part_headers, boundary, collected)
+        return ended
+
+    def _consume(self, lines, boundary: bytes, buffer: list) -> str:
+        """
+        Read lines until `--boundary` (returns "next"), `--boundary--`
+        ("end") or end of input ("eof"). Lines go to buffer, up to
+        max_body_bytes, or are dropped when buffer is None.
+        """
+        if boundary is not None:
+            delimiter = b"--" + boundary
+            closing = delimiter + b"--"
+        size = 0
+
+        for raw in lines:
+            if boundary is not None and raw.startswith(b"--"):
+                line = raw.rstrip()
+                if line == delimiter:
+                    return "next"
+                if line == closing:
+                    return "end"
+            if buffer is not None and size < self.max_body_bytes:
+                buffer.append(raw)
+                size += len(raw)
+        return "eof"
+
+    # ------------------------------
+    # Decoding helpers
+    # ------------------------------
+    def _content_type(self, headers: dict):
+        value = headers.get("content-type", "text/plain")
+        content_type = value.split(";", 1)[0].strip().lower() or "text/plain"
+        params = {}
+        for key, raw in self._PARAM.findall(value):
+            if raw.startswith('"') and raw.endswith('"'):
+                raw = raw[1:-1].replace('\\"', '"')
+            params[key.lower()] = raw
+        return content_type, params
+
+    @staticmethod
+    def _decode_payload(payload: bytes, encoding: str, charset: str) -> str:
+        encoding = encoding.strip().lower()
+        if encoding == "base64":
+            try:
+                payload = binascii.a2b_base64(payload)
+            except binascii.Error:
+                payload = b""
+        elif encoding == "quoted-printable":
+            payload = quopri.decodestring(payload)
+
+        try:
+            return payload.decode(charset or "utf-8", errors="replace").strip()
+        except LookupError:
+            return payload.decode("latin1", errors="replace").strip()
+
+    @classmethod
+    def strip_html(cls, text: str) -> str:
+        text = cls._HTML_DROP.sub(" ", text)
+        text = cls._HTML_BREAK.sub("\n", text)
+        text = cls._HTML_TAG.sub(" ", text)
+        return html.unescape(text).strip()
+
+    @staticmethod
+    def _decode_header(value: str) -> str:
+        if not value:
+            return ""
+        try:
+            return str(make_header(decode_header(value)))
+        except (ValueError, LookupError):
+            return value
+
+    @classmethod
+    def _first_msg_id(cls, value: str):
+        match = cls._MSG_ID.search(value)
+        if match:
+            return match.group(0)
+        return value.strip() or None
+
+    @classmethod
+    def _sender(cls, value: str):
+        if not value:
+            return None
+        value = cls._decode_header(value)
+        addresses = getaddresses([value])
+        address = addresses[0][1] if addresses else parseaddr(value)[1]
+        return address.lower() or None
@@ -0,0 +1,227 @@
+import re
+from bisect import bisect_right
+
+
+class KeywordMatcher:
+    """
+    Multi-keyword matcher built once from keyword tables.
+
+    tables: {table_name: {label: [keyword, ...]}}
+
+    scan() takes already lowercased text and returns a hit set that answers
+    `(table_name, label) in hits`. Matching keeps the plain substring
+    semantics of `keyword in text`.
+
+    Large tables are folded into one trie-shaped regex and every hit is
+    found in a single pass. For small tables CPython's C-level `in` search
+    is faster than any regex pass, so keywords are scanned lazily instead:
+    each distinct keyword at most once, and only when a label is asked for.
+    That is the path config/categories.yml takes; it costs about what the
+    old per-detector scans did.
+    """
+
+    # Below this many distinct keywords, lazy `in` scans beat the regex pass
+    COMPILE_THRESHOLD = 200
+
+    def __init__(self, tables: dict, compile_threshold: int = None):
+        tags_by_phrase = {}
+        phrases_by_tag = {}
+        for table, labels in tables.items():
+            for label, keywords in labels.items():
+                tag = (table, label)
+                # dict as an insertion-ordered set: O(1) dedup on large tables
+                phrases = phrases_by_tag.setdefault(tag, {})
+                for keyword in keywords:
+                    keyword = keyword.lower()
+                    tags_by_phrase.setdefault(keyword, set()).add(tag)
+                    phrases[keyword] = None
+
+        self.phrases = tuple(sorted(tags_by_phrase))
+        self.tags = frozenset(phrases_by_tag)
+        self._phrases_by_tag = {tag: tuple(p) for tag, p in phrases_by_tag.items()}
+
+        # Bit i of a batch hit mask stands for self.phrases[i]
+        bits = {phrase: 1 << i for i, phrase in enumerate(self.phrases)}
+        self._tag_masks = {
+            tag: sum(bits[p] for p in phrases) for tag, phrases in self._phrases_by_tag.items()
+        }
+
+        if compile_threshold is None:
+            compile_threshold = self.COMPILE_THRESHOLD
+        self.compiled = len(self.phrases) >= compile_threshold
+
+        self._regex = None
+        self._tags = {}
+        if self.compiled:
+            # At one position the regex only reports the longest keyword, so
+            # a hit also counts for every keyword that is a prefix of it.
+            for phrase in tags_by_phrase:
+                tags = set()
+                for end in range(1, len(phrase) + 1):
+                    tags |= tags_by_phrase.get(phrase[:end], set())
+                self._tags[phrase] = frozenset(tags)
+
+            pattern = self._trie_pattern(self._build_trie(self.phrases))
+            self._regex = re.compile("(?=(" + pattern + "))", re.DOTALL)
+
+    def snapshot(self) -> dict:
+        """
+        The built matcher as plain data (marshal-able), for from_snapshot().
+        """
+        return {
+            "phrases": self.phrases,
+            "tags": self.tags,
+            "phrases_by_tag": self._phrases_by_tag,
+            "tag_masks": self._tag_masks,
+            "compiled": self.compiled,
+            "tags_by_phrase": self._tags,
+            "pattern": self._regex.pattern if self._regex is not None else None,
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: dict) -> "KeywordMatcher":
+        """
+        Rebuild from snapshot() without redoing the table folding or the
+        trie; only the regex itself is compiled again.
+        """
+        matcher = cls.__new__(cls)
+        matcher.phrases = state["phrases"]
+        matcher.tags = state["tags"]
+        matcher._phrases_by_tag = state["phrases_by_tag"]
+        matcher._tag_masks = state["tag_masks"]
+        matcher.compiled = state["compiled"]
+        matcher._tags = state["tags_by_phrase"]
+        pattern = state["pattern"]
+        matcher._regex = re.compile(pattern, re.DOTALL) if pattern is not None else None
+        return matcher
+
+    @staticmethod
+    def _build_trie(phrases) -> dict:
+        trie = {}
+        for phrase in phrases:
+            node = trie
+            for ch in phrase:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+        return trie
+
+    @classmethod
+    def _trie_pattern(cls, node: dict) -> str:
+        """
+        Turn a trie node into a regex. Optional groups are greedy, so the
+        longest keyword starting at a position wins.
+        """
+        is_end = "" in node
+        branches = []
+        for ch, child in sorted(node.items()):
+            if ch == "":
+                continue
+            # Follow single-child chains so each run is escaped in one call
+            run = [ch]
+            while len(child) == 1 and "" not in child:
+                (next_ch, child), = child.items()
+                run.append(next_ch)
+            branches.append(re.escape("".join(run)) + cls._trie_pattern(child))
+
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+
+        pattern = "(?:" + "|".join(branches) + ")"
+        return pattern + "?" if is_end else pattern
+
+    def scan(self, text: str):
+        """
+        Scan lowercased text. Returns a set of (table, label) hits, or a
+        lazy equivalent for small tables.
+        """
+        if not self.compiled:
+            return LazyHits(text, self._phrases_by_tag)
+
+        hits = set()
+        for phrase in set(self._regex.findall(text)):
+            hits |= self._tags[phrase]
+        return frozenset(hits)
+
+    def scan_batch(self, texts: list) -> list:
+        """
+        Keyword hits for many lowercased texts at once, as one int bitmask
+        per text (a sparse text x keyword hit matrix).
+
+        The texts are joined once and every keyword is searched for over
+        the whole batch in C; after a hit, the search jumps to the next
+        text, so each keyword costs at most one find per matching text.
+        """
+        if not texts:
+            return []
+
+        # NUL separates texts; keep one inside a text from joining keywords
+        texts = [t.replace("\x00", "\x01") if "\x00" in t else t for t in texts]
+        joined = "\x00".join(texts)
+
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+        n_texts = len(texts)
+
+        masks = [0] * n_texts
+        find = joined.find
+        for bit, phrase in enumerate(self.phrases):
+            flag = 1 << bit
+            pos = find(phrase)
+            while pos != -1:
+                row = bisect_right(starts, pos) - 1
+                masks[row] |= flag
+                if row + 1 >= n_texts:
+                    break
+                pos = find(phrase, starts[row + 1])
+
+        return masks
+
+    def mask_hits(self, mask: int) -> "MaskHits":
+        """
+        Hit set view of one scan_batch mask, usable wherever scan() hits are.
+        """
+        return MaskHits(mask, self._tag_masks)
+
+
+class MaskHits:
+    """
+    Hit set backed by a scan_batch bitmask.
+    """
+
+    __slots__ = ("mask", "_tag_masks")
+
+    def __init__(self, mask: int, tag_masks: dict):
+        self.mask = mask
+        self._tag_masks = tag_masks
+
+    def __contains__(self, tag) -> bool:
+        return bool(self.mask & self._tag_masks.get(tag, 0))
+
+
+class LazyHits:
+    """
+    Hit set for small keyword tables. Each keyword is searched for at most
+    once per text, the first time one of its labels is checked.
+    """
+
+    __slots__ = ("text", "_phrases_by_tag", "_seen")
+
+    def __init__(self, text: str, phrases_by_tag: dict):
+        self.text = text
+        self._phrases_by_tag = phrases_by_tag
+        self._seen = {}
+
+    def __contains__(self, tag) -> bool:
+        seen = self._seen
+        for phrase in self._phrases_by_tag.get(tag, ()):
+            found = seen.get(phrase)
+            if found is None:
+                found = seen[phrase] = phrase in self.text
+            if found:
+                return True
+        return False
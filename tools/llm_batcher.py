@@ -0,0 +1,125 @@
+import asyncio
+from time import perf_counter_ns
+
+from tools.logging_tools import LatencyHistogram, StageTimings
+
+
+class LLMBatcher:
+    """
+    Micro-batches concurrent async LLM calls into one model request.
+
+    agenerate(prompt) queues the prompt and waits. The queue goes out as
+    one llm.agenerate_batch(prompts) call (or generate_batch, in a
+    thread) when it holds max_batch prompts or max_wait seconds after
+    its first prompt arrived, whichever comes first, and each caller gets
+    back the reply for its own prompt. A failed batch call fails every
+    caller in it; a caller that stopped waiting (timeout) is skipped.
+
+    Only async callers can share a request: with an LLM that has no batch
+    method, or for generate(), prompts go out one call each as before.
+
+    Accounting (stats() / report()): batches sent and why (full or timer),
+    fill ratio (prompts per batch / max_batch) and the time prompts spent
+    queued before their batch was sent.
+
+    One batcher per event loop, like the pipeline.
+    """
+
+    QUANTILES = StageTimings.QUANTILES
+
+    def __init__(self, llm, max_batch: int = 16, max_wait: float = 0.005):
+        self.llm = llm
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        self._queue = []  # (prompt, future, queued_ns)
+        self._timer = None
+        self._sending = set()
+
+        self.batches = 0
+        self.prompts = 0
+        self.full = 0
+        self.queue_delay = LatencyHistogram()
+
+    @property
+    def can_batch(self) -> bool:
+        return hasattr(self.llm, "agenerate_batch") or hasattr(self.llm, "generate_batch")
+
+    def generate(self, prompt: str) -> str:
+        return self.llm.generate(prompt)
+
+    async def agenerate(self, prompt: str) -> str:
+        if not self.can_batch:
+            if hasattr(self.llm, "agenerate"):
+                return await self.llm.agenerate(prompt)
+            return await asyncio.to_thread(self.llm.generate, prompt)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((prompt, future, perf_counter_ns()))
+        if len(self._queue) >= self.max_batch:
+            self.full += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        # Keep a reference until it is done, or the task can be collected
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: list):
+        now = perf_counter_ns()
+        for _, _, queued_ns in batch:
+            self.queue_delay.record(now - queued_ns)
+        self.batches += 1
+        self.prompts += len(batch)
+
+        prompts = [prompt for prompt, _, _ in batch]
+        try:
+            if hasattr(self.llm, "agenerate_batch"):
+                replies = await self.llm.agenerate_batch(prompts)
+            else:
+                replies = await asyncio.to_thread(self.llm.generate_batch, prompts)
+            if len(replies) != len(prompts):
+                raise RuntimeError(f"LLM returned {len(replies)} replies for {len(prompts)} prompts")
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future, _), reply in zip(batch, replies):
+            if not future.done():
+                future.set_result(reply)
+
+    def stats(self) -> dict:
+        h = self.queue_delay
+        stats = {
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "full_batches": self.full,
+            "mean_batch": self.prompts / self.batches if self.batches else 0.0,
+            "fill_ratio": self.prompts / (self.batches * self.max_batch) if self.batches else 0.0,
+            "queue_mean_ms": h.total_ns / h.count / 1e6 if h.count else 0.0,
+        }
+        for q in self.QUANTILES:
+            stats[f"queue_p{q}_ms"] = h.percentile(q) / 1e6
+        return stats
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"LLM batches: {s['prompts']} prompts in {s['batches']} calls "
+            f"({s['mean_batch']:.1f} per call, fill {s['fill_ratio']:.0%} of {self.max_batch}, "
+            f"{s['full_batches']} sent full), queued mean {s['queue_mean_ms']:.1f} ms, "
+            f"p95 {s['queue_p95_ms']:.1f} ms"
+        )
@@ -0,0 +1,336 @@
+import json
+import os
+import time
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of nanosecond durations.
+
+    Every power of two is split into 16 buckets, so any reported
+    percentile is within ~3% of the true value while memory stays at a
+    few hundred ints however many samples are recorded.
+    """
+
+    SUB_BUCKETS = 16
+
+    __slots__ = ("counts", "count", "total_ns", "min_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        if value < 2 * cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - 5
+        return cls.SUB_BUCKETS * shift + (value >> shift)
+
+    @classmethod
+    def _bucket_mid(cls, index: int) -> float:
+        if index < 2 * cls.SUB_BUCKETS:
+            return float(index)
+        shift = index // cls.SUB_BUCKETS - 1
+        low = (index - cls.SUB_BUCKETS * shift) << shift
+        return low + ((1 << shift) - 1) / 2
+
+    def record(self, value_ns: int):
+        index = self._index(value_ns)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_ns += value_ns
+        if self.min_ns is None or value_ns < self.min_ns:
+            self.min_ns = value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, n in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + n
+        self.count += other.count
+        self.total_ns += other.total_ns
+        if other.min_ns is not None and (self.min_ns is None or other.min_ns < self.min_ns):
+            self.min_ns = other.min_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def percentile(self, q: float) -> float:
+        """
+        q in [0, 100]. Returns nanoseconds.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(q / 100 * self.count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(self._bucket_mid(index), self.min_ns), self.max_ns)
+        return float(self.max_ns)
+
+
+class StageTimings:
+    """
+    Per-stage wall-time histograms for EmailSupportPipeline.
+
+    The pipeline holds `timings = None` when instrumentation is off, so
+    the disabled cost is one attribute check per stage. When on:
+
+        start = time.perf_counter_ns()
+        ...stage...
+        start = timings.lap("intake", start)
+    """
+
+    STAGES = ("intake", "classification", "decision", "reply", "supervisor")
+    QUANTILES = (50, 95, 99)
+
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+
+    def lap(self, stage: str, start_ns: int) -> int:
+        """
+        Record the time since start_ns for stage, return the current time
+        so it can start the next stage.
+        """
+        now = time.perf_counter_ns()
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        histogram.record(now - start_ns)
+        return now
+
+    def merge(self, other: "StageTimings"):
+        for stage, histogram in other.histograms.items():
+            self.histograms.setdefault(stage, LatencyHistogram()).merge(histogram)
+
+    def summary(self) -> dict:
+        summary = {}
+        for stage, h in self.histograms.items():
+            if not h.count:
+                continue
+            stats = {
+                "count": h.count,
+                "mean_ms": h.total_ns / h.count / 1e6,
+                "max_ms": h.max_ns / 1e6,
+            }
+            for q in self.QUANTILES:
+                stats[f"p{q}_ms"] = h.percentile(q) / 1e6
+            summary[stage] = stats
+        return summary
+
+    def report(self) -> str:
+        lines = [f"{'stage':<16}{'count':>9}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+        for stage, s in self.summary().items():
+            lines.append(
+                f"{stage:<16}{s['count']:>9}{s['mean_ms']:>10.4f}{s['p50_ms']:>10.4f}"
+                f"{s['p95_ms']:>10.4f}{s['p99_ms']:>10.4f}"
+            )
+        return "\n".join(lines)
+
+    def to_prometheus(self, metric: str = "email_pipeline_stage_latency_seconds") -> str:
+        lines = [
+            f"# HELP {metric} Wall time per EmailSupportPipeline stage.",
+            f"# TYPE {metric} summary",
+        ]
+        for stage, h in self.histograms.items():
+            if not h.count:
+                continue
+            for q in self.QUANTILES:
+                lines.append(
+                    f'{metric}{{stage="{stage}",quantile="{q / 100}"}} {h.percentile(q) / 1e9:.9f}'
+                )
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {h.total_ns / 1e9:.9f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str):
+        """
+        Write a Prometheus text file for *.prom paths, JSON otherwise.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.summary(), f, indent=2)
+
+
+class RewriteStats:
+    """
+    What acting on supervisor "rewrite" verdicts costs
+    (EmailSupportPipeline max_rewrites): how many supervised replies were
+    sent back and rewritten, the extra reply attempts they took, how many ended
+    approved, and the wall time the attempts added per rewritten email.
+    Mergeable like StageTimings.
+    """
+
+    QUANTILES = StageTimings.QUANTILES
+
+    def __init__(self):
+        self.replies = 0
+        self.rewritten = 0
+        self.attempts = 0
+        self.approved = 0
+        self.added_latency = LatencyHistogram()
+
+    def record(self, attempts: int = 0, approved: bool = False, added_ns: int = None):
+        """
+        One supervised reply; attempts / approved / added_ns only for a
+        reply that got a "rewrite" verdict and was rewritten.
+        """
+        self.replies += 1
+        if added_ns is None:
+            return
+        self.rewritten += 1
+        self.attempts += attempts
+        self.approved += approved
+        self.added_latency.record(added_ns)
+
+    def merge(self, other: "RewriteStats"):
+        self.replies += other.replies
+        self.rewritten += other.rewritten
+        self.attempts += other.attempts
+        self.approved += other.approved
+        self.added_latency.merge(other.added_latency)
+
+    def summary(self) -> dict:
+        h = self.added_latency
+        summary = {
+            "replies": self.replies,
+            "rewritten": self.rewritten,
+            "rewrite_rate": self.rewritten / self.replies if self.replies else 0.0,
+            "attempts": self.attempts,
+            "attempts_per_rewritten": self.attempts / self.rewritten if self.rewritten else 0.0,
+            "approved_after_rewrite": self.approved,
+            "escalated_after_rewrite": self.rewritten - self.approved,
+            "added_mean_ms": h.total_ns / h.count / 1e6 if h.count else 0.0,
+        }
+        for q in self.QUANTILES:
+            summary[f"added_p{q}_ms"] = h.percentile(q) / 1e6
+        return summary
+
+    def report(self) -> str:
+        s = self.summary()
+        return (
+            f"Rewrites: {s['rewritten']} of {s['replies']} replies rewritten "
+            f"(rate {s['rewrite_rate']:.1%}), {s['attempts_per_rewritten']:.2f} attempts each, "
+            f"{s['approved_after_rewrite']} approved / {s['escalated_after_rewrite']} escalated, "
+            f"added latency mean {s['added_mean_ms']:.1f} ms, p95 {s['added_p95_ms']:.1f} ms"
+        )
+
+
+class ServiceMetrics:
+    """
+    Counters for the long-running service in main.py: throughput, queue
+    depth, in-flight messages and claim-to-ack latency, overall and per
+    urgency of the result.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.started = clock()
+        self.processed = 0
+        self.failed = 0
+        self.queue_depth = 0
+        self.inflight = 0
+        self.latency = LatencyHistogram()
+        self.latency_by_urgency = {}
+        self._last_time = self.started
+        self._last_done = 0
+
+    def record(self, latency_ns: int, ok: bool = True, urgency: str = None):
+        if ok:
+            self.processed += 1
+        else:
+            self.failed += 1
+        self.latency.record(latency_ns)
+        if urgency is not None:
+            histogram = self.latency_by_urgency.get(urgency)
+            if histogram is None:
+                histogram = self.latency_by_urgency[urgency] = LatencyHistogram()
+            histogram.record(latency_ns)
+
+    def snapshot(self) -> dict:
+        """
+        Current values; rate_per_sec covers the time since the last
+        snapshot, mean_rate_per_sec the whole run.
+        """
+        now = self.clock()
+        done = self.processed + self.failed
+        interval = now - self._last_time
+        uptime = now - self.started
+        snapshot = {
+            "uptime_s": uptime,
+            "processed": self.processed,
+            "failed": self.failed,
+            "queue_depth": self.queue_depth,
+            "inflight": self.inflight,
+            "rate_per_sec": (done - self._last_done) / interval if interval > 0 else 0.0,
+            "mean_rate_per_sec": done / uptime if uptime > 0 else 0.0,
+        }
+        for q in StageTimings.QUANTILES:
+            snapshot[f"latency_p{q}_ms"] = self.latency.percentile(q) / 1e6
+        for urgency, h in sorted(self.latency_by_urgency.items()):
+            snapshot[f"latency_p95_ms_{urgency}"] = h.percentile(95) / 1e6
+        self._last_time = now
+        self._last_done = done
+        return snapshot
+
+    def report(self, snapshot: dict = None) -> str:
+        s = snapshot or self.snapshot()
+        report = (
+            f"processed={s['processed']} failed={s['failed']} queue_depth={s['queue_depth']} "
+            f"inflight={s['inflight']} rate={s['rate_per_sec']:.1f}/s "
+            f"mean_rate={s['mean_rate_per_sec']:.1f}/s p95={s['latency_p95_ms']:.2f}ms"
+        )
+        for urgency in sorted(self.latency_by_urgency):
+            report += f" p95_{urgency}={s[f'latency_p95_ms_{urgency}']:.2f}ms"
+        return report
+
+    def to_prometheus(self, prefix: str = "email_service") -> str:
+        lines = [
+            f"# TYPE {prefix}_processed_total counter",
+            f"{prefix}_processed_total {self.processed}",
+            f"# TYPE {prefix}_failed_total counter",
+            f"{prefix}_failed_total {self.failed}",
+            f"# TYPE {prefix}_queue_depth gauge",
+            f"{prefix}_queue_depth {self.queue_depth}",
+            f"# TYPE {prefix}_inflight gauge",
+            f"{prefix}_inflight {self.inflight}",
+            f"# TYPE {prefix}_uptime_seconds gauge",
+            f"{prefix}_uptime_seconds {self.clock() - self.started:.3f}",
+            f"# TYPE {prefix}_latency_seconds summary",
+        ]
+        for q in StageTimings.QUANTILES:
+            lines.append(
+                f'{prefix}_latency_seconds{{quantile="{q / 100}"}} {self.latency.percentile(q) / 1e9:.9f}'
+            )
+        lines.append(f"{prefix}_latency_seconds_sum {self.latency.total_ns / 1e9:.9f}")
+        lines.append(f"{prefix}_latency_seconds_count {self.latency.count}")
+        if self.latency_by_urgency:
+            lines.append(f"# TYPE {prefix}_urgency_latency_seconds summary")
+        for urgency, h in sorted(self.latency_by_urgency.items()):
+            for q in StageTimings.QUANTILES:
+                lines.append(
+                    f'{prefix}_urgency_latency_seconds{{urgency="{urgency}",quantile="{q / 100}"}} '
+                    f"{h.percentile(q) / 1e9:.9f}"
+                )
+            lines.append(f'{prefix}_urgency_latency_seconds_sum{{urgency="{urgency}"}} {h.total_ns / 1e9:.9f}')
+            lines.append(f'{prefix}_urgency_latency_seconds_count{{urgency="{urgency}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str, snapshot: dict = None):
+        """
+        Write a Prometheus text file for *.prom paths, JSON (the given or a
+        fresh snapshot) otherwise. Written to a temp file and renamed, so
+        scrapers never see half a file.
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(snapshot or self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
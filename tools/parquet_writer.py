@@ -0,0 +1,99 @@
+"""
+Columnar (Parquet) output for batch results.
+
+pyarrow is optional: it is imported when a writer is created, so the rest
+of the pipeline runs without it.
+"""
+
+# Flattened result fields (app/run_batch.flatten_result) and their types
+RESULT_COLUMNS = (
+    ("id", "string"),
+    ("subject", "string"),
+    ("clean_subject", "string"),
+    ("clean_body", "string"),
+    ("category", "string"),
+    ("urgency", "string"),
+    ("sentiment", "string"),
+    ("thread_status", "string"),
+    ("needs_escalation", "bool"),
+    ("final_action", "string"),
+    ("decision_reason", "string"),
+    ("decision_confidence", "string"),
+    ("final_reply", "string"),
+    ("supervisor_decision", "string"),
+    ("supervisor_notes", "string"),
+    ("cluster_id", "string"),
+    ("conversation_id", "string"),
+)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "Parquet output needs pyarrow: pip install pyarrow"
+        ) from e
+    return pyarrow, pyarrow.parquet
+
+
+def result_schema():
+    pa, _ = _require_pyarrow()
+    types = {"string": pa.string(), "bool": pa.bool_()}
+    return pa.schema([(name, types[kind]) for name, kind in RESULT_COLUMNS])
+
+
+class ParquetResultWriter:
+    """
+    Append flattened results to a Parquet file, one row group per
+    `row_group_size` results.
+
+    Rows are buffered column by column and written as a row group when the
+    buffer fills, so memory stays at one row group whatever the batch size.
+    The file footer is written by close(); use it as a context manager.
+    """
+
+    def __init__(self, path: str, row_group_size: int = 10000, compression: str = "zstd"):
+        pa, pq = _require_pyarrow()
+        self._pa = pa
+        self.path = path
+        self.row_group_size = row_group_size
+        self.schema = result_schema()
+        self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+        self._columns = {name: [] for name, _ in RESULT_COLUMNS}
+        self._buffered = 0
+        self.rows_written = 0
+        self.row_groups = 0
+
+    def write(self, result: dict):
+        for name, values in self._columns.items():
+            values.append(result.get(name))
+        self._buffered += 1
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered rows as one row group.
+        """
+        if not self._buffered:
+            return
+        table = self._pa.Table.from_pydict(self._columns, schema=self.schema)
+        self._writer.write_table(table, row_group_size=self._buffered)
+        self.rows_written += self._buffered
+        self.row_groups += 1
+        self._columns = {name: [] for name, _ in RESULT_COLUMNS}
+        self._buffered = 0
+
+    def close(self):
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,135 @@
+import heapq
+import time
+from itertools import count
+
+from tools.logging_tools import LatencyHistogram, StageTimings
+
+
+class ScheduledItem:
+    """
+    One queued piece of work: the caller's item plus what it is ordered by.
+    """
+
+    __slots__ = ("item", "urgency", "arrived_at", "deadline")
+
+    def __init__(self, item, urgency: str, arrived_at: float, deadline: float):
+        self.item = item
+        self.urgency = urgency
+        self.arrived_at = arrived_at
+        self.deadline = deadline
+
+
+class PriorityScheduler:
+    """
+    Orders triaged emails for the expensive stages (reply + supervisor).
+
+    Emails are push()ed once EmailSupportPipeline.triage() has classified
+    them, with their urgency, and pop() returns the one with the earliest
+    deadline: arrival + the reply target in `sla` for its urgency, unless
+    the caller passes a deadline of its own (e.g. from a support
+    contract). Equal deadlines go by urgency, then arrival.
+
+    Ordering by deadline is what ages waiting work: a "low" email that
+    arrived at t is ahead of every "high" email arriving after
+    t + sla["low"] - sla["high"], so it waits a bounded time however
+    much urgent mail keeps coming.
+
+    done() records time-to-reply (arrival to done) per urgency, and how
+    many emails missed their deadline; see stats() / report().
+    fifo=True pops in arrival order with the same accounting, as a
+    baseline.
+
+    Not thread-safe: one scheduler per worker, like the pipeline.
+    """
+
+    URGENCY_RANK = {"high": 0, "normal": 1, "low": 2}
+    # Seconds to reply, per urgency
+    SLA = {"high": 3600.0, "normal": 8 * 3600.0, "low": 24 * 3600.0}
+    QUANTILES = StageTimings.QUANTILES
+
+    def __init__(self, sla: dict = None, fifo: bool = False, clock=time.monotonic):
+        self.sla = dict(self.SLA, **(sla or {}))
+        self.fifo = fifo
+        self.clock = clock
+
+        self._heap = []
+        self._seq = count()
+
+        self.max_queued = 0
+        self.time_to_reply = {urgency: LatencyHistogram() for urgency in self.URGENCY_RANK}
+        self.late = dict.fromkeys(self.URGENCY_RANK, 0)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, item, urgency: str, arrived_at: float = None, deadline: float = None) -> ScheduledItem:
+        """
+        Queue item. Unknown urgencies are scheduled as "normal".
+        arrived_at: clock() time the email came in (default: now).
+        """
+        if urgency not in self.URGENCY_RANK:
+            urgency = "normal"
+        if arrived_at is None:
+            arrived_at = self.clock()
+        if deadline is None:
+            deadline = arrived_at + self.sla[urgency]
+
+        entry = ScheduledItem(item, urgency, arrived_at, deadline)
+        seq = next(self._seq)
+        key = (seq,) if self.fifo else (deadline, self.URGENCY_RANK[urgency], seq)
+        heapq.heappush(self._heap, (key, entry))
+        if len(self._heap) > self.max_queued:
+            self.max_queued = len(self._heap)
+        return entry
+
+    def pop(self) -> ScheduledItem:
+        """
+        The next entry to work on. Raises IndexError when empty.
+        """
+        return heapq.heappop(self._heap)[1]
+
+    def done(self, entry: ScheduledItem, finished_at: float = None):
+        if finished_at is None:
+            finished_at = self.clock()
+        self.time_to_reply[entry.urgency].record(int((finished_at - entry.arrived_at) * 1e9))
+        if finished_at > entry.deadline:
+            self.late[entry.urgency] += 1
+
+    def merge(self, other: "PriorityScheduler"):
+        """
+        Add another scheduler's accounting (e.g. a worker's) to this one.
+        """
+        for urgency, histogram in other.time_to_reply.items():
+            self.time_to_reply[urgency].merge(histogram)
+            self.late[urgency] += other.late[urgency]
+        self.max_queued = max(self.max_queued, other.max_queued)
+
+    def stats(self) -> dict:
+        """
+        {urgency: {"count", "late", "mean_s", "p50_s", "p95_s", "p99_s"}}
+        for the urgencies seen, plus "max_queued".
+        """
+        stats = {}
+        for urgency, h in self.time_to_reply.items():
+            if not h.count:
+                continue
+            s = {"count": h.count, "late": self.late[urgency], "mean_s": h.total_ns / h.count / 1e9}
+            for q in self.QUANTILES:
+                s[f"p{q}_s"] = h.percentile(q) / 1e9
+            stats[urgency] = s
+        stats["max_queued"] = self.max_queued
+        return stats
+
+    def report(self) -> str:
+        stats = self.stats()
+        lines = [
+            f"Time to reply ({'fifo' if self.fifo else 'deadline order'}, "
+            f"max {stats.pop('max_queued')} queued):",
+            f"{'urgency':<10}{'count':>8}{'late':>7}{'mean s':>10}{'p50 s':>10}{'p95 s':>10}{'p99 s':>10}",
+        ]
+        for urgency, s in stats.items():
+            lines.append(
+                f"{urgency:<10}{s['count']:>8}{s['late']:>7}{s['mean_s']:>10.3f}"
+                f"{s['p50_s']:>10.3f}{s['p95_s']:>10.3f}{s['p99_s']:>10.3f}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,195 @@
+import os
+import sys
+
+# Make sure project root is on sys.path so we can import 'config'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from config.settings import load_prompts
+
+TRIM_MARKER = " [...]"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough LLM token count: ~4 characters of English per token (UTF-8
+    bytes for other scripts, which take more tokens per character), the
+    usual rule of thumb for BPE tokenizers, at the cost of a len(). For
+    budgets, not billing.
+    """
+    if not text:
+        return 0
+    size = len(text) if text.isascii() else len(text.encode("utf-8"))
+    return (size + 3) // 4
+
+
+def trim_to_tokens(text: str, budget: int):
+    """
+    Cut text to about `budget` tokens, keeping its start and ending on a
+    line, sentence or word break when one is near. Returns (text, trimmed).
+    """
+    if estimate_tokens(text) <= budget:
+        return text, False
+    if budget <= 0:
+        return "", True
+
+    limit = max(0, budget * 4 - len(TRIM_MARKER))
+    if text.isascii():
+        cut = text[:limit]
+    else:
+        cut = text.encode("utf-8")[:limit].decode("utf-8", errors="ignore")
+    # Back off to a break in the last fifth rather than split a sentence
+    floor = len(cut) * 4 // 5
+    end = max(cut.rfind("\n", floor), cut.rfind(". ", floor) + 1)
+    if end <= floor:
+        end = cut.rfind(" ", floor)
+    if end > floor:
+        cut = cut[:end]
+    return cut.rstrip() + TRIM_MARKER, True
+
+
+class PromptTemplate:
+    """
+    One agent's prompt from config/prompts.yml, rendered once.
+
+    prefix holds everything that is the same for every email (role, goal,
+    instructions, output format), so it is byte-identical across calls
+    and providers can serve it from their prefix cache; per-email fields
+    follow it, in the order given.
+    """
+
+    __slots__ = ("agent", "prefix", "prefix_tokens", "_fields")
+
+    def __init__(self, agent: str, spec, fields: tuple):
+        """
+        spec: the agent's YAML block; a mapping with role / goal /
+              instructions / output_format, or plain text.
+        fields: (label, key) pairs rendered as "label: value" lines.
+        """
+        if isinstance(spec, str):
+            parts = [spec.strip()]
+        else:
+            parts = [spec.get("role", ""), spec.get("goal", "")]
+            if spec.get("instructions"):
+                parts.append("Instructions:\n" + spec["instructions"].strip())
+            if spec.get("output_format"):
+                parts.append("Output format:\n" + spec["output_format"].strip())
+        self.agent = agent
+        self.prefix = "\n\n".join(part for part in parts if part) + "\n\n"
+        self.prefix_tokens = estimate_tokens(self.prefix)
+        self._fields = tuple(fields)
+
+    def render(self, values: dict, body: str = "") -> str:
+        lines = [self.prefix]
+        for label, key in self._fields:
+            value = values.get(key)
+            if value:
+                lines.append(f"{label}: {value}\n")
+        if body:
+            lines.append("Email:\n")
+            lines.append(body)
+        return "".join(lines)
+
+
+class PromptBuilder:
+    """
+    LLM prompts for the agents, from config/prompts.yml.
+
+    build() renders an agent's PromptTemplate with the email's fields and
+    its text, cut to body_budget tokens (estimate_tokens): the new message
+    (clean_body) first, then as much quoted history as still fits. Both
+    are newest-first in a top-posted thread, so what gets cut is the
+    oldest part. Counts tokens before (whole text) and after trimming;
+    see stats() / report().
+
+    Templates are built once per agent, on first use.
+    """
+
+    BODY_BUDGET = 400
+    HISTORY_HEADER = "\n\nEarlier in the thread:\n"
+    # Less room than this left for history: leave it out, not a stub
+    MIN_HISTORY_TOKENS = 32
+
+    # (label, key) per agent, in prompt order
+    FIELDS = {
+        "reply_agent": (
+            ("Category", "category"),
+            ("Customer sentiment", "sentiment"),
+            ("Tone", "tone"),
+            ("The previous draft was rejected, fix this", "feedback"),
+            ("Subject", "subject"),
+        ),
+    }
+
+    def __init__(self, prompts: dict = None, body_budget: int = BODY_BUDGET):
+        """
+        prompts: the parsed prompts.yml (default: config.settings.load_prompts()).
+        """
+        self._prompts = prompts
+        self.body_budget = body_budget
+        self._templates = {}
+
+        self.built = 0
+        self.trimmed = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def template(self, agent: str) -> PromptTemplate:
+        template = self._templates.get(agent)
+        if template is None:
+            if self._prompts is None:
+                self._prompts = load_prompts()
+            template = self._templates[agent] = PromptTemplate(
+                agent, self._prompts[agent], self.FIELDS.get(agent, ())
+            )
+        return template
+
+    def body(self, clean_body: str, history: str = "") -> tuple:
+        """
+        (text, tokens_before) for the email part of a prompt.
+        """
+        budget = self.body_budget
+        before = estimate_tokens(clean_body)
+        text, trimmed = trim_to_tokens(clean_body, budget)
+        if history:
+            before += estimate_tokens(self.HISTORY_HEADER + history)
+            left = budget - estimate_tokens(text) - estimate_tokens(self.HISTORY_HEADER)
+            if not trimmed and left >= self.MIN_HISTORY_TOKENS:
+                history, trimmed = trim_to_tokens(history, left)
+                text += self.HISTORY_HEADER + history
+            else:
+                trimmed = True
+        if trimmed:
+            self.trimmed += 1
+        return text, before
+
+    def build(self, agent: str, values: dict, clean_body: str = "", history: str = "") -> str:
+        template = self.template(agent)
+        body, body_before = self.body(clean_body, history)
+        prompt = template.render(values, body)
+
+        after = estimate_tokens(prompt)
+        self.built += 1
+        self.tokens_after += after
+        self.tokens_before += after - estimate_tokens(body) + body_before
+        return prompt
+
+    def stats(self) -> dict:
+        built = self.built
+        return {
+            "prompts": built,
+            "trimmed": self.trimmed,
+            "tokens_before_mean": self.tokens_before / built if built else 0.0,
+            "tokens_after_mean": self.tokens_after / built if built else 0.0,
+            "saved": 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0,
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"Prompts: {s['prompts']} built, {s['trimmed']} trimmed to {self.body_budget} body tokens, "
+            f"{s['tokens_before_mean']:.0f} -> {s['tokens_after_mean']:.0f} tokens per prompt "
+            f"({s['saved']:.0%} saved)"
+        )
@@ -0,0 +1,380 @@
+import os
+import sys
+import threading
+import time
+from types import MappingProxyType
+
+# Make sure project root is on sys.path so we can import 'config'
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from config.settings import CATEGORIES_PATH, load_snapshot, load_yaml
+from tools.keyword_matcher import KeywordMatcher
+
+
+def _keywords(keywords, key: str) -> tuple:
+    keywords = keywords or []
+    if not isinstance(keywords, list) or not all(isinstance(k, str) for k in keywords):
+        raise ValueError(f"'{key}' must be a list of strings")
+    return tuple(k.lower() for k in keywords)
+
+
+def _keyword_table(data: dict, key: str) -> dict:
+    table = data.get(key)
+    if not isinstance(table, dict) or not table:
+        raise ValueError(f"'{key}' must map labels to keyword lists")
+    return {str(label): _keywords(keywords, f"{key}.{label}") for label, keywords in table.items()}
+
+
+def _label_set(data, key: str) -> frozenset:
+    labels = data.get(key) or []
+    if not isinstance(labels, list):
+        raise ValueError(f"'{key}' must be a list")
+    return frozenset(str(label).lower() for label in labels)
+
+
+class RuleSet:
+    """
+    One compiled version of the classification / routing rules
+    (config/categories.yml): keyword tables, escalation triggers and the
+    high-risk categories, plus the KeywordMatcher built over all of them.
+
+    Immutable once built. A new rules file means a new RuleSet, so a
+    reader holding one never sees a half-updated mix of old and new rules.
+
+    Label tables are checked in file order and the first label with a
+    keyword hit wins; with no hit the table's default applies.
+    """
+
+    # Bump when snapshot() output changes, so old snapshots are rebuilt
+    SNAPSHOT_VERSION = 1
+
+    __slots__ = (
+        "category_keywords", "sentiment_keywords", "urgency_keywords",
+        "escalation_triggers", "escalation_sentiments", "high_risk_categories",
+        "default_category", "default_sentiment", "default_urgency",
+        "matcher", "source", "version"
+    )
+
+    def __init__(self, category_keywords: dict, sentiment_keywords: dict, urgency_keywords: dict,
+                 escalation_triggers, escalation_sentiments, high_risk_categories,
+                 default_category: str = "general_inquiry", default_sentiment: str = "neutral",
+                 default_urgency: str = "normal", source: str = None, version: str = None,
+                 reuse: "RuleSet" = None):
+        """
+        reuse: a previous RuleSet; its compiled matcher is kept when the
+        keyword tables are the same (e.g. only high_risk_categories changed).
+        """
+        set_ = object.__setattr__
+        set_(self, "category_keywords", MappingProxyType(dict(category_keywords)))
+        set_(self, "sentiment_keywords", MappingProxyType(dict(sentiment_keywords)))
+        set_(self, "urgency_keywords", MappingProxyType(dict(urgency_keywords)))
+        set_(self, "escalation_triggers", tuple(escalation_triggers))
+        set_(self, "escalation_sentiments", frozenset(escalation_sentiments))
+        set_(self, "high_risk_categories", frozenset(high_risk_categories))
+        set_(self, "default_category", default_category)
+        set_(self, "default_sentiment", default_sentiment)
+        set_(self, "default_urgency", default_urgency)
+        set_(self, "source", source)
+        set_(self, "version", version)
+
+        tables = self.keyword_tables()
+        if reuse is not None and reuse.keyword_tables() == tables:
+            set_(self, "matcher", reuse.matcher)
+        else:
+            set_(self, "matcher", KeywordMatcher(tables))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RuleSet is immutable; build a new one instead")
+
+    def keyword_tables(self) -> dict:
+        return {
+            "category": dict(self.category_keywords),
+            "sentiment": dict(self.sentiment_keywords),
+            "urgency": dict(self.urgency_keywords),
+            "escalation": {"trigger": self.escalation_triggers}
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, source: str = None, version: str = None,
+                  reuse: "RuleSet" = None) -> "RuleSet":
+        """
+        Build from the parsed categories.yml. Raises ValueError when the
+        structure is wrong, before anything is compiled.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("rules file must hold a mapping")
+        escalation = data.get("escalation") or {}
+        if not isinstance(escalation, dict):
+            raise ValueError("'escalation' must be a mapping")
+        return cls(
+            _keyword_table(data, "categories"),
+            _keyword_table(data, "sentiments"),
+            _keyword_table(data, "urgency"),
+            _keywords(escalation.get("triggers"), "escalation.triggers"),
+            _label_set(escalation, "sentiments"),
+            _label_set(data, "high_risk_categories"),
+            default_category=data.get("default_category", "general_inquiry"),
+            default_sentiment=data.get("default_sentiment", "neutral"),
+            default_urgency=data.get("default_urgency", "normal"),
+            source=source,
+            version=version,
+            reuse=reuse
+        )
+
+    def snapshot(self) -> dict:
+        """
+        The compiled rules as plain data, for from_snapshot().
+        """
+        return {
+            "category_keywords": dict(self.category_keywords),
+            "sentiment_keywords": dict(self.sentiment_keywords),
+            "urgency_keywords": dict(self.urgency_keywords),
+            "escalation_triggers": self.escalation_triggers,
+            "escalation_sentiments": self.escalation_sentiments,
+            "high_risk_categories": self.high_risk_categories,
+            "default_category": self.default_category,
+            "default_sentiment": self.default_sentiment,
+            "default_urgency": self.default_urgency,
+            "source": self.source,
+            "version": self.version,
+            "matcher": self.matcher.snapshot(),
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: dict, reuse: "RuleSet" = None) -> "RuleSet":
+        """
+        reuse: as in __init__, keeps its compiled matcher when the keyword
+        tables are the same.
+        """
+        rules = cls.__new__(cls)
+        set_ = object.__setattr__
+        for name in cls.__slots__:
+            if name != "matcher":
+                set_(rules, name, state[name])
+        for name in ("category_keywords", "sentiment_keywords", "urgency_keywords"):
+            set_(rules, name, MappingProxyType(state[name]))
+        if reuse is not None and reuse.keyword_tables() == rules.keyword_tables():
+            set_(rules, "matcher", reuse.matcher)
+        else:
+            set_(rules, "matcher", KeywordMatcher.from_snapshot(state["matcher"]))
+        return rules
+
+    def scan(self, text: str):
+        """
+        Keyword hits for a raw (not yet lowercased) text.
+        """
+        return self.matcher.scan(text.lower())
+
+    def category(self, hits) -> str:
+        for label in self.category_keywords:
+            if ("category", label) in hits:
+                return label
+        return self.default_category
+
+    def sentiment(self, hits) -> str:
+        for label in self.sentiment_keywords:
+            if ("sentiment", label) in hits:
+                return label
+        return self.default_sentiment
+
+    def urgency(self, hits) -> str:
+        for label in self.urgency_keywords:
+            if ("urgency", label) in hits:
+                return label
+        return self.default_urgency
+
+    def escalates(self, sentiment: str, hits) -> bool:
+        if sentiment in self.escalation_sentiments:
+            return True
+        return ("escalation", "trigger") in hits
+
+
+def load_rules(path: str = CATEGORIES_PATH, reuse: RuleSet = None, snapshot: bool = True) -> RuleSet:
+    """
+    Parse and compile a rules file. version is a hash of its bytes.
+
+    snapshot: keep the compiled rules in a binary snapshot
+    (config.settings.load_snapshot); while the file is unchanged, later
+    loads (e.g. the next short-lived process) read that instead of
+    parsing and compiling. Only the regex of large tables is compiled
+    again, and not even that when reuse has the same keyword tables.
+    When the file is built, that RuleSet is returned as is; its snapshot
+    is only written for the next load.
+    """
+    built = []
+
+    def build(raw: bytes):
+        # Only needed when (re)building, so not imported at startup
+        import hashlib
+
+        rules = RuleSet.from_dict(
+            load_yaml(raw), source=path, version=hashlib.sha1(raw).hexdigest()[:12], reuse=reuse
+        )
+        built.append(rules)
+        return rules.snapshot() if snapshot else rules
+
+    if snapshot:
+        state = load_snapshot(path, build, "rules", RuleSet.SNAPSHOT_VERSION)
+        return built[0] if built else RuleSet.from_snapshot(state, reuse=reuse)
+    with open(path, "rb") as f:
+        return build(f.read())
+
+
+class RuleStore:
+    """
+    The current RuleSet for a rules file, replaced when the file changes.
+
+    get() returns the current RuleSet; take it once per email and use it
+    for the whole email. At most every check_interval seconds, get() also
+    stats the file; when its mtime or size changed, the new file is parsed
+    and compiled, then swapped in with one reference assignment. Only the
+    caller that noticed the change does that work, and others keep getting
+    the old RuleSet meanwhile, so in-flight emails neither wait nor mix
+    versions. A file that fails to load leaves the current rules in place
+    (see last_error) until it changes again.
+
+    With start_watcher(), a daemon thread does the checking instead and
+    get() is a plain attribute read; compiling then never runs inside an
+    email (it still shares the GIL).
+
+    Each process keeps its own store, so worker processes pick up changes
+    on their own.
+    """
+
+    def __init__(self, path: str = CATEGORIES_PATH, check_interval: float = 2.0,
+                 rules: RuleSet = None, clock=time.monotonic, snapshot: bool = True):
+        """
+        path: rules file to watch, or None for a store that never reloads.
+        rules: start from these instead of loading path.
+        snapshot: load and save compiled rules through a snapshot (load_rules).
+        """
+        self.path = path
+        self.snapshot = snapshot
+        self.check_interval = check_interval
+        self.clock = clock
+        self.reloads = 0
+        self.last_error = None
+        self._reload_lock = threading.Lock()
+        # Stat before loading: a change in between is picked up at the next check
+        self._signature = self._stat() if path else None
+        self.current = rules if rules is not None else load_rules(path, snapshot=snapshot)
+        self._next_check = clock() + check_interval if path else float("inf")
+        self._watcher = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def fixed(cls, rules: RuleSet) -> "RuleStore":
+        """
+        A store that always returns `rules` and never looks at a file.
+        """
+        return cls(path=None, rules=rules)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self) -> RuleSet:
+        if self.clock() >= self._next_check:
+            self.check()
+        return self.current
+
+    def check(self) -> bool:
+        """
+        Reload now if the file changed. True when new rules were swapped in.
+        """
+        if self.path is None:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            # Another thread is already reloading
+            return False
+        try:
+            if self._watcher is None:
+                self._next_check = self.clock() + self.check_interval
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                return False
+            self._signature = signature
+            return self._reload()
+        finally:
+            self._reload_lock.release()
+
+    def start_watcher(self):
+        if self.path is None or self._watcher is not None:
+            return self
+        self._next_check = float("inf")
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="rule-watcher", daemon=True)
+        self._watcher.start()
+        return self
+
+    def _watch(self):
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+    def stop_watcher(self):
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
+        self._next_check = self.clock() + self.check_interval
+
+    def _reload(self) -> bool:
+        try:
+            rules = load_rules(self.path, reuse=self.current, snapshot=self.snapshot)
+        except Exception as e:
+            # Runs on the watcher thread too: reported through last_error only
+            self.last_error = f"{type(e).__name__}: {e}"
+            return False
+        self.last_error = None
+        if rules.version == self.current.version:
+            return False
+        self.current = rules
+        self.reloads += 1
+        return True
+
+
+# Stores shared by every agent in a process, per rules file
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def rule_store(path: str = CATEGORIES_PATH, watch: bool = True) -> RuleStore:
+    """
+    The process-wide RuleStore for a rules file, created on first use.
+
+    watch: run its watcher thread (long-running processes). A process
+    that handles one email and exits passes watch=False: no thread is
+    started and get() checks the file itself. A store that is already
+    watched stays so.
+    """
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = RuleStore(path)
+        if watch:
+            store.start_watcher()
+        return store
+
+
+def _restart_watchers():
+    # A forked child (e.g. a ProcessPoolExecutor worker) inherits the
+    # stores but not their watcher threads or a consistent lock state
+    global _stores_lock
+    _stores_lock = threading.Lock()
+    for store in _stores.values():
+        store._reload_lock = threading.Lock()
+        if store._watcher is not None:
+            store._watcher = None
+            store.start_watcher()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_watchers)
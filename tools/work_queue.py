@@ -0,0 +1,317 @@
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from itertools import count
+
+from tools.email_parser import EmailParser
+
+
+class QueueFull(Exception):
+    """
+    Raised by put() when the queue stays at max_depth past the timeout.
+    """
+
+
+class WorkQueue:
+    """
+    At-least-once email queue shared by SpoolQueue and SQLiteQueue.
+
+    Consumers claim() a batch of (token, email) pairs, then ack() each
+    token once its result is stored, nack() it to hand it back, or fail()
+    it to park it as a dead letter. Claimed messages that were never acked
+    (the consumer crashed) go back to the queue with recover().
+    deliveries(token) counts the claims of a message, this one included,
+    so a consumer can dead-letter one that keeps crashing it.
+
+    put() applies backpressure: while depth() is at max_depth it waits,
+    and raises QueueFull after `timeout` seconds (None: wait forever,
+    0: fail at once).
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, max_depth: int = None):
+        self.max_depth = max_depth
+        # Depth is only re-counted once this estimate reaches max_depth
+        self._depth_estimate = 0
+
+    def put(self, email: dict, timeout: float = None) -> str:
+        if self.max_depth is not None:
+            self._wait_for_room(timeout)
+        token = self._put(email)
+        self._depth_estimate += 1
+        return token
+
+    def _wait_for_room(self, timeout: float):
+        if self._depth_estimate < self.max_depth:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._depth_estimate = self.depth()
+            if self._depth_estimate < self.max_depth:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                raise QueueFull(f"queue depth {self._depth_estimate} >= max_depth {self.max_depth}")
+            time.sleep(self.POLL_INTERVAL)
+
+    def ack_many(self, tokens):
+        for token in tokens:
+            self.ack(token)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SpoolQueue(WorkQueue):
+    """
+    Queue backed by a local spool directory, Maildir style:
+
+        root/tmp/         files being written
+        root/incoming/    ready: one message per file, FIFO by file name
+        root/processing/  claimed, not yet acked
+        root/failed/      dead letters, with a .error file beside each
+
+    Messages are .json files holding an email dict (id, subject, body and
+    optional sender / thread_status) or raw RFC 822 .eml files. Producers
+    other than put() must write into tmp/ and rename into incoming/, so a
+    half-written file is never claimed. Every move is a rename within one
+    filesystem, hence atomic.
+
+    A message handed back (nack / recover) is renamed with its delivery
+    count before the suffix, e.g. 0001.42.0.r2.json after two claims; it
+    keeps its place in the FIFO order and its default id.
+    """
+
+    SUFFIXES = (".json", ".eml")
+    # ".r<deliveries so far>" right before the suffix
+    _RETRIES = re.compile(r"\.r(\d+)(?=\.[^.]+$)")
+
+    def __init__(self, root: str, max_depth: int = None):
+        super().__init__(max_depth)
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        self.incoming_dir = os.path.join(root, "incoming")
+        self.processing_dir = os.path.join(root, "processing")
+        self.failed_dir = os.path.join(root, "failed")
+        for folder in (self.tmp_dir, self.incoming_dir, self.processing_dir, self.failed_dir):
+            os.makedirs(folder, exist_ok=True)
+
+        self._parser = EmailParser()
+        self._seq = count()
+        # File names from the last directory scan, oldest first
+        self._backlog = deque()
+
+    def _put(self, email: dict) -> str:
+        name = f"{time.time_ns():020d}.{os.getpid()}.{next(self._seq)}.json"
+        tmp_path = os.path.join(self.tmp_dir, name)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(email, f, ensure_ascii=False)
+        os.rename(tmp_path, os.path.join(self.incoming_dir, name))
+        return name
+
+    def _ready_names(self) -> list:
+        with os.scandir(self.incoming_dir) as entries:
+            return [e.name for e in entries if e.name.endswith(self.SUFFIXES)]
+
+    def depth(self) -> int:
+        return len(self._ready_names())
+
+    def claim(self, n: int) -> list:
+        claimed = []
+        while len(claimed) < n:
+            if not self._backlog:
+                self._backlog.extend(sorted(self._ready_names()))
+                if not self._backlog:
+                    break
+
+            name = self._backlog.popleft()
+            path = os.path.join(self.processing_dir, name)
+            try:
+                os.rename(os.path.join(self.incoming_dir, name), path)
+            except FileNotFoundError:
+                # Claimed by another consumer since the scan
+                continue
+
+            try:
+                email = self._load(path, name)
+            except (OSError, ValueError) as e:
+                self.fail(name, f"unreadable message: {e!r}")
+                continue
+            claimed.append((name, email))
+
+        self._depth_estimate = max(0, self._depth_estimate - len(claimed))
+        return claimed
+
+    def _load(self, path: str, name: str) -> dict:
+        stem = self._RETRIES.sub("", name).rsplit(".", 1)[0]
+        if name.endswith(".eml"):
+            message = self._parser.parse_file(path)
+            email = {
+                "id": message["id"] or stem,
+                "subject": message["subject"],
+                "body": message["body"],
+                "thread_status": message["thread_status"],
+            }
+            if message["sender"]:
+                email["sender"] = message["sender"]
+            return email
+
+        with open(path, "r", encoding="utf-8") as f:
+            email = json.load(f)
+        if not isinstance(email, dict) or "body" not in email:
+            raise ValueError("expected a JSON object with at least a 'body'")
+        email.setdefault("id", stem)
+        email.setdefault("subject", "")
+        return email
+
+    def ack(self, token: str):
+        try:
+            os.remove(os.path.join(self.processing_dir, token))
+        except FileNotFoundError:
+            pass
+
+    def deliveries(self, token: str) -> int:
+        match = self._RETRIES.search(token)
+        return int(match.group(1)) + 1 if match else 1
+
+    def _requeue(self, name: str):
+        stem, suffix = self._RETRIES.sub("", name).rsplit(".", 1)
+        os.rename(
+            os.path.join(self.processing_dir, name),
+            os.path.join(self.incoming_dir, f"{stem}.r{self.deliveries(name)}.{suffix}")
+        )
+
+    def nack(self, token: str):
+        self._requeue(token)
+
+    def fail(self, token: str, error: str):
+        os.rename(os.path.join(self.processing_dir, token), os.path.join(self.failed_dir, token))
+        with open(os.path.join(self.failed_dir, token + ".error"), "w", encoding="utf-8") as f:
+            f.write(error)
+
+    def recover(self) -> int:
+        """
+        Return every claimed-but-unacked message to incoming/. Only safe
+        while no other consumer is running on this spool.
+        """
+        names = os.listdir(self.processing_dir)
+        for name in names:
+            self._requeue(name)
+        return len(names)
+
+
+class SQLiteQueue(WorkQueue):
+    """
+    Queue backed by one SQLite table (WAL mode). Tokens are row ids; claim
+    marks rows in one IMMEDIATE transaction, so several consumer processes
+    can share the file.
+    """
+
+    READY, CLAIMED, FAILED = 0, 1, 2
+
+    def __init__(self, db_path: str, max_depth: int = None):
+        super().__init__(max_depth)
+        self._db = sqlite3.connect(db_path, isolation_level=None, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS email_queue ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " payload TEXT NOT NULL,"
+            " state INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " deliveries INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(email_queue)")}
+        if "deliveries" not in columns:
+            # Queue file from before delivery counting
+            self._db.execute(
+                "ALTER TABLE email_queue ADD COLUMN deliveries INTEGER NOT NULL DEFAULT 0"
+            )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS email_queue_state ON email_queue (state, id)"
+        )
+
+    def _put(self, email: dict) -> str:
+        cursor = self._db.execute(
+            "INSERT INTO email_queue (payload) VALUES (?)",
+            (json.dumps(email, ensure_ascii=False),)
+        )
+        return str(cursor.lastrowid)
+
+    def depth(self) -> int:
+        return self._db.execute(
+            "SELECT COUNT(*) FROM email_queue WHERE state = ?", (self.READY,)
+        ).fetchone()[0]
+
+    def claim(self, n: int) -> list:
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._db.execute(
+                "SELECT id, payload FROM email_queue WHERE state = ? ORDER BY id LIMIT ?",
+                (self.READY, n)
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE email_queue SET state = ?, deliveries = deliveries + 1 WHERE id = ?",
+                [(self.CLAIMED, row_id) for row_id, _ in rows]
+            )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+        claimed = []
+        for row_id, payload in rows:
+            email = json.loads(payload)
+            email.setdefault("id", str(row_id))
+            email.setdefault("subject", "")
+            claimed.append((str(row_id), email))
+
+        self._depth_estimate = max(0, self._depth_estimate - len(claimed))
+        return claimed
+
+    def ack(self, token: str):
+        self._db.execute("DELETE FROM email_queue WHERE id = ?", (int(token),))
+
+    def ack_many(self, tokens):
+        self._db.execute("BEGIN")
+        self._db.executemany(
+            "DELETE FROM email_queue WHERE id = ?", [(int(t),) for t in tokens]
+        )
+        self._db.execute("COMMIT")
+
+    def deliveries(self, token: str) -> int:
+        row = self._db.execute(
+            "SELECT deliveries FROM email_queue WHERE id = ?", (int(token),)
+        ).fetchone()
+        return row[0] if row is not None else 0
+
+    def nack(self, token: str):
+        self._db.execute(
+            "UPDATE email_queue SET state = ? WHERE id = ?", (self.READY, int(token))
+        )
+
+    def fail(self, token: str, error: str):
+        self._db.execute(
+            "UPDATE email_queue SET state = ?, error = ? WHERE id = ?",
+            (self.FAILED, error, int(token))
+        )
+
+    def recover(self) -> int:
+        return self._db.execute(
+            "UPDATE email_queue SET state = ? WHERE state = ?", (self.READY, self.CLAIMED)
+        ).rowcount
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None